@@ -21,8 +21,9 @@ def apply_larger_segmentation():
             print(f"❌ 테스트 이미지 없음: {test_image}")
             return
         
-        # 조정된 파라미터로 감지기 생성
+        # 조정된 파라미터로 감지기 생성 (단계별 캐시: 면적 기준만 바꾼 재감지는 필터 단계만 실행)
         detector = HybridShapeDetector()
+        detector.enable_stage_cache()
         
         # 더 큰 영역만 감지하도록 조정
         detector.min_area_ratio = 0.001      # 0.0001 → 0.001 (10배 증가)
@@ -77,6 +78,7 @@ def test_extreme_parameters():
         
         # 매우 관대한 설정
         detector = HybridShapeDetector()
+        detector.enable_stage_cache()
         detector.min_area_ratio = 0.005      # 0.5%
         detector.min_absolute_area = 2000    # 2000px² (약 45×45)
         detector.max_area_ratio = 0.2        # 20%
@@ -103,6 +105,48 @@ def test_extreme_parameters():
         print(f"❌ 극단적 테스트 실패: {e}")
         return 0
 
+def sweep_area_parameters():
+    """면적 기준 여러 조합을 연속으로 감지 - 단계별 캐시 덕분에 두 번째 조합부터는 즉시 끝남"""
+    print(f"\n📈 면적 기준 스윕")
+    print("=" * 60)
+    
+    try:
+        from hybrid_shape_detector import HybridShapeDetector
+        from image_handle import ImageHandle
+        import time
+        
+        test_image = "input/17301.png"
+        
+        # 경로를 넘기면 매번 파일을 읽고 디코딩/해시하므로 (이미지 저장소가 꺼져 있으면) 핸들을 한 번 만들어 재사용
+        handle = ImageHandle.from_path(test_image)
+        
+        detector = HybridShapeDetector()
+        detector.enable_stage_cache()
+        
+        # (min_area_ratio, min_absolute_area, max_area_ratio)
+        settings = [
+            (0.0001, 50, 0.4),
+            (0.0005, 200, 0.4),
+            (0.001, 500, 0.3),
+            (0.001, 1000, 0.3),
+            (0.005, 2000, 0.2),
+        ]
+        
+        for min_ratio, min_absolute, max_ratio in settings:
+            detector.min_area_ratio = min_ratio
+            detector.min_absolute_area = min_absolute
+            detector.max_area_ratio = max_ratio
+            
+            start_time = time.time()
+            shapes = detector.detect_shape_set(handle)
+            elapsed = time.time() - start_time
+            
+            print(f"   min_area_ratio={min_ratio:<7} min_absolute_area={min_absolute:<5} max_area_ratio={max_ratio:<4}"
+                  f" → {len(shapes):3d}개 ({elapsed*1000:.0f}ms)")
+        
+    except Exception as e:
+        print(f"❌ 스윕 실패: {e}")
+
 def main():
     """메인 실행 함수"""
     print("⚙️  파라미터 조정 도구")
@@ -117,6 +161,13 @@ def main():
             print("❌ test-sdp 디렉토리를 찾을 수 없습니다.")
             return
     
+    # 같은 이미지를 반복해서 여는 실험 도구이므로 디코딩 결과를 이미지 저장소에서 재사용
+    from image_store import enable_image_store
+    enable_image_store()
+    
+    # 0단계: 면적 기준별 감지 개수 비교
+    sweep_area_parameters()
+    
     # 1단계: 일반 조정
     success = apply_larger_segmentation()
     
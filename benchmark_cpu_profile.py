@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+CPU 실행 프로파일 벤치마크 - 로컬 모델을 CPU로 실행할 때 프로파일별 로드/첫 추론/이미지당 지연 시간 비교
+
+프로파일마다 새 프로세스에서 실행하므로 (스레드 수는 프로세스당 한 번만 설정 가능) 서로 영향을 주지 않음
+
+사용법:
+    python benchmark_cpu_profile.py                          # default / tuned / compiled 비교
+    python benchmark_cpu_profile.py --profiles default tuned --images 2
+    python benchmark_cpu_profile.py --precision int8         # 정밀도 지정
+    python benchmark_cpu_profile.py --sockets                # 소켓별 작업자 프로세스와 단일 프로세스 비교
+"""
+
+import os
+import sys
+import time
+import argparse
+import difflib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append('src')
+
+
+def measure_profile(job):
+    """새 프로세스에서 프로파일 하나 측정 - 로드 시간, 이미지별 지연 시간, 결과"""
+    profile_name, model_id, precision, image_files = job
+
+    # 캐시 적중 없이 매번 추론하도록
+    os.environ['CPU_PROFILE'] = profile_name
+    os.environ['OCR_CACHE_ENABLED'] = 'false'
+
+    from cpu_profile import get_cpu_profile
+    from local_ocr_improved import LocalOCRProcessor
+
+    profile = get_cpu_profile()
+    processor = LocalOCRProcessor(model_id, device="cpu", precision=precision)
+
+    start_time = time.time()
+    if not processor.ensure_model_loaded():
+        return {'profile': profile_name, 'error': "모델 로드 실패"}
+    load_time = time.time() - start_time
+
+    latencies, texts = [], []
+    for image_path in image_files:
+        start_time = time.time()
+        texts.append(processor.process_image(image_path) or "")
+        latencies.append(time.time() - start_time)
+
+    return {
+        'profile': profile_name,
+        'description': profile.describe(),
+        'load_time': load_time,
+        'latencies': latencies,
+        'texts': texts,
+    }
+
+
+def run_isolated(func, job):
+    """func(job)를 새 spawn 프로세스에서 실행"""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(func, job).result()
+
+
+def compare_profiles(profiles, model_id, precision, image_files):
+    """프로파일별 측정 결과 표 출력 (첫 프로파일 결과를 기준으로 한 결과 일치도 포함)"""
+    results = []
+    for profile_name in profiles:
+        print(f"\n⏳ {profile_name} 프로파일 측정 중...")
+        results.append(run_isolated(measure_profile, (profile_name, model_id, precision, image_files)))
+
+    print(f"\n🧵 CPU 프로파일 비교 ({model_id}, {precision or '기본 정밀도'}, 이미지 {len(image_files)}개)")
+    print(f"{'프로파일':10s} {'로드':>8s} {'첫 추론':>9s} {'이후 평균':>10s} {'결과 일치도':>11s}  설정")
+    print("-" * 100)
+
+    baseline = next((result for result in results if 'error' not in result), None)
+    for result in results:
+        if 'error' in result:
+            print(f"{result['profile']:10s} ❌ {result['error']}")
+            continue
+
+        latencies = result['latencies']
+        rest = latencies[1:] or latencies
+        similarity = sum(
+            difflib.SequenceMatcher(None, base, text).ratio()
+            for base, text in zip(baseline['texts'], result['texts'])
+        ) / len(result['texts'])
+        print(f"{result['profile']:10s} {result['load_time']:7.1f}s {latencies[0]:8.2f}s "
+              f"{sum(rest) / len(rest):9.2f}s {similarity * 100:10.1f}%  {result['description']}")
+
+
+def compare_sockets(model_id, precision, image_files):
+    """소켓별 작업자 프로세스 vs 단일 프로세스 (tuned) 전체 처리 시간"""
+    from cpu_profile import cpu_sockets, run_socket_workers
+    from local_ocr_improved import ocr_image_files
+
+    sockets = cpu_sockets()
+    if len(sockets) < 2:
+        print(f"\n⚠️  소켓이 {len(sockets)}개라 소켓별 작업자 비교를 건너뜁니다")
+        return
+
+    os.environ['OCR_CACHE_ENABLED'] = 'false'
+    print(f"\n🧵 소켓별 작업자 비교 (소켓 {len(sockets)}개, 이미지 {len(image_files)}개)")
+
+    # 모델 로드 시간을 제외하도록 각 방식마다 첫 이미지로 한 번 더 워밍업
+    start_time = time.time()
+    run_isolated(ocr_image_files, (model_id, precision, image_files[:1] + image_files))
+    single_time = time.time() - start_time
+
+    shard_count = min(len(sockets), len(image_files))
+    shards = [image_files[index::shard_count] for index in range(shard_count)]
+    jobs = [(model_id, precision, shard[:1] + shard) for shard in shards]
+    start_time = time.time()
+    run_socket_workers(ocr_image_files, jobs, sockets, profile_name="tuned")
+    socket_time = time.time() - start_time
+
+    print(f"단일 프로세스 (전체 코어): {single_time:.1f}초")
+    print(f"소켓별 작업자 {shard_count}개: {socket_time:.1f}초 ({single_time / max(socket_time, 1e-6):.2f}배)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU 실행 프로파일 벤치마크")
+    parser.add_argument("--input", default="input", help="이미지 폴더 (기본: input)")
+    parser.add_argument("--model", default="qwen2.5-vl-2b", help="models.py의 로컬 모델 키 또는 모델 ID")
+    parser.add_argument("--precision", default=None, help="정밀도 (fp32 / bf16 / int8, 기본: 모델별 CPU 기본값)")
+    parser.add_argument("--profiles", nargs="+", default=["default", "tuned", "compiled"], help="비교할 프로파일")
+    parser.add_argument("--images", type=int, default=3, help="측정할 이미지 수 (기본: 3)")
+    parser.add_argument("--sockets", action="store_true", help="소켓별 작업자 프로세스 비교 추가")
+    args = parser.parse_args()
+
+    print("📊 CPU 실행 프로파일 벤치마크")
+    print("=" * 60)
+
+    from utils import get_image_files, print_system_info
+    from models import get_model_info
+    from cpu_profile import CPU_PROFILES, cpu_sockets
+
+    print_system_info()
+    print(f"소켓: {len(cpu_sockets())}개")
+
+    image_files = get_image_files(args.input)[:args.images]
+    if not image_files:
+        print(f"❌ 이미지가 없습니다: {args.input}")
+        return
+
+    unknown = [name for name in args.profiles if name not in CPU_PROFILES]
+    if unknown:
+        print(f"❌ 알 수 없는 프로파일: {', '.join(unknown)} (사용 가능: {', '.join(CPU_PROFILES)})")
+        return
+
+    model_info = get_model_info(args.model, "local")
+    model_id = model_info['model_id'] if model_info else args.model
+
+    compare_profiles(args.profiles, model_id, args.precision, image_files)
+
+    if args.sockets:
+        compare_sockets(model_id, args.precision, image_files)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+요청 이미지 최적화 벤치마크 - input/ 이미지별 전송 크기, 인코딩 시간, (선택) API 지연 시간과 결과 일치도
+
+사용법:
+    python benchmark_payload.py          # 전송 크기 / 인코딩 시간만 (API 호출 없음)
+    python benchmark_payload.py --ocr    # 원본 전송과 최적화 전송을 실제로 호출해서 비교
+"""
+
+import os
+import sys
+import time
+import argparse
+import difflib
+
+sys.path.append('src')
+
+
+def measure_payloads(image_files, optimizer):
+    """이미지별 예전 방식 / 최적화 전송 크기와 인코딩 시간"""
+    from image_handle import ImageHandle
+    from region_planner import grid_regions
+
+    print(f"\n📦 전송 크기 비교 (모델 최대 {optimizer.max_pixels:,} 픽셀)")
+    print(f"{'파일':24s} {'모드':16s} {'예전':>10s} {'최적화':>10s} {'비율':>7s} {'인코딩':>8s}")
+    print("-" * 80)
+
+    totals = {}
+    for image_path in image_files:
+        handle = ImageHandle.from_path(image_path)
+        name = os.path.basename(image_path)[:24]
+
+        # 전체 이미지: 예전에는 원본 파일, 영역 크롭: 예전에는 무손실 PNG
+        cases = [("general", [handle], lambda h: h.encoded("original"))]
+        crops = [handle.crop(box) for _, _, box in grid_regions(*handle.size)]
+        cases.append(("hybrid", crops, lambda h: h.encoded("PNG")))
+
+        for mode, images, baseline in cases:
+            # 인코딩 결과는 핸들에 캐시되므로 최적화 쪽을 먼저 측정
+            start_time = time.time()
+            after = sum(len(optimizer.choose(image, mode)['bytes']) for image in images)
+            elapsed = time.time() - start_time
+            before = sum(len(baseline(image)) for image in images)
+
+            total = totals.setdefault(mode, [0, 0])
+            total[0] += before
+            total[1] += after
+            print(f"{name:24s} {mode:16s} {before/1024:8.0f}KB {after/1024:8.0f}KB {after/max(before, 1)*100:6.1f}% {elapsed*1000:6.0f}ms")
+
+    print("-" * 80)
+    for mode, (before, after) in totals.items():
+        print(f"{'합계':24s} {mode:16s} {before/1024:8.0f}KB {after/1024:8.0f}KB {after/max(before, 1)*100:6.1f}%")
+
+
+def measure_ocr(image_files, optimizer, api_key, model_name):
+    """원본 전송과 최적화 전송의 API 지연 시간 / 결과 일치도 비교"""
+    from image_handle import ImageHandle
+    from async_cloud_client import get_cloud_client
+    from cloud_ocr import CloudOCRProcessor
+    from response_utils import extract_text_from_response
+
+    processor = CloudOCRProcessor(api_key, model_name)
+    client = get_cloud_client(api_key)
+    prompt = processor._get_prompt_for_mode("general")
+
+    print(f"\n🤖 API 비교 ({model_name}, general 모드)")
+    print(f"{'파일':24s} {'원본 지연':>10s} {'최적화 지연':>12s} {'결과 일치도':>12s}")
+    print("-" * 64)
+
+    similarities = []
+    for image_path in image_files:
+        handle = ImageHandle.from_path(image_path)
+        texts, latencies = [], []
+        for image_bytes in (handle.encoded("original"), optimizer.choose(handle, "general")['bytes']):
+            processor.rate_limiter.acquire()
+            start_time = time.time()
+            response = client.ocr_sync(image_bytes, prompt, model_name)
+            latencies.append(time.time() - start_time)
+            texts.append(extract_text_from_response(response) or "")
+
+        # 원본 결과를 기준으로 한 문자 단위 일치도
+        similarity = difflib.SequenceMatcher(None, texts[0], texts[1]).ratio()
+        similarities.append(similarity)
+        print(f"{os.path.basename(image_path)[:24]:24s} {latencies[0]:9.2f}s {latencies[1]:11.2f}s {similarity*100:11.1f}%")
+
+    if similarities:
+        print("-" * 64)
+        print(f"평균 결과 일치도: {sum(similarities) / len(similarities) * 100:.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="요청 이미지 최적화 벤치마크")
+    parser.add_argument("--input", default="input", help="이미지 폴더 (기본: input)")
+    parser.add_argument("--ocr", action="store_true", help="API를 호출해서 지연 시간과 결과 일치도 비교")
+    parser.add_argument("--model", default="qwen-vl-plus", help="--ocr에 사용할 모델")
+    args = parser.parse_args()
+
+    print("📊 요청 이미지 최적화 벤치마크")
+    print("=" * 60)
+
+    from utils import get_image_files
+    from payload_optimizer import PayloadOptimizer, DEFAULT_MAX_PIXELS
+    from parallel_utils import get_env_int
+
+    image_files = get_image_files(args.input)
+    if not image_files:
+        print(f"❌ 이미지가 없습니다: {args.input}")
+        return
+
+    optimizer = PayloadOptimizer(max_pixels=get_env_int('PAYLOAD_MAX_PIXELS', DEFAULT_MAX_PIXELS), verbose=False)
+    measure_payloads(image_files, optimizer)
+
+    if args.ocr:
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+        except ImportError:
+            pass
+        api_key = os.getenv('QWEN_API_KEY')
+        if not api_key or api_key == "your_api_key_here":
+            print("\n❌ API 키가 설정되지 않았습니다. (.env의 QWEN_API_KEY)")
+            return
+        measure_ocr(image_files, optimizer, api_key, args.model)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@ def diagnose_opencv_detection():
         import cv2
         import numpy as np
         from hybrid_shape_detector import HybridShapeDetector
+        from image_handle import ImageHandle
         
         test_image = "input/17301.png"
         
@@ -25,11 +26,13 @@ def diagnose_opencv_detection():
         
         print(f"📸 분석 이미지: {test_image}")
         
-        # 이미지 로드 및 기본 정보
-        original = cv2.imread(test_image)
-        if original is None:
+        # 이미지 로드 및 기본 정보 (이미지 저장소가 켜져 있으면 디코딩 생략)
+        try:
+            handle = ImageHandle.from_path(test_image)
+        except ValueError:
             print("❌ 이미지 로드 실패")
             return False
+        original = handle.to_bgr()
         
         height, width = original.shape[:2]
         print(f"📏 이미지 크기: {width} × {height} pixels")
@@ -39,7 +42,7 @@ def diagnose_opencv_detection():
         print(f"\n🔬 단계별 전처리 분석:")
         
         # 1. 그레이스케일 변환
-        gray = cv2.cvtColor(original, cv2.COLOR_BGR2GRAY)
+        gray = handle.gray
         print(f"   1️⃣ 그레이스케일 변환 완료")
         
         # 2. 여러 이진화 방법 시도
@@ -199,6 +202,10 @@ def main():
             print("❌ test-sdp 디렉토리를 찾을 수 없습니다.")
             return
     
+    # 같은 이미지를 반복해서 여는 실험 도구이므로 디코딩 결과를 이미지 저장소에서 재사용
+    from image_store import enable_image_store
+    enable_image_store()
+    
     # 진단 실행
     has_contours, best_method, total_contours, valid_contours = diagnose_opencv_detection()
     
@@ -21,8 +21,9 @@ class GridBasedOCR:
         
     def _setup_network(self):
         """네트워크 설정 초기화"""
+        from async_cloud_client import get_cloud_client
+        
         try:
-            import dashscope
             from network_utils import configure_ssl, create_robust_session
             from network_advanced import create_permissive_session, configure_advanced_ssl
             from endpoint_config import configure_international_endpoint
@@ -30,9 +31,6 @@ class GridBasedOCR:
             # 국제 엔드포인트 설정 먼저
             configure_international_endpoint()
             
-            # dashscope API 키 설정
-            dashscope.api_key = self.api_key
-            
             # SSL 및 네트워크 설정 (관대한 모드)
             configure_advanced_ssl()
             self.session = create_permissive_session()
@@ -41,9 +39,9 @@ class GridBasedOCR:
             
         except Exception as e:
             print(f"\u26a0\ufe0f  네트워크 설정 오류: {e}")
-            # 기본 설정으로 대체
-            import dashscope
-            dashscope.api_key = self.api_key
+        
+        # 연결을 재사용하는 공유 비동기 API 클라이언트
+        self.client = get_cloud_client(self.api_key)
         
     def split_image_into_grid(self, image_path, grid_size=(3, 4), overlap_ratio=0.1):
         """이미지를 격자로 분할"""
@@ -84,6 +82,7 @@ class GridBasedOCR:
                     
                     region_info = {
                         'image': region,
+                        'name': f"{row},{col}",
                         'position': (row, col),
                         'bbox': (start_x, start_y, end_x, end_y),
                         'size': (end_x - start_x, end_y - start_y)
@@ -126,23 +125,51 @@ class GridBasedOCR:
             print(f"❌ 적응적 분할 실패: {e}")
             return []
     
+    def split_image_by_shapes(self, image_path):
+        """
+        감지된 도형을 모델 입력 크기에 맞게 묶은 영역으로 분할 (도형이 없으면 빈 리스트)
+        
+        영역 정보 형식은 split_image_into_grid와 같고 position은 (영역 번호, 0)
+        """
+        try:
+            from image_handle import ImageHandle
+            from region_planner import plan_regions
+            
+            handle = ImageHandle.ensure(image_path)
+            plan = plan_regions(handle)
+            if plan['source'] != "shapes":
+                print("🔍 감지된 도형 없음")
+                return []
+            
+            print(f"📸 원본 이미지: {handle.width}×{handle.height}")
+            print(f"🎯 도형 {plan['shapes']}개 → {len(plan['regions'])}개 영역")
+            
+            regions = []
+            for index, region in enumerate(plan['regions']):
+                left, top, right, bottom = region['box']
+                regions.append({
+                    'image': handle.crop(region['box']).pil,
+                    'name': region['name'],
+                    'position': (index, 0),
+                    'bbox': region['box'],
+                    'size': (right - left, bottom - top)
+                })
+                print(f"   영역 {region['name']}: ({left},{top}) → ({right},{bottom}), 도형 {region['shapes']}개")
+            
+            return regions
+            
+        except Exception as e:
+            print(f"❌ 도형 기반 분할 실패: {e}")
+            return []
+    
     def process_region_with_ai(self, region_image, region_info):
         """AI로 개별 영역 처리"""
         try:
-            import dashscope
-            import base64
-            import io
-            from dotenv import load_dotenv
-            
-            # 환경변수 로드
-            load_dotenv()
-            dashscope.api_key = self.api_key
+            from image_handle import ImageHandle
+            from payload_optimizer import get_payload_optimizer
             
-            # 이미지를 base64로 인코딩
-            img_buffer = io.BytesIO()
-            region_image.save(img_buffer, format='PNG')
-            img_buffer.seek(0)
-            base64_image = base64.b64encode(img_buffer.read()).decode('utf-8')
+            # 영역 크롭용 설정으로 인코딩 (형식/품질/크기 자동 선택)
+            image_bytes = get_payload_optimizer().encode(ImageHandle.ensure(region_image), "hybrid")
             
             # 원형/타원형 감지에 특화된 프롬프트
             prompt = """이 이미지 영역에서 수기로 그어진 원형이나 타원형 도형 안에 있는 텍스트만 찾아 추출해주세요.
@@ -163,20 +190,7 @@ class GridBasedOCR:
 
 Find text inside hand-drawn circles or ellipses only. Ignore rectangular boxes and plain text."""
             
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"image": f"data:image/png;base64,{base64_image}"},
-                        {"text": prompt}
-                    ]
-                }
-            ]
-            
-            response = dashscope.MultiModalConversation.call(
-                model=self.model_name,
-                messages=messages
-            )
+            response = self.client.ocr_sync(image_bytes, prompt, self.model_name)
             
             # 응답 처리
             if response and response.status_code == 200:
@@ -207,8 +221,7 @@ Find text inside hand-drawn circles or ellipses only. Ignore rectangular boxes a
             
             saved_paths = []
             for i, region_info in enumerate(regions):
-                row, col = region_info['position']
-                filename = f"{base_name}_grid_{row}_{col}.png"
+                filename = f"{base_name}_grid_{region_info['name'].replace(',', '_')}.png"
                 filepath = os.path.join(output_dir, filename)
                 
                 region_info['image'].save(filepath)
@@ -240,13 +253,12 @@ Find text inside hand-drawn circles or ellipses only. Ignore rectangular boxes a
             for i, (region_info, result) in enumerate(zip(regions, results)):
                 if result:  # 텍스트가 있는 영역만
                     bbox = region_info['bbox']
-                    row, col = region_info['position']
                     
                     # 영역 테두리 그리기
                     draw.rectangle(bbox, outline='red', width=3)
                     
                     # 번호 표시
-                    draw.text((bbox[0] + 5, bbox[1] + 5), f"{row},{col}", 
+                    draw.text((bbox[0] + 5, bbox[1] + 5), region_info['name'], 
                              fill='red', font=font)
                     
                     # 결과 텍스트 (짧게)
@@ -263,15 +275,22 @@ Find text inside hand-drawn circles or ellipses only. Ignore rectangular boxes a
             print(f"❌ 시각화 생성 실패: {e}")
             return False
     
-    def process_image_grid_based(self, image_path, grid_size=None, target_regions=12):
-        """그리드 기반 이미지 처리"""
+    def process_image_grid_based(self, image_path, grid_size=None, target_regions=12, use_shapes=True):
+        """
+        그리드 기반 이미지 처리
+        
+        grid_size가 없으면 감지된 도형을 묶은 영역을 먼저 사용하고 (use_shapes),
+        도형이 없을 때만 target_regions개 목표의 적응적 그리드로 분할
+        """
         print(f"🔲 그리드 기반 OCR 시작: {os.path.basename(image_path)}")
         
         # 이미지 분할
         if grid_size:
             regions = self.split_image_into_grid(image_path, grid_size)
         else:
-            regions = self.split_image_adaptive(image_path, target_regions)
+            regions = self.split_image_by_shapes(image_path) if use_shapes else []
+            if not regions:
+                regions = self.split_image_adaptive(image_path, target_regions)
         
         if not regions:
             print("❌ 이미지 분할 실패")
@@ -282,27 +301,52 @@ Find text inside hand-drawn circles or ellipses only. Ignore rectangular boxes a
         output_dir = "output/grid_regions"
         self.save_region_images(regions, output_dir, base_name)
         
-        # 각 영역을 AI로 처리
+        # 각 영역을 AI로 처리 (겹치는 영역의 중복 결과는 병합)
+        from image_handle import ImageHandle
+        from result_merger import ResultMerger, content_box
+        from region_gate import create_blank_gate
+        
         print(f"\n🤖 각 영역을 AI로 처리 중...")
+        handle = ImageHandle.ensure(image_path)
+        merger = ResultMerger(handle=handle)
+        gate = create_blank_gate(handle)
         results = []
         successful_regions = 0
+        blank_regions = 0
         
         for i, region_info in enumerate(regions):
-            row, col = region_info['position']
-            print(f"   영역 ({row},{col}) 처리 중...", end=" ")
+            print(f"   영역 ({region_info['name']}) 처리 중...", end=" ")
+            
+            # 잉크가 거의 없는 빈 여백 영역은 호출 생략
+            if gate is not None and gate.is_blank(region_info['bbox']):
+                results.append(None)
+                blank_regions += 1
+                print(f"⬜ 빈 영역 건너뜀")
+                continue
+            
+            # 이미 응답받은 영역에 내용이 모두 들어 있으면 호출 생략
+            if merger.is_covered(region_info['bbox'], content_box(handle, region_info['bbox'])):
+                results.append(None)
+                print(f"⏭️  이웃 영역에 포함되어 건너뜀")
+                continue
             
+            # 오류와 "없음"이 구분되지 않으므로 텍스트를 받은 영역만 응답받은 영역으로 기록 (merger.add)
             result = self.process_region_with_ai(region_info['image'], region_info)
             
             if result:
                 results.append(result)
                 successful_regions += 1
-                print(f"✅ '{result[:30]}...'")
+                added = merger.add(region_info['name'], region_info['bbox'], result)
+                print(f"✅ '{result[:30]}...' (새 줄 {added}개)")
             else:
                 results.append(None)
                 print(f"❌ 텍스트 없음")
         
         # 결과 통합
-        final_texts = [r for r in results if r]
+        final_texts = merger.texts()
+        print(f"   🧩 결과 병합: {merger.summary()}")
+        if blank_regions:
+            print(f"   ⬜ 빈 영역 건너뜀: {blank_regions}/{len(regions)}개")
         
         if final_texts:
             final_result = "\n".join(final_texts)
@@ -350,8 +394,9 @@ def test_grid_based_ocr():
         test_configs = [
             {"grid_size": (3, 4), "name": "3×4 격자"},
             {"grid_size": (4, 3), "name": "4×3 격자"},
-            {"target_regions": 12, "name": "적응적 12영역"},
-            {"target_regions": 16, "name": "적응적 16영역"}
+            {"target_regions": 12, "use_shapes": False, "name": "적응적 12영역"},
+            {"target_regions": 16, "use_shapes": False, "name": "적응적 16영역"},
+            {"target_regions": 12, "use_shapes": True, "name": "도형 기반 영역"}
         ]
         
         best_result = None
@@ -365,7 +410,8 @@ def test_grid_based_ocr():
                                                     grid_size=config['grid_size'])
             else:
                 result = ocr.process_image_grid_based(test_image, 
-                                                    target_regions=config['target_regions'])
+                                                    target_regions=config['target_regions'],
+                                                    use_shapes=config['use_shapes'])
             
             if result:
                 text_count = len(result.split('\n'))
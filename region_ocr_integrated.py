@@ -36,13 +36,14 @@ class RegionOCRProcessor:
         
         print(f"✅ {len(selector.regions)}개 영역 선택 완료")
         
-        # 2단계: 영역 크롭
-        print("\n2️⃣ 영역 크롭 단계")
-        success = selector.crop_regions()
-        
-        if not success:
-            print("❌ 영역 크롭 실패")
-            return False
+        # 2단계: 영역 크롭 파일 저장 (선택 사항 - OCR은 메모리의 크롭을 바로 사용)
+        if os.getenv('SAVE_CROPPED_REGIONS', 'false').lower() == 'true':
+            print("\n2️⃣ 영역 크롭 단계")
+            success = selector.crop_regions()
+            
+            if not success:
+                print("❌ 영역 크롭 실패")
+                return False
         
         # 3단계: OCR 처리
         print("\n3️⃣ OCR 처리 단계")
@@ -52,12 +53,20 @@ class RegionOCRProcessor:
         """크롭된 영역들을 OCR 처리"""
         try:
             from cloud_ocr import CloudOCRProcessor
+            from image_handle import ImageHandle
             
             # OCR 프로세서 초기화
             ocr_processor = CloudOCRProcessor(self.api_key, self.model_name)
             
             # 출력 디렉토리
             output_dir = "output/cropped_regions"
+            os.makedirs(output_dir, exist_ok=True)
+            
+            # 선택기가 이미 읽은 원본 이미지 재사용
+            image = getattr(selector, 'image_handle', None)
+            if image is None:
+                image = ImageHandle.from_array(selector.original_image, bgr=True, path=selector.image_path)
+            cropped_files = getattr(selector, 'cropped_files', {})
             
             results = []
             successful_count = 0
@@ -66,25 +75,13 @@ class RegionOCRProcessor:
                 region_name = region['name']
                 print(f"\n🤖 {region_name} OCR 처리 중...")
                 
-                # 크롭된 이미지 파일 찾기
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                base_name = os.path.splitext(os.path.basename(selector.image_path))[0]
-                
-                # 가장 최근 파일 찾기
-                import glob
-                pattern = os.path.join(output_dir, f"{base_name}_{region_name}_*.png")
-                cropped_files = glob.glob(pattern)
-                
-                if not cropped_files:
-                    print(f"❌ 크롭된 파일을 찾을 수 없음: {region_name}")
-                    continue
-                
-                # 가장 최근 파일 선택
-                cropped_file = max(cropped_files, key=os.path.getctime)
+                # 영역 크롭 (원본 버퍼의 뷰, 파일을 다시 읽지 않음)
+                cropped = image.crop(region['original_coords'])
+                cropped_file = cropped_files.get(region_name)
                 
                 try:
                     # OCR 처리 (tuple 처리 포함)
-                    result_tuple = ocr_processor.process_image(cropped_file, "shape_detection")
+                    result_tuple = ocr_processor.process_image(cropped, "shape_detection")
                     
                     # measure_time 데코레이터 때문에 tuple이 반환될 수 있음
                     if isinstance(result_tuple, tuple) and len(result_tuple) == 2:
@@ -101,7 +98,7 @@ class RegionOCRProcessor:
                                 'coordinates': region['original_coords'],
                                 'size': f"{region['width']}×{region['height']}",
                                 'text': result_text.strip(),
-                                'file': os.path.basename(cropped_file),
+                                'file': os.path.basename(cropped_file) if cropped_file else "(메모리 크롭)",
                                 'process_time': process_time
                             })
                             successful_count += 1
@@ -195,34 +192,36 @@ class RegionOCRProcessor:
                 print(f"❌ 원본 이미지를 찾을 수 없습니다: {original_image}")
                 return False
             
-            # 영역들을 다시 크롭
-            import cv2
-            original_img = cv2.imread(original_image)
-            
-            output_dir = "output/cropped_regions"
-            os.makedirs(output_dir, exist_ok=True)
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            base_name = os.path.splitext(os.path.basename(original_image))[0]
+            # 원본 이미지는 한 번만 디코딩 (크롭은 메모리에서 처리)
+            from image_handle import ImageHandle
+            image = ImageHandle.from_path(original_image)
+            cropped_files = {}
             
-            # 각 영역 크롭
-            for region in regions:
-                x1, y1, x2, y2 = region['original_coords']
-                cropped = original_img[y1:y2, x1:x2]
+            # 크롭 파일 저장은 선택 사항
+            if os.getenv('SAVE_CROPPED_REGIONS', 'false').lower() == 'true':
+                output_dir = "output/cropped_regions"
+                os.makedirs(output_dir, exist_ok=True)
                 
-                filename = f"{base_name}_{region['name']}_{timestamp}.png"
-                filepath = os.path.join(output_dir, filename)
-                cv2.imwrite(filepath, cropped)
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                base_name = os.path.splitext(os.path.basename(original_image))[0]
                 
-                print(f"💾 {region['name']} 크롭 완료")
+                for region in regions:
+                    filename = f"{base_name}_{region['name']}_{timestamp}.png"
+                    filepath = os.path.join(output_dir, filename)
+                    image.crop(region['original_coords']).pil.save(filepath)
+                    cropped_files[region['name']] = filepath
+                    
+                    print(f"💾 {region['name']} 크롭 완료")
             
             # OCR 처리를 위한 가짜 selector 객체 생성
             class FakeSelector:
-                def __init__(self, image_path, regions):
+                def __init__(self, image_path, regions, image_handle, cropped_files):
                     self.image_path = image_path
                     self.regions = regions
+                    self.image_handle = image_handle
+                    self.cropped_files = cropped_files
             
-            fake_selector = FakeSelector(original_image, regions)
+            fake_selector = FakeSelector(original_image, regions, image, cropped_files)
             return self.process_cropped_regions(fake_selector)
             
         except Exception as e:
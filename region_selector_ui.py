@@ -23,6 +23,7 @@ class RegionSelector:
         
         self.display_image = self.original_image.copy()
         self.regions = []
+        self.cropped_files = {}  # 영역 이름 → 저장된 크롭 파일 경로
         self.current_region = None
         self.drawing = False
         self.start_point = None
@@ -191,6 +192,7 @@ class RegionSelector:
             # 저장
             cv2.imwrite(filepath, cropped)
             cropped_files.append(filepath)
+            self.cropped_files[region['name']] = filepath
             
             print(f"💾 {region['name']} 저장: {filename} ({region['width']}×{region['height']})")
         
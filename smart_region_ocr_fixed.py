@@ -38,28 +38,10 @@ class SmartRegionOCR:
 
 위치가 파악되면 그 영역들을 어떻게 나누면 좋을지도 제안해주세요."""
 
-            # 기존 CloudOCRProcessor의 단일 이미지 처리 사용
-            import base64
-            with open(image_path, "rb") as image_file:
-                base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+            # 공유 API 클라이언트로 전체 이미지 전송 (위치 설명만 필요하므로 작게 인코딩)
+            image_bytes = processor.payload.encode(image_path, "location")
             
-            messages = [
-                {
-                    "role": "user", 
-                    "content": [
-                        {"image": f"data:image/jpeg;base64,{base64_image}"},
-                        {"text": location_prompt}
-                    ]
-                }
-            ]
-            
-            import dashscope
-            dashscope.api_key = self.api_key
-            
-            response = dashscope.MultiModalConversation.call(
-                model=self.model_name,
-                messages=messages
-            )
+            response = processor.client.ocr_sync(image_bytes, location_prompt, self.model_name)
             
             if response and response.status_code == 200:
                 content = response.output.choices[0].message.content
@@ -196,16 +178,24 @@ class SmartRegionOCR:
             print("❌ 영역 생성 실패")
             return None
         
-        # 3단계: 각 영역 처리
-        from PIL import Image
+        # 3단계: 각 영역 처리 (원본은 한 번만 디코딩)
         from cloud_ocr import CloudOCRProcessor
+        from image_handle import ImageHandle
+        from result_merger import ResultMerger, content_box
+        from region_gate import create_blank_gate
         
-        img = Image.open(image_path)
+        img = ImageHandle.from_path(image_path)
+        save_crops = os.getenv('SAVE_CROPPED_REGIONS', 'false').lower() == 'true'
         processor = CloudOCRProcessor(self.api_key, self.model_name)
         
-        all_results = []
+        # 오버랩 영역의 중복 결과 병합 + 이미 처리한 영역에 내용이 모두 들어 있는 영역은 생략
+        merger = ResultMerger(handle=img)
         successful_regions = 0
         
+        # 잉크가 거의 없는 빈 여백 영역은 호출 생략
+        gate = create_blank_gate(img)
+        blank_regions = 0
+        
         # 우선순위별로 처리
         regions.sort(key=lambda x: x['priority'])
         
@@ -215,24 +205,33 @@ class SmartRegionOCR:
             
             print(f"🤖 {name} 영역 처리 중... ({x1},{y1})→({x2},{y2})")
             
+            if gate is not None and gate.is_blank(region['bbox']):
+                blank_regions += 1
+                print(f"⬜ {name}: 빈 영역 건너뜀")
+                continue
+            
+            if merger.is_covered(region['bbox'], content_box(img, region['bbox'])):
+                print(f"⏭️  {name}: 이전 영역에 내용이 모두 포함되어 건너뜀")
+                continue
+            
             try:
-                # 영역 크롭
+                # 영역 크롭 (메모리의 뷰를 바로 인코딩)
                 cropped = img.crop((x1, y1, x2, y2))
                 
-                # 임시 저장
-                os.makedirs("output/smart_regions", exist_ok=True)
-                temp_path = f"output/smart_regions/{name}.png"
-                cropped.save(temp_path)
+                # 디버그용 크롭 파일 저장 (선택 사항)
+                if save_crops:
+                    os.makedirs("output/smart_regions", exist_ok=True)
+                    cropped.pil.save(f"output/smart_regions/{name}.png")
                 
                 # AI 처리 - process_image 대신 직접 처리하여 tuple 문제 해결
-                result = self._process_region_directly(temp_path, processor)
+                result = self._process_region_directly(cropped, processor)
                 
                 if result and len(result.strip()) > 5:
-                    # 중복 제거 (이전 결과와 비교)
-                    if not any(result.strip() in existing for existing in all_results):
-                        all_results.append(result.strip())
+                    # 중복 제거 (겹치는 이전 영역의 비슷한 줄과 병합)
+                    added = merger.add(name, region['bbox'], result)
+                    if added:
                         successful_regions += 1
-                        print(f"✅ {name}: '{result.strip()[:30]}...'")
+                        print(f"✅ {name}: '{result.strip()[:30]}...' (새 줄 {added}개)")
                     else:
                         print(f"🔄 {name}: 중복 결과 제외")
                 else:
@@ -243,6 +242,10 @@ class SmartRegionOCR:
                 continue
         
         # 결과 통합
+        all_results = merger.texts()
+        print(f"🧩 결과 병합: {merger.summary()}")
+        if blank_regions:
+            print(f"⬜ 빈 영역 건너뜀: {blank_regions}/{len(regions)}개")
         if all_results:
             final_result = "\n".join(all_results)
             
@@ -257,13 +260,9 @@ class SmartRegionOCR:
             return None
 
     def _process_region_directly(self, image_path, processor):
-        """영역을 직접 처리하여 tuple 문제 해결"""
+        """영역을 직접 처리하여 tuple 문제 해결 (경로 또는 ImageHandle)"""
         try:
-            import base64
-            
-            # 이미지를 base64로 인코딩
-            with open(image_path, "rb") as image_file:
-                base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+            image_bytes = processor.payload.encode(image_path, "hybrid")
             
             # 원형/타원형 감지에 특화된 프롬프트
             prompt_text = """이 이미지 영역에서 수기로 그어진 원형이나 타원형 도형 안에 있는 텍스트만 찾아 추출해주세요.
@@ -285,21 +284,7 @@ class SmartRegionOCR:
 
 Find text inside hand-drawn circles or ellipses only. Ignore rectangular boxes and plain text."""
             
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"image": f"data:image/png;base64,{base64_image}"},
-                        {"text": prompt_text}
-                    ]
-                }
-            ]
-            
-            import dashscope
-            response = dashscope.MultiModalConversation.call(
-                model=processor.model_name,
-                messages=messages
-            )
+            response = processor._call_model(image_bytes, prompt_text)
             
             # 응답 처리 - response_utils 사용
             from response_utils import extract_text_from_response
@@ -400,7 +385,7 @@ def main():
         print("   ✅ tuple 오류 수정")
         
         print(f"\n📁 생성된 파일들:")
-        print("   output/smart_regions/ - 각 영역별 이미지")
+        print("   output/smart_regions/ - 각 영역별 이미지 (SAVE_CROPPED_REGIONS=true일 때)")
         print("   output/smart_region_result_fixed.txt - 최종 결과")
         
     else:
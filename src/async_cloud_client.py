@@ -0,0 +1,189 @@
+"""
+비동기 Qwen Cloud API 클라이언트 - 연결 재사용 + asyncio 기반 동시 요청
+
+dashscope.MultiModalConversation.call 대신 HTTP API를 직접 호출함.
+하나의 이벤트 루프와 세션을 공유하므로 스레드를 늘리지 않고도 많은 요청을 겹쳐 보낼 수 있음.
+동기 코드에서는 call_sync / ocr_sync 로 같은 루프에 요청을 넘겨서 사용
+"""
+
+import os
+import asyncio
+import base64
+import threading
+
+import aiohttp
+
+from network_advanced import configure_advanced_ssl
+
+DEFAULT_BASE_URL = 'https://dashscope-intl.aliyuncs.com/api/v1'
+GENERATION_PATH = '/services/aigc/multimodal-generation/generation'
+
+# 재시도할 HTTP 상태 코드
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def detect_image_mime(image_bytes):
+    """이미지 바이트의 시그니처로 MIME 타입 판별"""
+    if image_bytes.startswith(b'\x89PNG'):
+        return "image/png"
+    if image_bytes.startswith(b'\xff\xd8'):
+        return "image/jpeg"
+    if image_bytes[:4] == b'RIFF' and image_bytes[8:12] == b'WEBP':
+        return "image/webp"
+    if image_bytes.startswith(b'BM'):
+        return "image/bmp"
+    if image_bytes[:4] in (b'II*\x00', b'MM\x00*'):
+        return "image/tiff"
+    return "image/jpeg"
+
+
+def build_image_message(image_bytes, prompt):
+    """이미지 + 프롬프트로 구성된 사용자 메시지 생성"""
+    base64_image = base64.b64encode(image_bytes).decode('utf-8')
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"image": f"data:{detect_image_mime(image_bytes)};base64,{base64_image}"},
+                {"text": prompt}
+            ]
+        }
+    ]
+
+
+class _Attr:
+    """딕셔너리를 속성 접근 방식으로 감싸는 객체 (dashscope 응답과 호환)"""
+
+    def __init__(self, data):
+        for key, value in data.items():
+            if isinstance(value, dict):
+                value = _Attr(value)
+            elif key == "choices" and isinstance(value, list):
+                value = [_Attr(item) if isinstance(item, dict) else item for item in value]
+            setattr(self, key, value)
+
+    def __getattr__(self, name):
+        return None
+
+
+class CloudResponse:
+    """
+    API 응답 객체
+
+    dashscope 응답과 같은 status_code / code / message / output.choices[0].message.content
+    구조를 제공하므로 response_utils.extract_text_from_response를 그대로 사용할 수 있음
+    """
+
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.request_id = data.get("request_id")
+        self.code = data.get("code", "")
+        self.message = data.get("message", "")
+        self.output = _Attr(data.get("output") or {})
+        self.usage = data.get("usage")
+
+
+class AsyncCloudClient:
+    """Qwen Cloud 멀티모달 API 비동기 클라이언트"""
+
+    def __init__(self, api_key, base_url=None, max_connections=32, timeout=120, max_retries=3):
+        self.api_key = api_key
+        self.base_url = (base_url or os.getenv('QWEN_API_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._session = None
+        self._loop = None
+        self._loop_thread = None
+        self._loop_lock = threading.Lock()
+
+    async def _get_session(self):
+        """세션 생성 (연결 풀 재사용)"""
+        if self._session is None or self._session.closed:
+            ssl_context = configure_advanced_ssl() if self.base_url.startswith("https") else False
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                ssl=ssl_context if ssl_context is not None else True,
+                keepalive_timeout=60
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                }
+            )
+        return self._session
+
+    async def call(self, model, messages):
+        """메시지 목록으로 모델 호출 - CloudResponse 반환"""
+        session = await self._get_session()
+        payload = {"model": model, "input": {"messages": messages}, "parameters": {}}
+        url = self.base_url + GENERATION_PATH
+
+        for attempt in range(self.max_retries):
+            try:
+                async with session.post(url, json=payload) as response:
+                    try:
+                        data = await response.json(content_type=None)
+                    except ValueError:
+                        data = {"code": "InvalidResponse", "message": (await response.text())[:200]}
+
+                    if response.status in RETRY_STATUS_CODES and attempt < self.max_retries - 1:
+                        await asyncio.sleep(2 * (attempt + 1))
+                        continue
+
+                    return CloudResponse(response.status, data or {})
+
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(2 * (attempt + 1))
+                    continue
+                raise ConnectionError(f"API 연결 실패: {e}") from e
+
+    async def ocr(self, image_bytes, prompt, model):
+        """이미지 바이트 + 프롬프트로 OCR 요청"""
+        return await self.call(model, build_image_message(image_bytes, prompt))
+
+    async def close(self):
+        """세션 종료"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _ensure_loop(self):
+        """동기 호출용 백그라운드 이벤트 루프 시작"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name="cloud-client-loop", daemon=True
+                )
+                self._loop_thread.start()
+        return self._loop
+
+    def run_sync(self, coroutine):
+        """코루틴을 백그라운드 루프에서 실행하고 결과를 기다림"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop()).result()
+
+    def call_sync(self, model, messages):
+        """call()의 동기 버전"""
+        return self.run_sync(self.call(model, messages))
+
+    def ocr_sync(self, image_bytes, prompt, model):
+        """ocr()의 동기 버전"""
+        return self.run_sync(self.ocr(image_bytes, prompt, model))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_cloud_client(api_key, base_url=None):
+    """API 키/엔드포인트별 공유 클라이언트 반환"""
+    key = (api_key, base_url or os.getenv('QWEN_API_BASE_URL') or DEFAULT_BASE_URL)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = AsyncCloudClient(api_key, base_url=base_url)
+        return _clients[key]
@@ -0,0 +1,116 @@
+"""
+다단계 배치 파이프라인 - 단계별 작업자 풀 + 제한된 큐 + 토큰 버킷 속도 제한
+"""
+
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class TokenBucket:
+    """
+    토큰 버킷 속도 제한기
+
+    초당 rate개의 토큰이 채워지며 최대 capacity개까지 쌓임.
+    acquire()는 토큰이 생길 때까지 대기하므로 실제 API 허용량만큼만 호출이 나감
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, tokens=1):
+        """토큰을 얻을 때까지 대기 (rate가 0 이하면 제한 없음)"""
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait_time = (tokens - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class StagedPipeline:
+    """
+    단계별 파이프라인
+
+    각 단계는 (이름, 함수, 작업자 수) 로 정의되며, 단계 사이는 크기가 제한된 큐로 연결됨.
+    함수는 작업 딕셔너리를 받아 다음 단계로 넘길 작업 딕셔너리를 반환함.
+    예외가 발생한 작업은 'error' 키에 예외를 담아 이후 단계를 건너뛰고 그대로 전달됨
+    """
+
+    def __init__(self, stages, queue_size=8):
+        self.stages = stages
+        self.queue_size = queue_size
+
+    def _run_stage(self, name, func, in_queue, out_queue):
+        while True:
+            job = in_queue.get()
+            if job is _STOP:
+                in_queue.put(_STOP)  # 같은 단계의 다른 작업자에게도 종료 전달
+                return
+
+            if job.get('error') is None:
+                try:
+                    job = func(job)
+                except Exception as e:
+                    job['error'] = e
+                    job['failed_stage'] = name
+
+            out_queue.put(job)
+
+    def run(self, items):
+        """
+        items를 파이프라인에 흘려보내고, 끝난 작업을 완료 순서대로 yield
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        stage_threads = []
+
+        for index, (name, func, workers) in enumerate(self.stages):
+            threads = []
+            for worker_index in range(max(1, workers)):
+                thread = threading.Thread(
+                    target=self._run_stage,
+                    args=(name, func, queues[index], queues[index + 1]),
+                    name=f"{name}-{worker_index}",
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+            stage_threads.append(threads)
+
+        def feed():
+            for item in items:
+                queues[0].put(item)
+            queues[0].put(_STOP)
+
+        def close_stages():
+            # 앞 단계가 모두 끝나면 다음 단계에 종료 신호 전달
+            for index, threads in enumerate(stage_threads):
+                for thread in threads:
+                    thread.join()
+                queues[index + 1].put(_STOP)
+
+        threading.Thread(target=feed, daemon=True).start()
+        threading.Thread(target=close_stages, daemon=True).start()
+
+        output = queues[-1]
+        while True:
+            job = output.get()
+            if job is _STOP:
+                break
+            yield job
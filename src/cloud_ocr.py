@@ -2,12 +2,12 @@
 Qwen Cloud API를 사용한 OCR 처리 (개선된 버전)
 """
 
-import dashscope
-import base64
 import os
+import math
 from PIL import Image
 from tqdm import tqdm
 import time
+import threading
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -17,17 +17,53 @@ from network_utils import configure_ssl, create_robust_session
 from network_advanced import create_permissive_session, configure_advanced_ssl
 from endpoint_config import configure_international_endpoint
 from response_utils import extract_text_from_response, debug_response_structure
+from parallel_utils import run_bounded, get_env_int
+from batch_pipeline import TokenBucket, StagedPipeline
+from ocr_cache import get_ocr_cache
+from image_handle import ImageHandle
+from async_cloud_client import get_cloud_client
+from payload_optimizer import get_payload_optimizer
+from result_merger import ResultMerger, content_box, NO_TEXT_RESPONSES
+from region_gate import create_blank_gate
 
 class CloudOCRProcessor:
-    def __init__(self, api_key, model_name="qwen-vl-plus"):
+    def __init__(self, api_key, model_name="qwen-vl-plus", max_concurrent_regions=None):
         self.api_key = api_key
         self.model_name = model_name
         
+        # 하이브리드 모드에서 동시에 처리할 최대 영역 수
+        if max_concurrent_regions is None:
+            max_concurrent_regions = get_env_int('MAX_CONCURRENT_REGIONS', 4)
+        self.max_concurrent_regions = max_concurrent_regions
+        
+        # 영역 하나당 최대 대기 시간 (초, 0이면 무제한)
+        self.region_timeout = get_env_int('REGION_TIMEOUT', 0) or None
+        
+        # API 호출 속도 제한 (초당 호출 수, 0이면 제한 없음)
+        try:
+            api_rate = float(os.getenv('API_RATE_LIMIT', '2'))
+        except ValueError:
+            api_rate = 2.0
+        self.rate_limiter = TokenBucket(api_rate, capacity=get_env_int('API_RATE_BURST', 2))
+        
+        # 이미지 해시 기반 결과 캐시
+        self.cache = get_ocr_cache()
+        
+        # 모드별 요청 이미지 형식/품질/크기 선택
+        self.payload = get_payload_optimizer()
+        
+        # 하이브리드 모드 영역 계획용 도형 감지기 (처음 필요할 때 생성)
+        self.shape_detector = None
+        
+        # 하이브리드 모드 영역 통계 (빈 영역 / 이웃 영역에 포함되어 건너뛴 영역 수)
+        self.region_stats = {'regions': 0, 'sent': 0, 'blank_skipped': 0, 'covered_skipped': 0}
+        self._region_stats_lock = threading.Lock()
+        
         # 국제 엔드포인트 설정 먼저
         configure_international_endpoint()
         
-        # dashscope API 키 설정
-        dashscope.api_key = api_key
+        # 연결을 재사용하는 비동기 API 클라이언트 (공유)
+        self.client = get_cloud_client(api_key)
         
         # SSL 및 네트워크 설정 (관대한 모드)
         configure_advanced_ssl()
@@ -43,13 +79,17 @@ class CloudOCRProcessor:
             print(f"🔄 OCR 모드 변경: {mode}")
         else:
             print(f"⚠️  지원되지 않는 모드: {mode}. shape_detection, general, hybrid만 가능합니다.")
+    
+    def set_max_concurrent_regions(self, max_regions):
+        """하이브리드 모드 동시 처리 영역 수 설정"""
+        self.max_concurrent_regions = max(1, int(max_regions))
+        print(f"🔄 동시 처리 영역 수 변경: {self.max_concurrent_regions}")
 
         
-    def _encode_image(self, image_path):
-        """이미지를 base64로 인코딩"""
+    def _read_image_bytes(self, image, mode="general"):
+        """요청에 담을 이미지 바이트 (모드별 설정으로 최적화, 인코딩 결과는 핸들에 캐시)"""
         try:
-            with open(image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
+            return self.payload.encode(ImageHandle.ensure(image), mode)
         except Exception as e:
             print(f"이미지 인코딩 오류: {e}")
             return None
@@ -103,133 +143,188 @@ Read all visible text in this cropped region. Focus on handwritten and printed t
 Extract all visible text from this image. Return only the actual text content, not coordinates."""
     
     def _crop_image_intelligently(self, image_path, target_size=(1024, 1024)):
-        """이미지를 지능적으로 크롭하여 OCR 성능 향상"""
+        """
+        이미지를 지능적으로 크롭하여 OCR 성능 향상 (경로 또는 ImageHandle)
+        
+        Returns:
+            중앙 크롭 ImageHandle (디코딩된 버퍼의 뷰, 파일을 쓰지 않음). 크롭이 필요없으면 None
+        """
         try:
-            with Image.open(image_path) as img:
-                width, height = img.size
+            handle = ImageHandle.ensure(image_path)
+            width, height = handle.size
+            
+            # 이미지가 너무 크면 중앙 부분을 크롭
+            if width > target_size[0] * 2 or height > target_size[1] * 2:
+                # 중앙에서 target_size 크기로 크롭
+                left = (width - target_size[0]) // 2
+                top = (height - target_size[1]) // 2
+                right = left + target_size[0]
+                bottom = top + target_size[1]
                 
-                # 이미지가 너무 크면 중앙 부분을 크롭
-                if width > target_size[0] * 2 or height > target_size[1] * 2:
-                    # 중앙에서 target_size 크기로 크롭
-                    left = (width - target_size[0]) // 2
-                    top = (height - target_size[1]) // 2
-                    right = left + target_size[0]
-                    bottom = top + target_size[1]
-                    
-                    # 경계 체크
-                    left = max(0, left)
-                    top = max(0, top)
-                    right = min(width, right)
-                    bottom = min(height, bottom)
-                    
-                    cropped = img.crop((left, top, right, bottom))
-                    
-                    # 임시 파일로 저장
-                    import tempfile
-                    temp_dir = tempfile.gettempdir()
-                    temp_path = os.path.join(temp_dir, f"cropped_{os.path.basename(image_path)}")
-                    cropped.save(temp_path)
-                    
-                    print(f"🔍 이미지 크롭됨: {width}x{height} → {cropped.size[0]}x{cropped.size[1]}")
-                    return temp_path
+                # 경계 체크는 crop()에서 처리
+                cropped = handle.crop((left, top, right, bottom))
+                
+                print(f"🔍 이미지 크롭됨: {width}x{height} → {cropped.size[0]}x{cropped.size[1]}")
+                return cropped
                     
-            return image_path  # 크롭이 필요없으면 원본 경로 반환
+            return None  # 크롭이 필요없음
             
         except Exception as e:
             print(f"⚠️  이미지 크롭 실패: {e}")
-            return image_path
+            return None
     
     def process_image_hybrid(self, image_path):
-        """하이브리드 방식: 그리드 기반 영역 분할 + AI 처리"""
+        """하이브리드 방식: 감지된 도형을 묶은 영역 (도형이 없으면 그리드) + AI 처리"""
         try:
-            print(f"🤖 하이브리드 모드 시작: {os.path.basename(image_path)}")
-            print(f"📝 방식: 그리드 기반 영역 분할 (OpenCV 대체)")
+            handle = ImageHandle.ensure(image_path)
+            print(f"🤖 하이브리드 모드 시작: {handle.name}")
+            
+            source_hash = handle.sha256 if self.cache.enabled else None
+            
+            # 영역 계획 (이미 디코딩된 버퍼로 도형 감지)
+            plan = self._plan_hybrid_regions(handle)
+            if plan['source'] == "shapes":
+                print(f"📝 방식: 도형 기반 영역 - 도형 {plan['shapes']}개 → {len(plan['regions'])}개 영역")
+            else:
+                print(f"📝 방식: 그리드 기반 영역 분할 ({len(plan['regions'])}개 영역, 감지된 도형 없음)")
+            regions = [(region['name'], region['box']) for region in plan['regions']]
             
-            # 그리드 기반 처리를 위한 모듈 import
-            from PIL import Image
-            import math
+            # 겹치는 영역 결과 병합 (경계에서 잘린 조각 판정에 페이지 잉크 사용)
+            merger = ResultMerger(handle=handle)
             
-            # 이미지 로드 및 기본 정보
-            img = Image.open(image_path)
-            width, height = img.size
+            # 잉크가 거의 없는 빈 여백 영역은 호출 생략 (적분 이미지로 영역당 O(1) 판정)
+            gate = create_blank_gate(handle)
+            blank = {name for name, box in regions if gate is not None and gate.is_blank(box)}
             
-            # 적응적 그리드 크기 결정 (12개 영역 목표)
-            target_regions = 12
-            aspect_ratio = width / height
-            cols = math.ceil(math.sqrt(target_regions * aspect_ratio))
-            rows = math.ceil(target_regions / cols)
+            # 내용이 계획 순서상 앞선 영역에 모두 들어 있는 영역은 호출 생략
+            # (완료 순서와 관계없이 실행마다 같은 영역을 건너뜀)
+            coverers = merger.plan_coverage([
+                (name, box, content_box(handle, box)) for name, box in regions if name not in blank
+            ])
             
-            print(f"🔍 이미지 분할: {cols}×{rows} 그리드 ({cols*rows}개 영역)")
+            def process_region(region_spec):
+                name, box = region_spec
+                if name in blank or name in coverers:
+                    return None
+                # 영역 크롭 후 AI로 처리
+                return self._process_grid_region(handle.crop(box), name, source_hash=source_hash, box=box)
             
-            # 그리드 영역 생성
-            grid_width = width // cols
-            grid_height = height // rows
-            overlap_ratio = 0.1
-            overlap_w = int(grid_width * overlap_ratio)
-            overlap_h = int(grid_height * overlap_ratio)
+            def region_failed(index):
+                region_text, error = region_results[index]
+                return error is not None or (region_text or "").startswith("이미지 처리 중 오류")
+            
+            # 영역들을 동시에 처리 (동시 실행 수 제한, 결과는 계획 순서 유지)
+            print(f"🤖 {len(regions)}개 영역 동시 처리 중 (최대 {self.max_concurrent_regions}개)...")
+            timeout = None
+            if self.region_timeout:
+                # 영역당 제한 시간 × 순차 처리 묶음 수
+                timeout = self.region_timeout * math.ceil(len(regions) / self.max_concurrent_regions)
+            region_results = run_bounded(
+                process_region, regions,
+                max_workers=self.max_concurrent_regions,
+                timeout=timeout
+            )
+            
+            # 포함하는 영역이 실패했으면 건너뛴 영역을 직접 처리
+            indices = {name: index for index, (name, _) in enumerate(regions)}
+            retry = [index for index, (name, _) in enumerate(regions)
+                     if name in coverers and region_failed(indices[coverers[name]])]
+            if retry:
+                print(f"🔁 포함하는 영역이 실패해서 건너뛴 영역 {len(retry)}개 다시 처리")
+                for name in (regions[index][0] for index in retry):
+                    del coverers[name]
+                retry_results = run_bounded(
+                    process_region, [regions[index] for index in retry],
+                    max_workers=self.max_concurrent_regions,
+                    timeout=timeout
+                )
+                for index, result in zip(retry, retry_results):
+                    region_results[index] = result
+            skipped = set(coverers)
+            merger.record_skipped(len(skipped))
             
-            all_texts = []
             successful_regions = 0
             
-            # 각 영역 처리
-            for row in range(rows):
-                for col in range(cols):
-                    try:
-                        # 영역 좌표 계산
-                        start_x = max(0, col * grid_width - overlap_w)
-                        start_y = max(0, row * grid_height - overlap_h)
-                        end_x = min(width, (col + 1) * grid_width + overlap_w)
-                        end_y = min(height, (row + 1) * grid_height + overlap_h)
-                        
-                        # 영역 크롭
-                        region = img.crop((start_x, start_y, end_x, end_y))
-                        
-                        print(f"🤖 영역 ({row},{col}) 처리 중...")
-                        
-                        # AI로 영역 처리
-                        region_text = self._process_grid_region(region, row, col)
-                        
-                        if region_text and region_text.strip() and not region_text.startswith("이미지 처리 중 오류"):
-                            # "없음" 같은 응답 필터링
-                            if region_text.lower() not in ['없음', 'none', 'no text', 'no circles', '원형 없음']:
-                                all_texts.append(region_text.strip())
-                                successful_regions += 1
-                                print(f"✅ 영역 ({row},{col}): '{region_text.strip()[:30]}...'")
-                            else:
-                                print(f"❌ 영역 ({row},{col}): 원형 텍스트 없음")
-                        else:
-                            print(f"❌ 영역 ({row},{col}): 텍스트 추출 실패")
-                            
-                    except Exception as e:
-                        print(f"❌ 영역 ({row},{col}) 처리 오류: {e}")
-                        continue
+            # 병합은 완료 순서가 아닌 계획 순서로 (결과 줄 순서가 실행마다 같도록)
+            for (name, box), (region_text, error) in zip(regions, region_results):
+                if error is not None:
+                    print(f"❌ 영역 ({name}) 처리 오류: {error}")
+                    continue
+                
+                if name in blank:
+                    print(f"⬜ 영역 ({name}): 빈 영역 건너뜀")
+                elif name in skipped:
+                    print(f"⏭️  영역 ({name}): 이웃 영역에 포함되어 건너뜀")
+                elif region_text and region_text.strip() and not region_text.startswith("이미지 처리 중 오류"):
+                    # "없음" 같은 응답 필터링
+                    if region_text.lower() not in NO_TEXT_RESPONSES:
+                        added = merger.add(name, box, region_text)
+                        successful_regions += 1
+                        print(f"✅ 영역 ({name}): '{region_text.strip()[:30]}...' (새 줄 {added}개)")
+                    else:
+                        print(f"❌ 영역 ({name}): 원형 텍스트 없음")
+                else:
+                    print(f"❌ 영역 ({name}): 텍스트 추출 실패")
+            
+            all_texts = merger.texts()
+            print(f"🧩 결과 병합: {merger.summary()}")
+            if blank:
+                print(f"⬜ 빈 영역 건너뜀: {len(blank)}/{len(regions)}개")
+            self._record_region_stats(len(regions), len(blank), len(skipped))
             
             # 결과 정리
             if all_texts:
                 final_result = "\n".join(all_texts)
-                print(f"🎉 그리드 처리 완료: {successful_regions}/{cols*rows}개 영역 성공")
+                print(f"🎉 영역 처리 완료: {successful_regions}/{len(regions)}개 영역 성공")
                 print(f"📝 총 추출 텍스트 길이: {len(final_result)}자")
                 return final_result
             else:
                 print(f"⚠️  모든 영역에서 원형 텍스트 추출 실패. 일반 모드로 대체")
-                return self._process_single_image_fallback(image_path, "general")
+                return self._process_single_image_fallback(handle, "general")
                 
         except Exception as e:
             print(f"❌ 그리드 처리 오류: {e}")
             return self._process_single_image_fallback(image_path, "general")
     
-    def _process_grid_region(self, region_image, row, col):
-        """그리드 영역 개별 처리"""
+    def _record_region_stats(self, regions, blank_skipped, covered_skipped):
+        """하이브리드 영역 통계 누적 (파이프라인 작업자에서 동시에 호출됨)"""
+        with self._region_stats_lock:
+            self.region_stats['regions'] += regions
+            self.region_stats['sent'] += regions - blank_skipped - covered_skipped
+            self.region_stats['blank_skipped'] += blank_skipped
+            self.region_stats['covered_skipped'] += covered_skipped
+    
+    def _write_region_summary(self, f):
+        """summary.txt에 하이브리드 영역 통계 기록 (하이브리드 처리가 없었으면 생략)"""
+        with self._region_stats_lock:
+            stats = dict(self.region_stats)
+        if not stats['regions']:
+            return
+        f.write("=== 하이브리드 영역 ===\n")
+        f.write(f"전체 영역: {stats['regions']}개, 전송: {stats['sent']}개\n")
+        f.write(f"빈 영역 건너뜀: {stats['blank_skipped']}개\n")
+        f.write(f"이웃 영역에 포함되어 건너뜀: {stats['covered_skipped']}개\n\n")
+    
+    def _plan_hybrid_regions(self, handle):
+        """
+        하이브리드 모드 영역 계획 (region_planner.plan_regions 결과)
+        
+        HYBRID_REGION_MODE=grid면 도형 감지 없이 기존 고정 그리드 (목표 12개 영역)
+        """
+        from region_planner import plan_regions, grid_plan
+        
+        if os.getenv('HYBRID_REGION_MODE', 'shapes').lower() == "grid":
+            return grid_plan(handle.width, handle.height)
+        
+        # 감지기는 처리기마다 하나만 만들어 재사용
+        if self.shape_detector is None:
+            from hybrid_shape_detector import HybridShapeDetector
+            self.shape_detector = HybridShapeDetector()
+        return plan_regions(handle, detector=self.shape_detector, max_pixels=self.payload.max_pixels)
+    
+    def _process_grid_region(self, region_image, name, source_hash=None, box=None):
+        """하이브리드 영역 개별 처리 (source_hash/box가 있으면 캐시 사용)"""
         try:
-            import base64
-            import io
-            
-            # 이미지를 base64로 인코딩
-            img_buffer = io.BytesIO()
-            region_image.save(img_buffer, format='PNG')
-            img_buffer.seek(0)
-            base64_image = base64.b64encode(img_buffer.read()).decode('utf-8')
-            
             # 원형/타원형 감지에 특화된 프롬프트
             prompt_text = """이 이미지 영역에서 수기로 그어진 원형이나 타원형 도형 안에 있는 텍스트만 찾아 추출해주세요.
 
@@ -250,24 +345,24 @@ Extract all visible text from this image. Return only the actual text content, n
 
 Find text inside hand-drawn circles or ellipses only. Ignore rectangular boxes and plain text."""
             
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"image": f"data:image/png;base64,{base64_image}"},
-                        {"text": prompt_text}
-                    ]
-                }
-            ]
+            # 캐시 확인
+            cache_key = None
+            if source_hash and box:
+                cache_key = self.cache.make_key(source_hash, self.model_name, "hybrid_region", prompt_text, box)
+                cached = self.cache.get(cache_key)
+                if cached:
+                    return cached
             
-            response = dashscope.MultiModalConversation.call(
-                model=self.model_name,
-                messages=messages
-            )
+            # 영역 크롭용 설정으로 인코딩
+            response = self._call_model(self._read_image_bytes(region_image, "hybrid"), prompt_text)
             
             # 새로운 응답 처리 유틸리티 사용
             from response_utils import extract_text_from_response
             result = extract_text_from_response(response)
+            
+            if cache_key and result and self._is_success_result(result):
+                self.cache.put(cache_key, result, self.model_name, "hybrid_region")
+            
             return result if result else "없음"
             
         except Exception as e:
@@ -276,28 +371,15 @@ Find text inside hand-drawn circles or ellipses only. Ignore rectangular boxes a
     def _process_single_image_fallback(self, image_path, mode="general"):
         """단일 이미지 처리 (하이브리드 대체용)"""
         try:
-            # 이미지 인코딩
-            base64_image = self._encode_image(image_path)
-            if not base64_image:
+            # 이미지 읽기
+            image_bytes = self._read_image_bytes(image_path, mode)
+            if not image_bytes:
                 return "이미지 인코딩 실패"
             
             # 모드별 프롬프트 선택
             prompt_text = self._get_prompt_for_mode(mode)
             
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"image": f"data:image/jpeg;base64,{base64_image}"},
-                        {"text": prompt_text}
-                    ]
-                }
-            ]
-            
-            response = dashscope.MultiModalConversation.call(
-                model=self.model_name,
-                messages=messages
-            )
+            response = self._call_model(image_bytes, prompt_text)
             
             # 새로운 응답 처리 유틸리티 사용
             result = extract_text_from_response(response)
@@ -306,60 +388,89 @@ Find text inside hand-drawn circles or ellipses only. Ignore rectangular boxes a
         except Exception as e:
             return f"이미지 처리 중 오류: {e}"
     
+    def _call_model(self, image_bytes, prompt_text):
+        """속도 제한을 적용한 모델 호출 (공유 비동기 클라이언트 사용)"""
+        self.rate_limiter.acquire()
+        return self.client.ocr_sync(image_bytes, prompt_text, self.model_name)
+    
     @measure_time
     def process_image(self, image_path, mode=None):
-        """단일 이미지 OCR 처리 - 모드별 및 크롭 지원"""
+        """단일 이미지 OCR 처리 - 모드별 및 크롭 지원 (경로 또는 ImageHandle)"""
         if mode is None:
             mode = self.ocr_mode
-            
-        max_retries = 3
-        retry_delay = 2
+        
+        # 파일은 한 번만 디코딩하여 모든 단계에서 공유
+        handle = ImageHandle.ensure(image_path)
         
         # 하이브리드 모드인 경우 특별 처리
         if mode == "hybrid":
-            return self.process_image_hybrid(image_path)
+            return self.process_image_hybrid(handle)
+        
+        cache_key, cached = self._lookup_cache(handle, mode)
+        if cached:
+            return cached
         
-        # 원본과 크롭된 이미지 모두 시도
-        image_paths_to_try = [image_path]
+        variants = self._prepare_image_variants(handle, mode)
+        result = self._process_image_variants(variants, mode)
+        self._store_cache(cache_key, result, mode)
+        return result
+    
+    def _lookup_cache(self, handle, mode):
+        """캐시 조회 - (캐시 키, 캐시된 결과 또는 None) 반환"""
+        if not self.cache.enabled:
+            return None, None
         
-        # 이미지가 크면 크롭 버전도 시도
         try:
-            with Image.open(image_path) as img:
-                if img.size[0] > 2048 or img.size[1] > 2048:
-                    cropped_path = self._crop_image_intelligently(image_path)
-                    if cropped_path != image_path:
-                        image_paths_to_try.append(cropped_path)
+            cache_key = self.cache.make_key(
+                handle.sha256, self.model_name, mode, self._get_prompt_for_mode(mode)
+            )
+        except Exception as e:
+            print(f"⚠️  캐시 키 생성 실패: {e}")
+            return None, None
+        
+        cached = self.cache.get(cache_key)
+        if cached:
+            print(f"💾 캐시된 결과 사용: {handle.name}")
+        return cache_key, cached
+    
+    def _store_cache(self, cache_key, result, mode):
+        """성공한 결과만 캐시에 저장"""
+        if cache_key and self._is_success_result(result) and not result.startswith("처리 실패"):
+            self.cache.put(cache_key, result, self.model_name, mode)
+    
+    def _prepare_image_variants(self, handle, mode="general"):
+        """API 요청용 이미지 후보 준비 - [(이름, 이미지 바이트)] 리스트 (원본 + 큰 이미지면 크롭본)"""
+        variants = [("original", self._read_image_bytes(handle, mode))]
+        
+        # 이미지가 크면 크롭 버전도 시도 (메모리에서 바로 인코딩)
+        try:
+            if handle.width > 2048 or handle.height > 2048:
+                cropped = self._crop_image_intelligently(handle)
+                if cropped is not None:
+                    variants.append(("center_crop", self._read_image_bytes(cropped, mode)))
         except:
             pass
         
+        return variants
+    
+    def _process_image_variants(self, variants, mode):
+        """준비된 이미지 후보들로 API 호출 - 가장 좋은 결과 반환"""
+        max_retries = 3
+        retry_delay = 2
+        
         best_result = None
         best_length = 0
         
-        for img_path in image_paths_to_try:
+        for _, image_bytes in variants:
+            if not image_bytes:
+                continue
+            
             for attempt in range(max_retries):
                 try:
-                    # 이미지 인코딩
-                    base64_image = self._encode_image(img_path)
-                    if not base64_image:
-                        continue
-                    
                     # 모드별 프롬프트 선택
                     prompt_text = self._get_prompt_for_mode(mode)
                     
-                    messages = [
-                        {
-                            "role": "user",
-                            "content": [
-                                {"image": f"data:image/jpeg;base64,{base64_image}"},
-                                {"text": prompt_text}
-                            ]
-                        }
-                    ]
-                    
-                    response = dashscope.MultiModalConversation.call(
-                        model=self.model_name,
-                        messages=messages
-                    )
+                    response = self._call_model(image_bytes, prompt_text)
                     
                     # 새로운 응답 처리 유틸리티 사용
                     result = extract_text_from_response(response)
@@ -371,20 +482,13 @@ Find text inside hand-drawn circles or ellipses only. Ignore rectangular boxes a
                         
                         # 충분히 좋은 결과면 바로 반환
                         if best_length > 10:  # 10자 이상이면 충분
-                            # 임시 파일 정리
-                            if img_path != image_path and os.path.exists(img_path):
-                                try:
-                                    os.remove(img_path)
-                                except:
-                                    pass
-                            
                             # 디버그 모드에서 응답 구조 출력
                             if os.getenv('DEBUG_API_RESPONSE', '').lower() == 'true':
                                 debug_response_structure(response)
                                 
                             return result
                         
-                except (requests.exceptions.SSLError, requests.exceptions.ConnectionError) as e:
+                except (requests.exceptions.SSLError, requests.exceptions.ConnectionError, ConnectionError) as e:
                     if attempt < max_retries - 1:
                         print(f"⚠️  연결 오류 (재시도 {attempt + 1}/{max_retries}): {str(e)[:100]}...")
                         time.sleep(retry_delay * (attempt + 1))
@@ -397,109 +501,164 @@ Find text inside hand-drawn circles or ellipses only. Ignore rectangular boxes a
                     print(f"이미지 처리 중 오류: {e}")
                     break
         
-        # 임시 파일 정리
-        for img_path in image_paths_to_try:
-            if img_path != image_path and os.path.exists(img_path):
-                try:
-                    os.remove(img_path)
-                except:
-                    pass
-        
         # 최고 결과 반환 또는 실패
         if best_result:
             return best_result
         else:
             return "처리 실패: 텍스트를 추출할 수 없습니다"
     
+    def _is_success_result(self, result_text):
+        """OCR 결과 성공 여부 판단"""
+        return bool(
+            result_text and 
+            not result_text.startswith("API 호출 실패") and 
+            not result_text.startswith("이미지 처리 중 오류") and
+            not result_text.startswith("연결 실패") and
+            not result_text.startswith("Image encoding failed") and
+            result_text != "처리 실패: 알 수 없는 오류"
+        )
+    
+    def _pipeline_encode(self, job):
+        """파이프라인 1단계: 이미지 로드 및 인코딩"""
+        # 한 번 디코딩한 이미지를 이후 단계(API 호출/결과 이미지)에서 공유
+        job['handle'] = ImageHandle.from_path(job['image_path'])
+        if job['mode'] != "hybrid":
+            job['cache_key'], cached = self._lookup_cache(job['handle'], job['mode'])
+            if cached:
+                job['result_text'] = cached
+                job['cached'] = True
+                job['time'] = 0
+                return job
+            job['variants'] = self._prepare_image_variants(job['handle'], job['mode'])
+        return job
+    
+    def _pipeline_call(self, job):
+        """파이프라인 2단계: API 호출"""
+        if job.get('cached'):
+            return job
+        
+        start_time = time.time()
+        if job['mode'] == "hybrid":
+            job['result_text'] = self.process_image_hybrid(job['handle'])
+        else:
+            job['result_text'] = self._process_image_variants(job.pop('variants'), job['mode'])
+            self._store_cache(job.get('cache_key'), job['result_text'], job['mode'])
+        job['time'] = time.time() - start_time
+        return job
+    
+    def _pipeline_render(self, job):
+        """파이프라인 3단계: 결과 텍스트/이미지/좌표 매핑 저장"""
+        result_text = job['result_text']
+        handle = job.pop('handle')
+        if not self._is_success_result(result_text):
+            return job
+        
+        image_path = job['image_path']
+        filename = os.path.basename(image_path)
+        output_dir = job['output_dir']
+        
+        # 텍스트 파일 저장
+        save_text_result(result_text, output_dir, filename)
+        
+        # 결과 이미지 생성
+        base_name = os.path.splitext(filename)[0]
+        output_image_path = os.path.join(output_dir, f"{base_name}_result.png")
+        draw_text_on_image(handle, result_text, output_image_path)
+        
+        # 텍스트 좌표 매핑 이미지 생성
+        try:
+            from text_coordinate_mapping import create_text_coordinate_mapping
+            coord_success = create_text_coordinate_mapping(
+                handle, result_text, output_dir, method="auto"
+            )
+            if coord_success:
+                print(f"🎯 좌표 매핑 이미지 생성 완료")
+        except Exception as coord_error:
+            print(f"⚠️  좌표 매핑 오류: {coord_error}")
+        
+        return job
+    
     def process_images(self, image_files, output_base_dir):
-        """여러 이미지 배치 처리"""
+        """여러 이미지 배치 처리 - 인코딩 / API 호출 / 결과 저장 단계별 파이프라인"""
         # 출력 디렉토리 생성
         output_dir = create_output_directory(output_base_dir, f"cloud_{self.model_name}")
         
         print(f"\n📁 결과 저장 폴더: {output_dir}")
         print(f"📊 처리할 이미지 수: {len(image_files)}")
         print(f"🌐 사용 모델: {self.model_name}")
+        print(f"⏱️  API 속도 제한: 초당 {self.rate_limiter.rate:g}회")
         
         total_time = 0
         successful_count = 0
         api_calls = 0
-        results = []  # 결과 리스트 초기화
+        results_by_file = {}
+        self.cache.reset_stats()
+        
+        # 단계별 작업자 풀 (단계 사이는 크기 제한 큐로 연결)
+        pipeline = StagedPipeline([
+            ("encode", self._pipeline_encode, get_env_int('PIPELINE_ENCODE_WORKERS', 2)),
+            ("api", self._pipeline_call, get_env_int('PIPELINE_API_WORKERS', 4)),
+            ("render", self._pipeline_render, get_env_int('PIPELINE_RENDER_WORKERS', 2)),
+        ], queue_size=get_env_int('PIPELINE_QUEUE_SIZE', 8))
+        
+        jobs = (
+            {'image_path': image_path, 'mode': self.ocr_mode, 'output_dir': output_dir}
+            for image_path in image_files
+        )
+        
+        wall_start = time.time()
         
         # 진행률 표시
         with tqdm(total=len(image_files), desc="이미지 처리중") as pbar:
-            for image_path in image_files:
-                filename = os.path.basename(image_path)
+            for job in pipeline.run(jobs):
+                filename = os.path.basename(job['image_path'])
                 pbar.set_postfix({"현재": filename})
                 
-                try:
-                    # OCR 처리
-                    result_text, process_time = self.process_image(image_path)
-                    total_time += process_time
+                if job.get('error') is not None:
+                    print(f"❌ 처리 오류: {filename} - {str(job['error'])}")
+                    results_by_file[job['image_path']] = {
+                        'file': filename,
+                        'success': False,
+                        'error': str(job['error'])[:200],
+                        'time': job.get('time', 0)
+                    }
+                    if job.get('failed_stage') == "render":
+                        api_calls += 1
+                        total_time += job.get('time', 0)
+                    pbar.update(1)
+                    continue
+                
+                result_text = job['result_text']
+                process_time = job['time']
+                total_time += process_time
+                if not job.get('cached'):
                     api_calls += 1
-                    
-                    # 성공 여부 판단
-                    is_success = (
-                        result_text and 
-                        not result_text.startswith("API 호출 실패") and 
-                        not result_text.startswith("이미지 처리 중 오류") and
-                        not result_text.startswith("연결 실패") and
-                        not result_text.startswith("Image encoding failed") and
-                        result_text != "처리 실패: 알 수 없는 오류"
-                    )
-                    
-                    if is_success:
-                        successful_count += 1
-                        
-                        # 텍스트 파일 저장
-                        text_file = save_text_result(result_text, output_dir, filename)
-                        
-                        # 결과 이미지 생성
-                        base_name = os.path.splitext(filename)[0]
-                        output_image_path = os.path.join(output_dir, f"{base_name}_result.png")
-                        image_success = draw_text_on_image(image_path, result_text, output_image_path)
-                        
-                        # 텍스트 좌표 매핑 이미지 생성
-                        try:
-                            from text_coordinate_mapping import create_text_coordinate_mapping
-                            coord_success = create_text_coordinate_mapping(
-                                image_path, result_text, output_dir, method="auto"
-                            )
-                            if coord_success:
-                                print(f"🎯 좌표 매핑 이미지 생성 완료")
-                        except Exception as coord_error:
-                            print(f"⚠️  좌표 매핑 오류: {coord_error}")
-                        
-                        results.append({
-                            'file': filename,
-                            'success': True,
-                            'text_length': len(result_text),
-                            'time': process_time
-                        })
-                        
-                        print(f"✅ {filename}: {len(result_text)}자 추출")
-                        
-                    else:
-                        print(f"⚠️  실패: {filename} - {result_text[:100]}...")
-                        results.append({
-                            'file': filename,
-                            'success': False,
-                            'error': result_text[:200] if result_text else "Unknown error",
-                            'time': process_time
-                        })
                 
-                except Exception as e:
-                    print(f"❌ 처리 오류: {filename} - {str(e)}")
-                    results.append({
+                if self._is_success_result(result_text):
+                    successful_count += 1
+                    results_by_file[job['image_path']] = {
+                        'file': filename,
+                        'success': True,
+                        'text_length': len(result_text),
+                        'time': process_time
+                    }
+                    print(f"✅ {filename}: {len(result_text)}자 추출")
+                else:
+                    print(f"⚠️  실패: {filename} - {result_text[:100]}...")
+                    results_by_file[job['image_path']] = {
                         'file': filename,
                         'success': False,
-                        'error': str(e)[:200],
-                        'time': 0
-                    })
+                        'error': result_text[:200] if result_text else "Unknown error",
+                        'time': process_time
+                    }
                 
-                # API 레이트 리미트 고려 (약간의 대기)
-                time.sleep(0.5)  # SSL 오류 방지를 위해 조금 더 길게
                 pbar.update(1)
         
+        wall_time = time.time() - wall_start
+        
+        # 요약은 입력 순서대로 정리
+        results = [results_by_file[path] for path in image_files if path in results_by_file]
+        
         # 결과 요약 저장
         summary_path = os.path.join(output_dir, "summary.txt")
         with open(summary_path, 'w', encoding='utf-8') as f:
@@ -508,7 +667,11 @@ Find text inside hand-drawn circles or ellipses only. Ignore rectangular boxes a
             f.write(f"성공: {successful_count}/{len(image_files)} 이미지\n")
             f.write(f"총 처리 시간: {total_time:.2f}초\n")
             f.write(f"평균 처리 시간: {total_time/len(image_files):.2f}초/이미지\n")
+            f.write(f"전체 경과 시간: {wall_time:.2f}초 (파이프라인 병렬 처리)\n")
             f.write(f"API 호출 수: {api_calls}\n\n")
+            self.cache.write_summary(f)
+            self.payload.write_summary(f)
+            self._write_region_summary(f)
             
             for result in results:
                 f.write(f"파일: {result['file']}\n")
@@ -525,7 +688,11 @@ Find text inside hand-drawn circles or ellipses only. Ignore rectangular boxes a
         print(f"성공: {successful_count}/{len(image_files)} 이미지")
         print(f"총 처리 시간: {total_time:.2f}초")
         print(f"평균 처리 시간: {total_time/len(image_files):.2f}초/이미지")
+        print(f"전체 경과 시간: {wall_time:.2f}초")
         print(f"API 호출 수: {api_calls}")
+        cache_stats = self.cache.get_stats()
+        if cache_stats['enabled']:
+            print(f"캐시 적중/미스: {cache_stats['hits']}/{cache_stats['misses']}")
         print(f"결과 저장 위치: {output_dir}")
         
         return True
@@ -0,0 +1,223 @@
+"""
+CPU 실행 프로파일 - 로컬 모델을 CPU에서 추론할 때의 스레드 수 / 추론 모드 / 모델 컴파일 설정
+
+여러 소켓(NUMA 노드)이 있는 서버에서는 소켓마다 코어를 고정한 작업자 프로세스를 하나씩 띄워
+이미지를 나눠 처리할 수 있음 (run_socket_workers)
+"""
+
+import os
+import glob
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import psutil
+import torch
+
+from parallel_utils import get_env_int
+
+# 프로파일별 설정
+#   threads: 코어 수에 맞춰 intra-op / inter-op 스레드 수 설정 (False면 torch 기본값)
+#   inference_mode: torch.no_grad 대신 torch.inference_mode (버전 카운터/뷰 추적 생략)
+#   compile: torch.compile로 모델 forward 컴파일 (첫 추론이 느려지므로 선택 사항)
+CPU_PROFILES = {
+    "default": {"threads": False, "inference_mode": False, "compile": False},
+    "tuned": {"threads": True, "inference_mode": True, "compile": False},
+    "compiled": {"threads": True, "inference_mode": True, "compile": True},
+}
+
+# 프로세스당 한 번만 설정 가능한 inter-op 스레드 수 적용 여부
+_interop_applied = False
+_apply_lock = threading.Lock()
+
+
+def available_cores():
+    """현재 프로세스가 실행될 수 있는 논리 CPU 번호 목록"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(psutil.cpu_count() or 1))
+
+
+def cpu_sockets():
+    """
+    소켓(물리 패키지)별 논리 CPU 번호 목록 - 사용 가능한 CPU만, 소켓 번호 순서
+
+    Linux sysfs 토폴로지를 읽고, 읽을 수 없으면 전체를 소켓 하나로 봄
+    """
+    cores = set(available_cores())
+    sockets = {}
+    for path in glob.glob('/sys/devices/system/cpu/cpu[0-9]*/topology/physical_package_id'):
+        cpu = int(path.split('/')[-3][3:])
+        if cpu not in cores:
+            continue
+        try:
+            with open(path) as f:
+                package = int(f.read().strip())
+        except (OSError, ValueError):
+            continue
+        sockets.setdefault(package, []).append(cpu)
+
+    if not sockets:
+        return [sorted(cores)]
+    return [sorted(sockets[package]) for package in sorted(sockets)]
+
+
+def thread_counts(cores=None):
+    """
+    코어 목록에 맞춘 (intra-op, inter-op) 스레드 수
+
+    intra-op은 물리 코어 수 (하이퍼스레딩 형제 스레드는 행렬 연산에서 이득이 거의 없음),
+    generate는 연산자를 순서대로 실행하므로 inter-op은 1.
+    CPU_INTRA_THREADS / CPU_INTER_THREADS 환경 변수가 있으면 그 값
+    """
+    cores = cores if cores is not None else available_cores()
+    logical = psutil.cpu_count() or 1
+    physical = psutil.cpu_count(logical=False) or logical
+    per_core = max(1, round(logical / physical))
+    intra = max(1, len(cores) // per_core)
+    return get_env_int('CPU_INTRA_THREADS', intra), get_env_int('CPU_INTER_THREADS', 1)
+
+
+def pin_to_cores(cores):
+    """현재 프로세스를 cores에만 실행되도록 고정 (지원하지 않는 OS면 False)"""
+    if not hasattr(os, 'sched_setaffinity'):
+        return False
+    os.sched_setaffinity(0, cores)
+    return True
+
+
+class CPUProfile:
+    """
+    CPU 추론 설정 묶음
+
+    - apply(): 스레드 수 적용 (프로세스당 한 번이면 충분)
+    - inference_context(): 추론을 감쌀 컨텍스트 (inference_mode 또는 no_grad)
+    - prepare_model(): compile 프로파일이면 모델 forward를 한 번 컴파일
+    """
+
+    def __init__(self, name="tuned", cores=None):
+        if name not in CPU_PROFILES:
+            print(f"⚠️  알 수 없는 CPU 프로파일: {name}. tuned 사용")
+            name = "tuned"
+        self.name = name
+        self.settings = CPU_PROFILES[name]
+        self.cores = cores if cores is not None else available_cores()
+        self.intra_threads, self.inter_threads = thread_counts(self.cores)
+        self._lock = threading.Lock()
+
+    def apply(self):
+        """스레드 수 적용 (default 프로파일은 torch 기본값 유지)"""
+        global _interop_applied
+        if not self.settings["threads"]:
+            return
+
+        torch.set_num_threads(self.intra_threads)
+        with _apply_lock:
+            if not _interop_applied:
+                try:
+                    # 병렬 작업이 한 번이라도 실행된 뒤에는 바꿀 수 없음
+                    torch.set_num_interop_threads(self.inter_threads)
+                except RuntimeError as e:
+                    print(f"⚠️  inter-op 스레드 수 설정 실패 (이미 사용 중): {e}")
+                _interop_applied = True
+
+    def inference_context(self):
+        """추론 컨텍스트"""
+        if self.settings["inference_mode"]:
+            return torch.inference_mode()
+        return torch.no_grad()
+
+    def prepare_model(self, model):
+        """compile 프로파일이면 모델 forward 컴파일 (모델당 한 번, 실패하면 그대로 사용)"""
+        if not self.settings["compile"] or getattr(model, '_cpu_profile_compiled', False):
+            return model
+
+        with self._lock:
+            if getattr(model, '_cpu_profile_compiled', False):
+                return model
+            try:
+                # generate는 매 단계 길이가 달라지므로 동적 형태로 컴파일
+                model.forward = torch.compile(model.forward, dynamic=True)
+                print("⚙️  모델 forward 컴파일 설정 완료 (첫 추론 때 컴파일됨)")
+            except Exception as e:
+                print(f"⚠️  모델 컴파일 실패, 컴파일 없이 실행: {e}")
+            model._cpu_profile_compiled = True
+        return model
+
+    def describe(self):
+        """프로파일 한 줄 설명"""
+        if not self.settings["threads"]:
+            threads = f"torch 기본 ({torch.get_num_threads()}스레드)"
+        else:
+            threads = f"intra {self.intra_threads} / inter {self.inter_threads}스레드"
+        mode = "inference_mode" if self.settings["inference_mode"] else "no_grad"
+        compiled = ", compile" if self.settings["compile"] else ""
+        return f"{self.name}: {threads}, {mode}{compiled}, 코어 {len(self.cores)}개"
+
+
+_profile_instance = None
+_profile_lock = threading.Lock()
+
+
+def get_cpu_profile():
+    """공유 CPU 프로파일 반환 (CPU_PROFILE 환경 변수, 처음 호출할 때 스레드 수 적용)"""
+    global _profile_instance
+    if _profile_instance is None:
+        with _profile_lock:
+            if _profile_instance is None:
+                profile = CPUProfile(os.getenv('CPU_PROFILE', 'tuned').strip().lower())
+                profile.apply()
+                print(f"🧵 CPU 프로파일 {profile.describe()}")
+                _profile_instance = profile
+    return _profile_instance
+
+
+def socket_worker_cores():
+    """
+    소켓별 작업자로 나눠 실행할 코어 목록 (CPU_SOCKET_WORKERS=true이고 소켓이 2개 이상일 때만, 아니면 None)
+    """
+    if os.getenv('CPU_SOCKET_WORKERS', 'false').lower() != 'true':
+        return None
+    sockets = cpu_sockets()
+    return sockets if len(sockets) > 1 else None
+
+
+def _init_socket_worker(cores, profile_name):
+    """작업자 프로세스 초기화 - 소켓 코어에 고정하고 그 코어 수로 프로파일 적용"""
+    global _profile_instance
+    pin_to_cores(cores)
+    os.environ['CPU_PROFILE'] = profile_name
+    profile = CPUProfile(profile_name, cores)
+    profile.apply()
+    _profile_instance = profile
+    print(f"🧵 소켓 작업자 {os.getpid()}: {profile.describe()}")
+
+
+def run_socket_workers(worker, shards, sockets, profile_name=None):
+    """
+    소켓마다 코어를 고정한 작업자 프로세스 하나씩에서 worker(shard) 실행
+
+    Args:
+        worker: 모듈 수준 함수 (spawn 프로세스로 전달되므로 pickle 가능해야 함)
+        shards: 소켓별 작업 인자 목록 (len(sockets)개)
+        sockets: 소켓별 논리 CPU 번호 목록 (cpu_sockets() 결과)
+        profile_name: 작업자 CPU 프로파일 (None이면 CPU_PROFILE 환경 변수)
+
+    Returns:
+        shards 순서와 같은 결과 목록
+    """
+    profile_name = profile_name or os.getenv('CPU_PROFILE', 'tuned').strip().lower()
+    # torch와 fork는 함께 쓰면 스레드 풀이 깨질 수 있으므로 spawn
+    context = multiprocessing.get_context("spawn")
+
+    executors = [
+        ProcessPoolExecutor(max_workers=1, mp_context=context,
+                            initializer=_init_socket_worker, initargs=(cores, profile_name))
+        for cores in sockets[:len(shards)]
+    ]
+    try:
+        futures = [executor.submit(worker, shard) for executor, shard in zip(executors, shards)]
+        return [future.result() for future in futures]
+    finally:
+        for executor in executors:
+            executor.shutdown()
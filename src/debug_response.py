@@ -45,24 +45,16 @@ def test_api_response():
     
     try:
         import dashscope
-        import base64
+        from async_cloud_client import build_image_message
+        from payload_optimizer import get_payload_optimizer
         
         dashscope.api_key = api_key
         
-        # 이미지 인코딩
-        with open(test_image, "rb") as image_file:
-            base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+        # 이미지 인코딩 (일반 모드 설정, MIME 타입은 실제 형식으로)
+        image_bytes = get_payload_optimizer().encode(test_image, "general")
         
         # API 호출
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"image": f"data:image/jpeg;base64,{base64_image}"},
-                    {"text": "이미지에서 모든 텍스트를 추출해주세요."}
-                ]
-            }
-        ]
+        messages = build_image_message(image_bytes, "이미지에서 모든 텍스트를 추출해주세요.")
         
         print("\n📡 API 호출 중...")
         response = dashscope.MultiModalConversation.call(
@@ -0,0 +1,213 @@
+"""
+이미지 핸들 - 파일을 한 번만 디코딩하고 PIL / NumPy 뷰와 인코딩 결과를 공유
+"""
+
+import io
+import os
+import base64
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from ocr_cache import hash_bytes
+from image_store import get_image_store
+
+
+class ImageHandle:
+    """
+    한 번 디코딩한 RGB 픽셀 버퍼를 여러 처리기가 함께 사용하기 위한 객체
+
+    - rgb: (H, W, 3) uint8 배열 (모든 뷰의 원본 버퍼)
+    - pil: PIL 이미지 (PIL은 RGB 버퍼를 공유하지 못하므로 호출할 때마다 만드는 복사본, 캐시하지 않음)
+    - gray / to_bgr(): OpenCV 처리용 변환본
+    - encoded() / base64() / downscaled(): 요청별 인코딩 결과를 지연 생성 후 캐시
+
+    lazy_file=True면 원본 파일 바이트는 처음 필요할 때 path에서 읽음 (이미지 저장소 핸들)
+    """
+
+    def __init__(self, rgb, path=None, file_bytes=None, source_hash=None, box=None, lazy_file=False):
+        self.rgb = rgb
+        self.path = path
+        self._file_bytes = file_bytes
+        self._lazy_file = lazy_file and file_bytes is None
+        # 크롭 핸들은 원본 이미지 해시와 영역 좌표를 함께 가짐
+        self.source_hash = source_hash
+        self.box = box
+        self._gray = None
+        self._sha256 = None
+        self._encoded = {}
+        self._downscaled = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_path(cls, image_path, use_store=True):
+        """파일을 읽어 한 번만 디코딩 (한글 경로도 지원, 이미지 저장소가 켜져 있으면 저장소에서 읽음)"""
+        if use_store:
+            store = get_image_store()
+            if store.enabled:
+                return store.load(image_path)
+        with open(image_path, "rb") as image_file:
+            file_bytes = image_file.read()
+        return cls.from_bytes(file_bytes, path=image_path)
+
+    @classmethod
+    def from_bytes(cls, file_bytes, path=None):
+        """인코딩된 이미지 바이트에서 생성"""
+        array = cv2.imdecode(np.frombuffer(file_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if array is None:
+            # OpenCV가 읽지 못하는 형식은 PIL로 디코딩
+            try:
+                with Image.open(io.BytesIO(file_bytes)) as img:
+                    array = np.asarray(img.convert('RGB'))
+            except Exception:
+                raise ValueError(f"이미지 로드 실패: {path or '바이트 입력'}")
+        else:
+            cv2.cvtColor(array, cv2.COLOR_BGR2RGB, dst=array)
+        return cls(array, path=path, file_bytes=file_bytes)
+
+    @classmethod
+    def from_pil(cls, image):
+        """PIL 이미지에서 생성"""
+        return cls(np.asarray(image.convert('RGB')), path=getattr(image, 'filename', None) or None)
+
+    @classmethod
+    def from_array(cls, array, bgr=False, path=None):
+        """NumPy 배열에서 생성 (bgr=True면 OpenCV 순서로 간주)"""
+        if array.ndim == 2:
+            array = cv2.cvtColor(array, cv2.COLOR_GRAY2RGB)
+        elif bgr:
+            array = cv2.cvtColor(array, cv2.COLOR_BGR2RGB)
+        return cls(array, path=path)
+
+    @classmethod
+    def ensure(cls, image, bgr=False):
+        """경로 / PIL 이미지 / 배열 / 핸들 중 무엇이든 ImageHandle로 변환"""
+        if isinstance(image, ImageHandle):
+            return image
+        if isinstance(image, (str, os.PathLike)):
+            return cls.from_path(os.fspath(image))
+        if isinstance(image, Image.Image):
+            return cls.from_pil(image)
+        if isinstance(image, np.ndarray):
+            return cls.from_array(image, bgr=bgr)
+        raise TypeError(f"지원하지 않는 이미지 형식: {type(image).__name__}")
+
+    @property
+    def file_bytes(self):
+        """원본 파일 바이트 (없으면 None)"""
+        if self._lazy_file:
+            with self._lock:
+                if self._lazy_file:
+                    with open(self.path, "rb") as image_file:
+                        self._file_bytes = image_file.read()
+                    self._lazy_file = False
+        return self._file_bytes
+
+    @property
+    def width(self):
+        return self.rgb.shape[1]
+
+    @property
+    def height(self):
+        return self.rgb.shape[0]
+
+    @property
+    def size(self):
+        """(너비, 높이) - PIL과 같은 순서"""
+        return (self.width, self.height)
+
+    @property
+    def name(self):
+        """표시용 파일 이름"""
+        return os.path.basename(self.path) if self.path else "image"
+
+    @property
+    def pil(self):
+        """
+        픽셀 버퍼의 PIL 이미지 - 호출할 때마다 새로 만든 복사본
+
+        PIL은 3채널 버퍼를 복사해서 가져가므로 핸들에 보관하면 전체 크기 복사본이 하나 더 상주함.
+        저장/그리기 등 PIL이 필요한 곳에서만 한 번 만들어 쓰고 버림 (수정해도 rgb에는 영향 없음)
+        """
+        return Image.fromarray(self.rgb)
+
+    @property
+    def gray(self):
+        """그레이스케일 배열 (캐시)"""
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.rgb, cv2.COLOR_RGB2GRAY)
+        return self._gray
+
+    def to_bgr(self):
+        """OpenCV 순서의 새 배열 (그리기 등 수정용 복사본)"""
+        return cv2.cvtColor(self.rgb, cv2.COLOR_RGB2BGR)
+
+    @property
+    def sha256(self):
+        """캐시 키용 해시 - 파일이면 파일 내용, 크롭이면 원본 해시 + 영역, 아니면 픽셀 버퍼 기준"""
+        if self._sha256 is None:
+            if self.file_bytes is not None:
+                self._sha256 = hash_bytes(self.file_bytes)
+            elif self.source_hash and self.box:
+                box = ",".join(str(v) for v in self.box)
+                self._sha256 = hash_bytes(f"{self.source_hash}:{box}".encode('ascii'))
+            else:
+                shape = "x".join(str(v) for v in self.rgb.shape).encode('ascii')
+                self._sha256 = hash_bytes(shape + np.ascontiguousarray(self.rgb).tobytes())
+        return self._sha256
+
+    def crop(self, box):
+        """(left, top, right, bottom) 영역의 핸들 - 픽셀은 복사하지 않는 뷰"""
+        left, top, right, bottom = (int(v) for v in box)
+        left, top = max(0, left), max(0, top)
+        right, bottom = min(self.width, right), min(self.height, bottom)
+        # 크롭의 크롭도 영역 좌표는 최초 원본 기준으로 기록
+        offset_x, offset_y = self.box[:2] if self.box else (0, 0)
+        return ImageHandle(
+            self.rgb[top:bottom, left:right],
+            path=self.path,
+            source_hash=self.source_hash or self.sha256,
+            box=(left + offset_x, top + offset_y, right + offset_x, bottom + offset_y)
+        )
+
+    def downscaled(self, max_side):
+        """긴 변이 max_side 이하가 되도록 축소한 핸들 (캐시, 이미 작으면 자신)"""
+        if not max_side or max(self.size) <= max_side:
+            return self
+        with self._lock:
+            if max_side not in self._downscaled:
+                scale = max_side / max(self.size)
+                new_size = (max(1, round(self.width * scale)), max(1, round(self.height * scale)))
+                resized = cv2.resize(self.rgb, new_size, interpolation=cv2.INTER_AREA)
+                self._downscaled[max_side] = ImageHandle(resized, path=self.path)
+            return self._downscaled[max_side]
+
+    def encoded(self, fmt="PNG", quality=95, max_side=None):
+        """
+        인코딩된 이미지 바이트 (형식/품질/최대 크기별로 캐시)
+
+        fmt가 "original"이면 원본 파일 바이트를 그대로 반환 (파일이 없으면 PNG)
+        """
+        fmt = fmt.upper()
+        if fmt == "ORIGINAL":
+            if self.file_bytes is not None and not max_side:
+                return self.file_bytes
+            fmt = "PNG"
+
+        source = self.downscaled(max_side)
+        key = (fmt, quality if fmt in ("JPEG", "WEBP") else None)
+        with source._lock:
+            if key not in source._encoded:
+                buffer = io.BytesIO()
+                if fmt in ("JPEG", "WEBP"):
+                    source.pil.save(buffer, format=fmt, quality=quality)
+                else:
+                    source.pil.save(buffer, format=fmt)
+                source._encoded[key] = buffer.getvalue()
+            return source._encoded[key]
+
+    def base64(self, fmt="PNG", quality=95, max_side=None):
+        """encoded() 결과의 base64 문자열"""
+        return base64.b64encode(self.encoded(fmt, quality, max_side)).decode('utf-8')
@@ -0,0 +1,147 @@
+"""
+디코딩 이미지 저장소 - 한 번 디코딩한 픽셀을 .npy로 저장하고 이후에는 메모리 매핑으로 읽음
+
+파라미터 실험처럼 같은 이미지를 여러 번(여러 프로세스에서) 여는 경우 PNG/JPG 디코딩을 생략함.
+활성화되어 있으면 ImageHandle.from_path가 자동으로 이 저장소를 사용함 (IMAGE_STORE_ENABLED)
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+import numpy as np
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(__file__), '..', 'cache', 'image_store')
+
+
+class ImageStore:
+    """
+    원본 파일 경로 + 크기 + 수정 시각별로 디코딩 결과를 보관하는 저장소
+
+    항목마다 <키>.rgb.npy / <키>.gray.npy / <키>.json (원본 해시) 파일을 만들고,
+    읽을 때는 np.load(mmap_mode='r')로 열어서 픽셀을 복사하지 않음.
+    원본 파일이 바뀌면 키가 달라지므로 예전 항목은 사용되지 않음 (clear()로 정리)
+    """
+
+    def __init__(self, root=None, enabled=True):
+        self.root = os.path.abspath(root or DEFAULT_STORE_DIR)
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.enabled:
+            try:
+                os.makedirs(self.root, exist_ok=True)
+            except OSError as e:
+                print(f"⚠️  이미지 저장소 초기화 실패 (저장소 비활성화): {e}")
+                self.enabled = False
+
+    def _key(self, image_path):
+        """원본 파일 상태로 만든 항목 키 (파일 내용을 읽지 않음)"""
+        stat = os.stat(image_path)
+        path_hash = hashlib.sha1(os.path.abspath(image_path).encode('utf-8')).hexdigest()[:16]
+        return f"{path_hash}_{stat.st_size}_{stat.st_mtime_ns}"
+
+    def _paths(self, key):
+        base = os.path.join(self.root, key)
+        return base + ".rgb.npy", base + ".gray.npy", base + ".json"
+
+    def load(self, image_path):
+        """저장된 항목이 있으면 메모리 매핑 핸들, 없으면 디코딩 후 저장하고 핸들 반환"""
+        from image_handle import ImageHandle
+
+        key = self._key(image_path)
+        rgb_path, gray_path, meta_path = self._paths(key)
+
+        if os.path.exists(meta_path):
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                handle = ImageHandle(np.load(rgb_path, mmap_mode='r'), path=image_path, lazy_file=True)
+                handle._gray = np.load(gray_path, mmap_mode='r')
+                handle._sha256 = meta['sha256']
+                self.hits += 1
+                return handle
+            except (OSError, ValueError, KeyError):
+                pass  # 깨진 항목은 다시 만듦
+
+        self.misses += 1
+        handle = ImageHandle.from_path(image_path, use_store=False)
+        try:
+            self._write(rgb_path, handle.rgb)
+            self._write(gray_path, handle.gray)
+            # 메타 파일은 마지막에 써서 배열 파일이 모두 있을 때만 항목이 보이게 함
+            self._write_meta(meta_path, {'path': os.path.abspath(image_path), 'sha256': handle.sha256})
+        except OSError as e:
+            print(f"⚠️  이미지 저장소 기록 실패: {e}")
+        return handle
+
+    def _write(self, target_path, array):
+        """임시 파일에 쓴 뒤 교체 (다른 프로세스가 쓰다 만 파일을 읽지 않도록)"""
+        temp_path = f"{target_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(array))
+        os.replace(temp_path, target_path)
+
+    def _write_meta(self, target_path, meta):
+        temp_path = f"{target_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(temp_path, target_path)
+
+    def get_stats(self):
+        """저장소 통계 반환"""
+        entries, size = 0, 0
+        if self.enabled and os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                if name.endswith(".json"):
+                    entries += 1
+                size += os.path.getsize(os.path.join(self.root, name))
+        return {'enabled': self.enabled, 'hits': self.hits, 'misses': self.misses,
+                'entries': entries, 'size_bytes': size}
+
+    def clear(self):
+        """저장된 항목 전체 삭제"""
+        if not os.path.isdir(self.root):
+            return
+        with self._lock:
+            for name in os.listdir(self.root):
+                if name.endswith((".npy", ".json", ".tmp")):
+                    try:
+                        os.remove(os.path.join(self.root, name))
+                    except OSError:
+                        pass
+
+
+_store_instance = None
+_store_lock = threading.Lock()
+
+
+def get_image_store():
+    """공유 이미지 저장소 인스턴스 반환 (환경 변수로 설정, 기본 비활성화)"""
+    global _store_instance
+    if _store_instance is None:
+        with _store_lock:
+            if _store_instance is None:
+                _store_instance = ImageStore(
+                    root=os.getenv('IMAGE_STORE_DIR') or None,
+                    enabled=os.getenv('IMAGE_STORE_ENABLED', 'false').lower() == 'true'
+                )
+    return _store_instance
+
+
+def enable_image_store(root=None):
+    """
+    이 프로세스에서 이미지 저장소 사용 (파라미터 실험 스크립트용)
+
+    환경 변수에도 기록하므로 이후 생성되는 작업 프로세스(detect_many 등)도 같은 저장소를 사용함
+    """
+    global _store_instance
+    os.environ['IMAGE_STORE_ENABLED'] = 'true'
+    if root:
+        os.environ['IMAGE_STORE_DIR'] = root
+    with _store_lock:
+        _store_instance = ImageStore(root=root or os.getenv('IMAGE_STORE_DIR') or None, enabled=True)
+    return _store_instance
@@ -0,0 +1,247 @@
+"""
+로컬 모델 추론 서비스 - 여러 스레드의 요청을 큐에 모아 한 번의 배치 generate로 처리
+
+CLI 처리기와 웹 도구가 같은 모델 객체에 각자 generate를 호출하지 않고
+submit()으로 요청을 넣으면, 작업자 스레드가 최대 max_wait_ms 동안 또는 max_batch_size개까지 모아
+패딩된 배치 하나로 추론한 뒤 요청별 Future에 결과를 전달함
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+
+from model_manager import get_model_manager
+from cpu_profile import get_cpu_profile
+from parallel_utils import get_env_int
+
+# 로컬 모델 OCR 프롬프트
+LOCAL_OCR_PROMPT = "Find all text that has been manually circled with oval/elliptical pen marks and extract only those text items. Output only the results without any explanation or additional text."
+
+
+class InferenceService:
+    """
+    모델 하나(model_id, device)의 동적 배치 추론 서비스
+
+    - submit(): 이미지 하나의 추론 요청을 넣고 결과 문자열의 Future 반환
+    - infer_many(): 여러 이미지를 한꺼번에 넣고 입력 순서대로 결과 반환
+    같은 배치 안에서도 프롬프트가 다른 요청은 프롬프트별로 나눠 generate 호출
+    """
+
+    def __init__(self, model_id, device="auto", max_batch_size=None, max_wait_ms=None, precision=None):
+        self.model_id = model_id
+        self.device = device
+        self.precision = precision
+        self.max_batch_size = max_batch_size or get_env_int('MAX_BATCH_SIZE', 4)
+        if max_wait_ms is None:
+            max_wait_ms = get_env_int('INFERENCE_MAX_WAIT_MS', 20)
+        self.max_wait = max_wait_ms / 1000
+        self.model_manager = get_model_manager()
+
+        self.requests = queue.Queue()
+        self.stats = {'requests': 0, 'batches': 0, 'generate_calls': 0, 'max_batch': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, image, prompt=LOCAL_OCR_PROMPT):
+        """
+        추론 요청 추가
+
+        Args:
+            image: RGB PIL 이미지
+            prompt: 텍스트 프롬프트
+
+        Returns:
+            결과 문자열을 갖는 Future (추론 실패 시 예외)
+        """
+        future = Future()
+        self._ensure_worker()
+        self.requests.put({'image': image, 'prompt': prompt, 'future': future})
+        return future
+
+    def infer(self, image, prompt=LOCAL_OCR_PROMPT):
+        """이미지 하나 추론 (결과를 기다림)"""
+        return self.submit(image, prompt).result()
+
+    def infer_many(self, images, prompt=LOCAL_OCR_PROMPT):
+        """여러 이미지를 한꺼번에 요청하고 입력 순서대로 결과 반환 (하나라도 실패하면 예외)"""
+        futures = [self.submit(image, prompt) for image in images]
+        return [future.result() for future in futures]
+
+    def _ensure_worker(self):
+        """작업자 스레드 시작 (처음 요청할 때 한 번)"""
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    name = f"inference-{self.model_id.split('/')[-1]}"
+                    self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+                    self._worker.start()
+
+    def _collect_batch(self):
+        """첫 요청을 기다린 뒤 max_wait 동안 또는 max_batch_size개까지 요청을 모음"""
+        batch = [self.requests.get()]
+        deadline = time.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """작업자 루프 - 모은 요청을 프롬프트별 배치로 추론"""
+        while True:
+            batch = self._collect_batch()
+
+            groups = {}
+            for request in batch:
+                groups.setdefault(request['prompt'], []).append(request)
+
+            with self._lock:
+                self.stats['requests'] += len(batch)
+                self.stats['batches'] += 1
+                self.stats['max_batch'] = max(self.stats['max_batch'], len(batch))
+
+            for prompt, requests in groups.items():
+                self._run_group(prompt, requests)
+
+    def _run_group(self, prompt, requests):
+        """같은 프롬프트 요청들을 한 번의 generate로 처리하고 Future에 결과 전달"""
+        try:
+            model, processor, actual_device = self.model_manager.get_model(
+                self.model_id, self.device, precision=self.precision
+            )
+            if actual_device == "cpu":
+                model = get_cpu_profile().prepare_model(model)
+            start_time = time.time()
+            outputs = self._generate_with_fallback(
+                model, processor, actual_device,
+                [request['image'] for request in requests], prompt
+            )
+            self.model_manager.record_inference(model, time.time() - start_time, len(requests))
+        except Exception as e:
+            with self._lock:
+                self.stats['errors'] += len(requests)
+            for request in requests:
+                request['future'].set_exception(e)
+            return
+
+        for request, output in zip(requests, outputs):
+            request['future'].set_result(output)
+
+    def _generate_batch(self, model, processor, device, images, prompt):
+        """여러 이미지를 하나의 패딩된 배치로 추론 - 이미지별 결과 리스트 반환"""
+        with self._lock:
+            self.stats['generate_calls'] += 1
+
+        # Qwen2-VL 전용 입력 형식
+        texts = []
+        for image in images:
+            messages = [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "image", "image": image},
+                        {"type": "text", "text": prompt}
+                    ]
+                }
+            ]
+            texts.append(processor.apply_chat_template(
+                messages,
+                tokenize=False,
+                add_generation_prompt=True
+            ))
+
+        # 생성 시에는 왼쪽 패딩이어야 이미지별 출력이 입력 바로 뒤에 이어짐
+        processor.tokenizer.padding_side = "left"
+
+        inputs = processor(
+            text=texts,
+            images=images,
+            padding=True,
+            return_tensors="pt"
+        )
+
+        # 디바이스로 이동
+        if device == "cuda":
+            inputs = inputs.to("cuda")
+
+        # 추론 실행
+        with self._inference_context(device):
+            generated_ids = model.generate(
+                **inputs,
+                max_new_tokens=512,
+                do_sample=False,
+                pad_token_id=processor.tokenizer.eos_token_id
+            )
+
+        # 결과 디코딩 (배치 항목별로 입력 부분 제거)
+        generated_ids_trimmed = [
+            out_ids[len(in_ids):] for in_ids, out_ids in zip(inputs.input_ids, generated_ids)
+        ]
+
+        output_texts = processor.batch_decode(
+            generated_ids_trimmed,
+            skip_special_tokens=True,
+            clean_up_tokenization_spaces=False
+        )
+
+        return [text.strip() for text in output_texts]
+
+    def _inference_context(self, device):
+        """추론 컨텍스트 - CPU는 CPU 프로파일 설정 (inference_mode 등), GPU는 no_grad"""
+        if device == "cpu":
+            return get_cpu_profile().inference_context()
+        return torch.no_grad()
+
+    def _generate_with_fallback(self, model, processor, device, images, prompt):
+        """배치 추론 - GPU 메모리 부족 시 배치를 절반으로 나눠 재시도"""
+        try:
+            return self._generate_batch(model, processor, device, images, prompt)
+        except torch.cuda.OutOfMemoryError:
+            if len(images) == 1:
+                raise
+            torch.cuda.empty_cache()
+            half = len(images) // 2
+            print(f"⚠️  GPU 메모리 부족 - 배치 분할 재시도 ({len(images)} → {half} + {len(images) - half})")
+            return (
+                self._generate_with_fallback(model, processor, device, images[:half], prompt) +
+                self._generate_with_fallback(model, processor, device, images[half:], prompt)
+            )
+
+    def get_stats(self):
+        """요청 / 배치 통계"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['avg_batch'] = stats['requests'] / stats['batches'] if stats['batches'] else 0.0
+        return stats
+
+    def write_summary(self, f):
+        """summary.txt에 배치 추론 통계 기록"""
+        stats = self.get_stats()
+        f.write("=== 배치 추론 ===\n")
+        f.write(f"최대 배치: {self.max_batch_size}개, 최대 대기: {self.max_wait * 1000:.0f}ms\n")
+        f.write(f"요청: {stats['requests']}개, 배치: {stats['batches']}회 (평균 {stats['avg_batch']:.1f}개, 최대 {stats['max_batch']}개)\n")
+        f.write(f"generate 호출: {stats['generate_calls']}회, 실패 요청: {stats['errors']}개\n\n")
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_inference_service(model_id, device="auto", precision=None):
+    """모델/디바이스/정밀도별 공유 추론 서비스 반환 (처음 요청할 때 생성)"""
+    key = (model_id, device, precision)
+    service = _services.get(key)
+    if service is None:
+        with _services_lock:
+            service = _services.get(key)
+            if service is None:
+                service = InferenceService(model_id, device, precision=precision)
+                _services[key] = service
+    return service
@@ -3,6 +3,7 @@
 """
 
 import torch
+import psutil
 from PIL import Image
 import os
 import time
@@ -12,110 +13,200 @@ warnings.filterwarnings("ignore")
 
 from utils import create_output_directory, draw_text_on_image, save_text_result, measure_time
 from model_manager import get_model_manager
+from models import list_local_models, get_precision
+from parallel_utils import get_env_int
+from ocr_cache import get_ocr_cache
+from image_handle import ImageHandle
+from inference_service import get_inference_service, LOCAL_OCR_PROMPT
+from cpu_profile import get_cpu_profile, socket_worker_cores, run_socket_workers
 
 class LocalOCRProcessor:
-    def __init__(self, model_id, device="auto"):
+    def __init__(self, model_id, device="auto", precision=None):
         self.model_id = model_id
         self.device = device
         self.model_manager = get_model_manager()
+        # 정밀도 모드 (None이면 MODEL_PRECISION / models.py의 디바이스별 기본값)
+        self.target_device = self.model_manager._get_device(device)
+        self.precision = get_precision(model_id, self.target_device, precision)
         self.model = None
         self.processor = None
         self.actual_device = None
+        self.cache = get_ocr_cache()
+        # 추론은 모델별 공유 서비스로 (다른 처리기/스레드 요청과 같은 배치로 묶임)
+        self.inference = get_inference_service(model_id, device, self.precision)
         
     def ensure_model_loaded(self):
         """모델이 로드되어 있는지 확인하고, 없으면 로드"""
         try:
             self.model, self.processor, self.actual_device = self.model_manager.get_model(
                 self.model_id, 
-                self.device
+                self.device,
+                precision=self.precision
             )
             return True
         except Exception as e:
             print(f"❌ 모델 로드 실패: {e}")
             return False
     
-    def process_image(self, image_path):
-        """단일 이미지 OCR 처리"""
+    def _cache_key(self, handle):
+        """캐시 키 생성 (실패 시 None)"""
+        if not self.cache.enabled:
+            return None
+        try:
+            # 정밀도에 따라 결과가 달라질 수 있으므로 모드 이름에 포함.
+            # 크롭 핸들의 sha256은 원본 해시 + 영역 기준이고, 영역 좌표도 키에 넣음 (클라우드 영역 캐시와 같은 방식)
+            return self.cache.make_key(handle.sha256, self.model_id, f"local-{self.precision}", LOCAL_OCR_PROMPT,
+                                       handle.box)
+        except Exception as e:
+            print(f"⚠️  캐시 키 생성 실패: {e}")
+            return None
+    
+    def _get_model_info(self):
+        """models.py에서 현재 모델 정보 찾기 (없으면 None)"""
+        for info in list_local_models().values():
+            if info["model_id"] == self.model_id:
+                return info
+        return None
+    
+    def _auto_batch_size(self):
+        """사용 가능한 메모리에 맞춰 배치 크기 결정 (MAX_BATCH_SIZE 이하)"""
+        max_batch_size = get_env_int('MAX_BATCH_SIZE', 4)
+        
+        # 이미지 1장당 추가 메모리 = 권장 메모리 - 최소 메모리 (모델 가중치 외 여유분)
+        model_info = self._get_model_info()
+        per_item_gb = 1.0
+        if model_info:
+            per_item_gb = max(1.0, model_info["recommended_gpu_memory"] - model_info["min_gpu_memory"])
+        
+        try:
+            if self.actual_device == "cuda":
+                free_bytes, _ = torch.cuda.mem_get_info()
+            else:
+                free_bytes = psutil.virtual_memory().available
+        except Exception:
+            return 1
+        
+        free_gb = free_bytes / 1024**3
+        return max(1, min(max_batch_size, int(free_gb // per_item_gb)))
+    
+    def process_batch(self, items):
+        """
+        여러 이미지(경로 / ImageHandle / PIL 이미지, 예: 하이브리드 감지기 크롭)를 배치로 OCR 처리
+        
+        Returns:
+            입력 순서와 같은 결과 문자열 리스트
+        """
+        results = [None] * len(items)
+        cache_keys = [None] * len(items)
+        pending = []
+        
+        # 캐시 우선 조회 (경로 / 핸들 - 크롭 핸들은 원본 해시 + 영역으로 키를 만듦)
+        handles = [None] * len(items)
+        for index, item in enumerate(items):
+            if isinstance(item, (str, ImageHandle)):
+                try:
+                    handles[index] = ImageHandle.ensure(item)
+                except (OSError, ValueError) as e:
+                    results[index] = f"이미지 처리 중 오류: {e}"
+                    continue
+                cache_keys[index] = self._cache_key(handles[index])
+                if cache_keys[index]:
+                    cached = self.cache.get(cache_keys[index])
+                    if cached:
+                        print(f"💾 캐시된 결과 사용: {handles[index].name}")
+                        results[index] = cached
+                        continue
+            pending.append(index)
+        
+        if not pending:
+            return results
+        
         if not self.ensure_model_loaded():
-            return "모델 로드 실패"
+            for index in pending:
+                results[index] = "모델 로드 실패"
+            return results
         
         try:
             if self.actual_device == "cpu":
-                print(f"⏳ CPU 모드로 처리 중: {os.path.basename(image_path)}")
-            
-            # 이미지 로드
-            image = Image.open(image_path).convert('RGB')
-            
-            # 간단한 프롬프트
-            prompt = "Find all text that has been manually circled with oval/elliptical pen marks and extract only those text items. Output only the results without any explanation or additional text."
-
-            # Qwen2-VL 전용 입력 형식
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "image", "image": image},
-                        {"type": "text", "text": prompt}
-                    ]
-                }
-            ]
-            
-            # 프로세서로 입력 처리
-            text = self.processor.apply_chat_template(
-                messages, 
-                tokenize=False, 
-                add_generation_prompt=True
-            )
+                print(f"⏳ CPU 모드로 처리 중: {len(pending)}개 이미지")
             
-            inputs = self.processor(
-                text=[text],
-                images=[image], 
-                padding=True,
-                return_tensors="pt"
-            )
-            
-            # 디바이스로 이동
-            if self.actual_device == "cuda":
-                inputs = inputs.to("cuda")
-            
-            # 추론 실행
-            with torch.no_grad():
-                generated_ids = self.model.generate(
-                    **inputs,
-                    max_new_tokens=512,
-                    do_sample=False,
-                    pad_token_id=self.processor.tokenizer.eos_token_id
-                )
-            
-            # 결과 디코딩
-            generated_ids_trimmed = [
-                out_ids[len(in_ids):] for in_ids, out_ids in zip(inputs.input_ids, generated_ids)
-            ]
+            # 이미지 준비 (핸들은 디코딩된 버퍼를 공유하는 PIL 뷰 사용)
+            images = []
+            for index in pending:
+                if handles[index] is not None:
+                    images.append(handles[index].pil)
+                else:
+                    images.append(items[index].convert('RGB'))
             
-            output_text = self.processor.batch_decode(
-                generated_ids_trimmed, 
-                skip_special_tokens=True, 
-                clean_up_tokenization_spaces=False
-            )[0]
+            outputs = self.inference.infer_many(images)
             
-            result = output_text.strip()
+            for index, result in zip(pending, outputs):
+                results[index] = result
+                if cache_keys[index] and result:
+                    self.cache.put(cache_keys[index], result, self.model_id, "local")
             
             if self.actual_device == "cpu":
-                print(f"✅ CPU 처리 완료: {len(result)}자 추출")
-            
-            return result
+                print(f"✅ CPU 처리 완료: {sum(len(r) for r in outputs)}자 추출")
             
         except Exception as e:
             error_msg = f"이미지 처리 중 오류: {e}"
             print(error_msg)
             import traceback
             traceback.print_exc()
-            return error_msg
+            for index in pending:
+                results[index] = error_msg
+        
+        return results
+    
+    def process_image(self, image_path):
+        """단일 이미지 OCR 처리 (캐시 우선 조회)"""
+        return self.process_batch([image_path])[0]
+    
+    def process_crops(self, crops):
+        """도형 감지 크롭 이미지들을 배치 크기 단위로 나눠 처리"""
+        if not crops:
+            return []
+        if not self.ensure_model_loaded():
+            return ["모델 로드 실패"] * len(crops)
+        
+        batch_size = self._auto_batch_size()
+        results = []
+        for start in range(0, len(crops), batch_size):
+            results.extend(self.process_batch(crops[start:start + batch_size]))
+        return results
+    
+    def socket_worker_cores(self):
+        """CPU 실행이고 소켓별 작업자가 켜져 있으면 소켓별 코어 목록 (아니면 None)"""
+        if self.target_device != "cpu":
+            return None
+        return socket_worker_cores()
+    
+    def _process_on_sockets(self, image_files, socket_cores):
+        """이미지를 소켓 수만큼 나눠 소켓별 작업자 프로세스에서 OCR - {경로: 결과}"""
+        shard_count = min(len(socket_cores), len(image_files))
+        shards = [image_files[index::shard_count] for index in range(shard_count)]
+        print(f"🧵 소켓별 작업자 {shard_count}개로 처리 (소켓당 코어 {', '.join(str(len(cores)) for cores in socket_cores[:shard_count])}개)")
+        
+        jobs = [(self.model_id, self.precision, shard) for shard in shards]
+        shard_results = run_socket_workers(ocr_image_files, jobs, socket_cores)
+        
+        results = {}
+        for shard, texts in zip(shards, shard_results):
+            results.update(zip(shard, texts))
+        return results
     
     @measure_time
     def process_images(self, image_files, output_base_dir):
         """여러 이미지 배치 처리 - 모델 재사용"""
-        if not self.ensure_model_loaded():
+        # 여러 소켓 CPU 서버면 소켓별 작업자 프로세스에서 먼저 OCR (이 프로세스는 모델을 로드하지 않음)
+        socket_cores = self.socket_worker_cores()
+        socket_results = None
+        if socket_cores:
+            start_time = time.time()
+            socket_results = self._process_on_sockets(image_files, socket_cores)
+            socket_time = (time.time() - start_time) / len(image_files)
+            self.actual_device = "cpu"
+        elif not self.ensure_model_loaded():
             print("❌ 모델이 로드되지 않았습니다.")
             return False
         
@@ -126,7 +217,7 @@ class LocalOCRProcessor:
         print(f"\n📁 결과 저장 폴더: {output_dir}")
         print(f"📊 처리할 이미지 수: {len(image_files)}")
         print(f"🧠 사용 모델: {self.model_id}")
-        print(f"💾 디바이스: {self.actual_device}")
+        print(f"💾 디바이스: {self.actual_device} ({self.precision})")
         
         # 메모리 사용량 표시
         memory_info = self.model_manager.get_memory_usage()
@@ -135,71 +226,91 @@ class LocalOCRProcessor:
         total_time = 0
         successful_count = 0
         results = []
+        self.cache.reset_stats()
+        
+        # 사용 가능한 메모리에 맞춘 배치 크기
+        batch_size = self._auto_batch_size()
+        print(f"📦 배치 크기: {batch_size}")
         
         # 진행률 표시
         with tqdm(total=len(image_files), desc="이미지 처리중") as pbar:
-            for i, image_path in enumerate(image_files):
-                filename = os.path.basename(image_path)
-                pbar.set_postfix({"현재": filename})
+            for batch_start in range(0, len(image_files), batch_size):
+                batch_files = image_files[batch_start:batch_start + batch_size]
+                pbar.set_postfix({"현재": os.path.basename(batch_files[0])})
                 
-                try:
-                    # OCR 처리 (시간 측정)
-                    start_time = time.time()
-                    result_text = self.process_image(image_path)
-                    process_time = time.time() - start_time
-                    total_time += process_time
+                # 배치 이미지를 한 번씩만 디코딩해서 OCR과 결과 저장에 함께 사용
+                batch_handles = []
+                for image_path in batch_files:
+                    try:
+                        batch_handles.append(ImageHandle.from_path(image_path))
+                    except (OSError, ValueError):
+                        batch_handles.append(image_path)
+                
+                # OCR 처리 (배치 단위 시간 측정 후 이미지별로 분배)
+                start_time = time.time()
+                if socket_results is not None:
+                    batch_results = [socket_results[image_path] for image_path in batch_files]
+                    process_time = socket_time
+                else:
+                    batch_results = self.process_batch(batch_handles)
+                    process_time = (time.time() - start_time) / len(batch_files)
+                total_time += process_time * len(batch_files)
+                
+                for image_path, handle, result_text in zip(batch_files, batch_handles, batch_results):
+                    filename = os.path.basename(image_path)
                     
-                    # 결과 저장
-                    if result_text and not result_text.startswith("모델 로드 실패") and not result_text.startswith("이미지 처리 중 오류"):
-                        successful_count += 1
-                        
-                        # 텍스트 파일 저장
-                        text_file = save_text_result(result_text, output_dir, filename)
-                        
-                        # 결과 이미지 생성
-                        base_name = os.path.splitext(filename)[0]
-                        output_image_path = os.path.join(output_dir, f"{base_name}_result.png")
-                        success = draw_text_on_image(image_path, result_text, output_image_path)
-                        
-                        # 텍스트 좌표 매핑 이미지 생성
-                        try:
-                            from text_coordinate_mapping import create_text_coordinate_mapping
-                            coord_success = create_text_coordinate_mapping(
-                                image_path, result_text, output_dir, method="auto"
-                            )
-                            if coord_success:
-                                print(f"🎯 좌표 매핑 이미지 생성 완료")
-                        except Exception as coord_error:
-                            print(f"⚠️  좌표 매핑 오류: {coord_error}")
-                        
-                        results.append({
-                            'file': filename,
-                            'success': True,
-                            'text_length': len(result_text),
-                            'time': process_time
-                        })
-                        
-                        print(f"✅ {filename}: {len(result_text)}자 추출 ({process_time:.2f}초)")
-                        
-                    else:
-                        print(f"⚠️  실패: {filename} - {result_text}")
+                    try:
+                        # 결과 저장
+                        if result_text and not result_text.startswith("모델 로드 실패") and not result_text.startswith("이미지 처리 중 오류"):
+                            successful_count += 1
+                            
+                            # 텍스트 파일 저장
+                            text_file = save_text_result(result_text, output_dir, filename)
+                            
+                            # 결과 이미지 생성
+                            base_name = os.path.splitext(filename)[0]
+                            output_image_path = os.path.join(output_dir, f"{base_name}_result.png")
+                            success = draw_text_on_image(handle, result_text, output_image_path)
+                            
+                            # 텍스트 좌표 매핑 이미지 생성
+                            try:
+                                from text_coordinate_mapping import create_text_coordinate_mapping
+                                coord_success = create_text_coordinate_mapping(
+                                    handle, result_text, output_dir, method="auto"
+                                )
+                                if coord_success:
+                                    print(f"🎯 좌표 매핑 이미지 생성 완료")
+                            except Exception as coord_error:
+                                print(f"⚠️  좌표 매핑 오류: {coord_error}")
+                            
+                            results.append({
+                                'file': filename,
+                                'success': True,
+                                'text_length': len(result_text),
+                                'time': process_time
+                            })
+                            
+                            print(f"✅ {filename}: {len(result_text)}자 추출 ({process_time:.2f}초)")
+                            
+                        else:
+                            print(f"⚠️  실패: {filename} - {result_text}")
+                            results.append({
+                                'file': filename,
+                                'success': False,
+                                'error': result_text,
+                                'time': process_time
+                            })
+                    
+                    except Exception as e:
+                        print(f"❌ 오류: {filename} - {str(e)}")
                         results.append({
                             'file': filename,
                             'success': False,
-                            'error': result_text,
-                            'time': process_time
+                            'error': str(e),
+                            'time': 0
                         })
-                
-                except Exception as e:
-                    print(f"❌ 오류: {filename} - {str(e)}")
-                    results.append({
-                        'file': filename,
-                        'success': False,
-                        'error': str(e),
-                        'time': 0
-                    })
-                
-                pbar.update(1)
+                    
+                    pbar.update(1)
         
         # 결과 요약 저장
         summary_path = os.path.join(output_dir, "summary.txt")
@@ -207,10 +318,20 @@ class LocalOCRProcessor:
             f.write(f"=== 로컬 모델 처리 결과 요약 ===\n")
             f.write(f"모델: {self.model_id}\n")
             f.write(f"디바이스: {self.actual_device}\n")
+            f.write(f"정밀도: {self.precision}\n")
+            if socket_cores:
+                f.write(f"소켓별 작업자: {min(len(socket_cores), len(image_files))}개 (CPU_PROFILE={os.getenv('CPU_PROFILE', 'tuned')})\n")
+            elif self.actual_device == "cpu":
+                f.write(f"CPU 프로파일: {get_cpu_profile().describe()}\n")
+            f.write(f"배치 크기: {batch_size}\n")
             f.write(f"성공: {successful_count}/{len(image_files)} 이미지\n")
             f.write(f"총 처리 시간: {total_time:.2f}초\n")
             f.write(f"평균 처리 시간: {total_time/len(image_files):.2f}초/이미지\n\n")
             
+            self.cache.write_summary(f)
+            self.inference.write_summary(f)
+            self.model_manager.write_precision_summary(f)
+            
             # 메모리 정보
             f.write(f"=== 메모리 사용 정보 ===\n")
             memory_info = self.model_manager.get_memory_usage()
@@ -249,13 +370,27 @@ class LocalOCRProcessor:
         print("🔗 모델 참조 정리 완료 (모델은 매니저가 유지)")
 
 
+def ocr_image_files(job):
+    """
+    소켓별 작업자 프로세스에서 실행 - (model_id, precision, 이미지 경로 목록)을 CPU로 OCR해서 결과 목록 반환
+    """
+    model_id, precision, image_paths = job
+    processor = LocalOCRProcessor(model_id, device="cpu", precision=precision)
+    batch_size = get_env_int('MAX_BATCH_SIZE', 4)
+    
+    results = []
+    for start in range(0, len(image_paths), batch_size):
+        results.extend(processor.process_batch(image_paths[start:start + batch_size]))
+    return results
+
+
 def run_local_ocr(model_info, image_files, output_dir):
     """로컬 OCR 실행 함수 - 개선된 버전"""
     processor = LocalOCRProcessor(model_info["model_id"])
     
     try:
-        # 모델 로드 (매니저를 통해)
-        if not processor.ensure_model_loaded():
+        # 모델 로드 (매니저를 통해, 소켓별 작업자로 처리하면 각 작업자가 로드)
+        if not processor.socket_worker_cores() and not processor.ensure_model_loaded():
             return False
         
         print(f"♻️  모델 준비 완료: {model_info['name']}")
@@ -303,8 +438,8 @@ def run_local_ocr(model_info, image_files, output_dir):
     processor = LocalOCRProcessor(model_info["model_id"])
     
     try:
-        # 모델 로드 (매니저를 통해)
-        if not processor.ensure_model_loaded():
+        # 모델 로드 (매니저를 통해, 소켓별 작업자로 처리하면 각 작업자가 로드)
+        if not processor.socket_worker_cores() and not processor.ensure_model_loaded():
             return False
         
         print(f"♾️  모델 준비 완료: {model_info['name']}")
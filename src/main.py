@@ -9,12 +9,13 @@ from dotenv import load_dotenv
 # 환경 변수 로드
 load_dotenv()
 
-from models import list_local_models, list_cloud_models, get_model_info
+from models import list_local_models, list_cloud_models, get_model_info, PRECISION_MODES
 from utils import (
     get_gpu_info, check_model_compatibility, get_image_files, 
     print_system_info, format_time
 )
 from local_ocr_improved import LocalOCRProcessor, get_loaded_models_info, clear_all_models, get_memory_info
+from model_manager import get_model_manager
 from cloud_ocr import run_cloud_ocr
 
 class OCRTestInterface:
@@ -23,6 +24,22 @@ class OCRTestInterface:
         self.output_dir = os.path.join(os.path.dirname(__file__), '..', 'output')
         self.api_key = os.getenv('QWEN_API_KEY')
         
+    def preload_model(self, model_id, device="auto", precision=None):
+        """로컬 모델을 백그라운드에서 미리 로드 (MODEL_PRELOAD=false면 생략)"""
+        if os.getenv('MODEL_PRELOAD', 'true').lower() != 'true':
+            return
+        try:
+            get_model_manager().preload(model_id, device, precision=precision)
+        except Exception as e:
+            print(f"⚠️  모델 미리 로드 실패: {e}")
+    
+    def preload_default_model(self):
+        """GPU가 있으면 기본 로컬 모델(DEFAULT_LOCAL_MODEL)을 메뉴가 표시되는 동안 미리 로드"""
+        gpu_name, _, _ = get_gpu_info()
+        model_info = get_model_info(os.getenv('DEFAULT_LOCAL_MODEL', 'qwen2.5-vl-3b'), "local")
+        if gpu_name and model_info:
+            self.preload_model(model_info['model_id'])
+        
     def show_main_menu(self):
         """메인 메뉴 표시"""
         print("\n" + "="*50)
@@ -83,7 +100,7 @@ class OCRTestInterface:
         
         for i, (key, info) in enumerate(models.items(), 1):
             print(f"{i}. {info['name']}")
-            print(f"   📊 파라미터: {info['params']}")
+            print(f"   📊 파라미터: {info['params']} | CPU 정밀도: {info['precision']['cpu']}")
             print(f"   💾 최소 GPU 메모리: {info['min_gpu_memory']}GB | 권장: {info['recommended_gpu_memory']}GB")
             
             # 호환성 체크
@@ -245,7 +262,7 @@ class OCRTestInterface:
                 for model_info in loaded_models:
                     status = "🔴" if model_info['is_current'] else "⚪"
                     model_name = model_info['model_id'].split('/')[-1]
-                    print(f"     {status} {model_name} ({model_info['device']})")
+                    print(f"     {status} {model_name} ({model_info['device']}, {model_info['precision']}, {model_info['bytes'] / 1024**3:.2f}GB)")
             else:
                 print("   로드된 모델 없음")
                 
@@ -287,6 +304,19 @@ class OCRTestInterface:
         
         return custom_info
     
+    def select_precision(self, default):
+        """CPU 실행 정밀도 선택 (Enter면 default)"""
+        modes = [mode for mode in PRECISION_MODES if mode != "fp16"]
+        print("\n🎚️  정밀도 선택:")
+        for i, mode in enumerate(modes, 1):
+            marker = " (기본)" if mode == default else ""
+            print(f"{i}. {mode}{marker} - {PRECISION_MODES[mode]['description']}")
+        
+        choice = input(f"선택하세요 (1-{len(modes)}, Enter: {default}): ").strip()
+        if choice.isdigit() and 1 <= int(choice) <= len(modes):
+            return modes[int(choice) - 1]
+        return default
+    
     def _run_local_with_processor(self, processor, image_files):
         """로컬 모델 프로세서로 직접 실행"""
         try:
@@ -321,7 +351,8 @@ class OCRTestInterface:
             print("❌ 처리할 이미지가 없습니다.")
             return
         
-        # 확인 메시지
+        # 확인 메시지를 기다리는 동안 모델 로드
+        self.preload_model(model_info['model_id'])
         print(f"📊 처리할 이미지: {len(image_files)}개")
         
         # 모델 매니저 상태 표시
@@ -417,6 +448,9 @@ class OCRTestInterface:
         """메인 실행 루프"""
         print("🚀 OCR 성능 테스트 도구 시작")
         
+        # 첫 로컬 처리 대기 시간을 줄이도록 기본 모델은 메뉴와 동시에 로드
+        self.preload_default_model()
+        
         while True:
             choice = self.show_main_menu()
             
@@ -443,10 +477,12 @@ class OCRTestInterface:
                         if confirm == 'y':
                             # 기본 3B 모델을 CPU로 실행
                             model_info = get_model_info("qwen2.5-vl-3b", "local")
+                            precision = self.select_precision(model_info['precision']['cpu'])
                             # 디바이스를 CPU로 강제 설정
-                            processor = LocalOCRProcessor(model_info["model_id"], device="cpu")
+                            processor = LocalOCRProcessor(model_info["model_id"], device="cpu", precision=precision)
                             image_files = get_image_files(self.input_dir)
                             if image_files:
+                                self.preload_model(model_info["model_id"], device="cpu", precision=precision)
                                 print(f"📊 처리할 이미지: {len(image_files)}개")
                                 confirm2 = input("처리를 시작하시겠습니까? (y/N): ").strip().lower()
                                 if confirm2 == 'y':
@@ -29,6 +29,10 @@ def show_model_status():
         print(f"🧠 메모리 사용량:")
         print(f"   로드된 모델 수: {memory_info['loaded_models']}/{memory_info['max_models']}")
         print(f"   현재 활성 모델: {memory_info.get('current_model', 'None')}")
+        print(f"   모델 메모리 합계: {memory_info['model_bytes_total'] / 1024**3:.2f}GB")
+        for device, budget in memory_info['memory_budget'].items():
+            if budget:
+                print(f"   {device} 메모리 예산: {budget / 1024**3:.2f}GB")
         
         if 'gpu_memory_allocated' in memory_info:
             print(f"   GPU 메모리 할당: {memory_info['gpu_memory_allocated']:.2f}GB")
@@ -42,6 +46,8 @@ def show_model_status():
                 status = "🟢 활성" if model_info['is_current'] else "⚪ 대기"
                 print(f"   {i}. {status} {model_info['model_id']}")
                 print(f"      디바이스: {model_info['device']}")
+                print(f"      정밀도: {model_info['precision']}")
+                print(f"      메모리: {model_info['bytes'] / 1024**3:.2f}GB")
                 print(f"      마지막 사용: {time.strftime('%H:%M:%S', time.localtime(model_info['last_used']))}")
                 print()
         else:
@@ -263,7 +269,7 @@ def performance_monitor():
         if loaded_models:
             for model_info in loaded_models:
                 status = "🔴 활성" if model_info['is_current'] else "⚪ 대기"
-                print(f"   {status} {model_info['model_id'].split('/')[-1]} ({model_info['device']})")
+                print(f"   {status} {model_info['model_id'].split('/')[-1]} ({model_info['device']}, {model_info['precision']}, {model_info['bytes'] / 1024**3:.2f}GB)")
         
     except Exception as e:
         print(f"❌ 성능 모니터링 실패: {e}")
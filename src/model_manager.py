@@ -4,19 +4,38 @@
 
 import torch
 import os
+import re
+import psutil
 from typing import Optional, Dict, Any
 import threading
 import time
+from concurrent.futures import Future
 
 try:
     from transformers import Qwen2VLForConditionalGeneration, AutoProcessor
 except ImportError:
     from transformers import AutoModelForCausalLM as Qwen2VLForConditionalGeneration, AutoProcessor
 
+from models import PRECISION_MODES, get_local_model_by_id, get_precision
+from cpu_profile import get_cpu_profile
+
+# 정밀도 모드별 로드 dtype (int8은 fp32로 로드한 뒤 선형 계층을 동적 양자화)
+PRECISION_DTYPES = {
+    "fp32": torch.float32,
+    "fp16": torch.float16,
+    "bf16": torch.bfloat16,
+    "int8": torch.float32,
+}
+
 class ModelManager:
     """
     싱글톤 패턴으로 모델을 관리하는 클래스
     한 번 로드된 모델을 메모리에 유지하고 재사용
+
+    모델 정리는 개수가 아닌 디바이스별 메모리 예산 기준:
+    새 모델을 로드하기 전에 예상 크기가 예산에 들어갈 때까지 가장 오래 사용되지 않은 모델부터 정리함.
+    모델 크기는 로드 후 파라미터/버퍼 바이트와 GPU 할당량 증가분 중 큰 값으로 측정하고,
+    한 번 측정한 크기는 다시 로드할 때 예상 크기로 사용
     """
     _instance = None
     _lock = threading.Lock()
@@ -30,9 +49,20 @@ class ModelManager:
     
     def __init__(self):
         if not hasattr(self, 'initialized'):
-            self.models = {}  # {model_id: {'model': model, 'processor': processor, 'device': device, 'last_used': time}}
+            self.models = {}  # {model_id: {'model': model, 'processor': processor, 'device': device, 'last_used': time, 'bytes': 크기}}
             self.current_model_id = None
-            self.max_models = 2  # 최대 2개 모델까지 메모리에 유지
+            # 최대 모델 수 (메모리 예산과 함께 적용되는 보조 제한)
+            self.max_models = int(os.getenv('MODEL_MAX_LOADED', '4'))
+            # 디바이스별 메모리 예산 (GB, 0이면 장치 메모리 × MODEL_MEMORY_FRACTION)
+            self.memory_budget_gb = float(os.getenv('MODEL_MEMORY_BUDGET_GB', '0'))
+            self.memory_fraction = float(os.getenv('MODEL_MEMORY_FRACTION', '0.8'))
+            self.footprints = {}  # {cache_key: 측정된 바이트} - 정리된 모델을 다시 로드할 때 예상 크기
+            # 정밀도 모드별 측정값 {cache_key: {'bytes', 'load_time', 'warmup_time', 'generate_calls', ...}}
+            self.precision_stats = {}
+            # 로드 중인 모델 - 같은 모델을 동시에 요청하면 하나의 로드 결과를 기다림
+            self._load_lock = threading.RLock()
+            self._pending = {}  # {cache_key: Future}
+            self._reserved = {}  # {cache_key: (device, 예상 바이트)} - 로드 중인 모델의 예산 몫
             self.initialized = True
             print("🔧 모델 매니저 초기화 완료")
     
@@ -52,43 +82,136 @@ class ModelManager:
                 return "cpu"
         return device
     
-    def get_model(self, model_id: str, device: str = "auto", force_reload: bool = False):
+    def get_model(self, model_id: str, device: str = "auto", force_reload: bool = False, warmup: bool = False,
+                  precision: Optional[str] = None):
         """
         모델을 가져오거나 로드함
         
+        같은 모델을 이미 다른 스레드가 로드 중이면 (preload 포함) 새로 로드하지 않고 그 결과를 기다림
+        
         Args:
             model_id: 모델 식별자 (예: "Qwen/Qwen2.5-VL-3B-Instruct")
             device: 디바이스 ("auto", "cuda", "cpu")
             force_reload: 강제로 다시 로드할지 여부
+            warmup: 새로 로드한 경우 작은 더미 추론으로 첫 추론 지연을 미리 처리할지 여부
+            precision: 정밀도 모드 ("fp32", "fp16", "bf16", "int8", None이면 models.get_precision 기준)
         
         Returns:
             (model, processor, actual_device) 튜플
         """
         actual_device = self._get_device(device)
-        cache_key = f"{model_id}_{actual_device}"
+        precision = get_precision(model_id, actual_device, precision)
+        cache_key = f"{model_id}_{actual_device}_{precision}"
         
-        # 이미 로드된 모델이 있고 강제 리로드가 아니면 재사용
-        if cache_key in self.models and not force_reload:
-            model_info = self.models[cache_key]
-            model_info['last_used'] = time.time()
-            self.current_model_id = cache_key
+        with self._load_lock:
+            # 이미 로드된 모델이 있고 강제 리로드가 아니면 재사용
+            if cache_key in self.models and not force_reload:
+                return self._reuse_model(cache_key)
             
-            print(f"♻️  기존 모델 재사용: {model_id}")
-            print(f"📍 디바이스: {actual_device}")
+            future = self._pending.get(cache_key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._pending[cache_key] = future
+        
+        if not owner:
+            # 다른 스레드의 로드 결과 대기 (중복 로드 방지)
+            print(f"⏳ 로딩 중인 모델 대기: {model_id}")
+            return future.result()
+        
+        return self._run_load(future, model_id, actual_device, precision, cache_key, warmup)
+    
+    def preload(self, model_id: str, device: str = "auto", warmup: bool = True, precision: Optional[str] = None):
+        """
+        백그라운드 스레드에서 모델을 미리 로드 (대화식 메뉴가 표시되는 동안)
+        
+        로드 후 작은 더미 추론으로 CUDA 커널 초기화까지 끝내 두며,
+        그 사이 get_model()을 호출하면 같은 로드를 기다림
+        
+        Returns:
+            (model, processor, actual_device)를 결과로 갖는 Future
+        """
+        actual_device = self._get_device(device)
+        precision = get_precision(model_id, actual_device, precision)
+        cache_key = f"{model_id}_{actual_device}_{precision}"
+        
+        with self._load_lock:
+            future = self._pending.get(cache_key)
+            if future is not None:
+                return future
             
-            return model_info['model'], model_info['processor'], actual_device
+            future = Future()
+            if cache_key in self.models:
+                model_info = self.models[cache_key]
+                future.set_result((model_info['model'], model_info['processor'], actual_device))
+                return future
+            self._pending[cache_key] = future
         
-        # 새로 로드해야 하는 경우
+        print(f"🕒 백그라운드 모델 로딩 시작: {model_id}")
+        thread = threading.Thread(
+            target=self._run_load,
+            args=(future, model_id, actual_device, precision, cache_key, warmup),
+            kwargs={'background': True},
+            name="model-preload",
+            daemon=True
+        )
+        thread.start()
+        return future
+    
+    def _reuse_model(self, cache_key):
+        """로드된 모델 재사용 (_load_lock 안에서 호출)"""
+        model_info = self.models[cache_key]
+        model_info['last_used'] = time.time()
+        self.current_model_id = cache_key
+        
+        print(f"♻️  기존 모델 재사용: {model_info['model_id']}")
+        print(f"📍 디바이스: {model_info['device']}")
+        
+        return model_info['model'], model_info['processor'], model_info['device']
+    
+    def _run_load(self, future, model_id, actual_device, precision, cache_key, warmup, background=False):
+        """모델을 로드해서 future에 결과를 전달 (background면 예외를 future에만 기록)"""
+        try:
+            result = self._load_model(model_id, actual_device, precision, cache_key, warmup)
+        except BaseException as e:
+            with self._load_lock:
+                self._pending.pop(cache_key, None)
+            future.set_exception(e)
+            if background:
+                print(f"❌ 백그라운드 모델 로딩 실패: {model_id} - {e}")
+                return None
+            raise
+        
+        with self._load_lock:
+            self._pending.pop(cache_key, None)
+        future.set_result(result)
+        return result
+    
+    def _load_model(self, model_id, actual_device, precision, cache_key, warmup=False):
+        """모델/프로세서 로드 (같은 cache_key의 로드는 _pending으로 한 번만 실행됨)"""
         print(f"🔄 새 모델 로딩: {model_id}")
         print(f"📍 디바이스: {actual_device}")
+        print(f"🎚️  정밀도: {precision} - {PRECISION_MODES[precision]['description']}")
         
         if actual_device == "cpu":
             print("⚠️  CPU 모드로 실행됩니다. 매우 느릴 수 있습니다.")
             print("⏳ 모델 로딩에 몇 분이 걸릴 수 있습니다...")
         
+        dtype = PRECISION_DTYPES[precision]
+        expected_bytes = 0
+        load_start = time.time()
+        
         try:
-            # 메모리 정리 (필요시)
-            self._cleanup_old_models()
+            with self._load_lock:
+                # 강제 리로드면 기존 모델부터 정리
+                if cache_key in self.models:
+                    self._evict_model(cache_key)
+                
+                # 새 모델이 예산에 들어갈 때까지 오래된 모델 정리 (동시에 로드 중인 모델 크기 포함)
+                expected_bytes = self._estimate_model_bytes(model_id, cache_key, precision)
+                self._cleanup_old_models(expected_bytes, actual_device)
+                self._reserved[cache_key] = (actual_device, expected_bytes)
+            allocated_before = self._cuda_allocated()
             
             # 프로세서 로드
             print("📦 프로세서 로딩 중...")
@@ -102,84 +225,246 @@ class ModelManager:
             if actual_device == "cpu":
                 model = Qwen2VLForConditionalGeneration.from_pretrained(
                     model_id,
-                    torch_dtype=torch.float32,
+                    torch_dtype=dtype,
                     device_map=None,
                     trust_remote_code=True
                 )
                 model = model.to("cpu")
+                
+                if precision == "int8":
+                    # 선형 계층 가중치를 int8로 동적 양자화 (활성화는 추론 시 양자화)
+                    print("🗜️  선형 계층 int8 동적 양자화 중...")
+                    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
             else:
                 model = Qwen2VLForConditionalGeneration.from_pretrained(
                     model_id,
-                    torch_dtype=torch.float16,
+                    torch_dtype=dtype,
                     device_map="auto",
                     trust_remote_code=True
                 )
             
-            # 캐시에 저장
-            self.models[cache_key] = {
-                'model': model,
-                'processor': processor,
-                'device': actual_device,
-                'last_used': time.time(),
-                'model_id': model_id
-            }
+            # 실제 크기 측정 (첫 추론 준비 전 - 활성화 메모리 제외)
+            model_bytes = self._measure_model_bytes(model, actual_device, allocated_before)
+            load_time = time.time() - load_start
+            
+            warmup_time = self._warmup_model(model, processor, actual_device) if warmup else None
             
-            self.current_model_id = cache_key
+            with self._load_lock:
+                self._reserved.pop(cache_key, None)
+                self.footprints[cache_key] = model_bytes
+                
+                # 정밀도 모드별 측정값 (다시 로드해도 추론 통계는 이어서 누적)
+                stats = self.precision_stats.setdefault(cache_key, {
+                    'model_id': model_id, 'device': actual_device, 'precision': precision,
+                    'generate_calls': 0, 'generate_items': 0, 'generate_time': 0.0
+                })
+                stats.update({'bytes': model_bytes, 'load_time': load_time, 'warmup_time': warmup_time})
+                
+                # 캐시에 저장
+                self.models[cache_key] = {
+                    'model': model,
+                    'processor': processor,
+                    'device': actual_device,
+                    'last_used': time.time(),
+                    'model_id': model_id,
+                    'precision': precision,
+                    'bytes': model_bytes
+                }
+                
+                self.current_model_id = cache_key
             
-            print("✅ 모델 로딩 완료")
+            print(f"✅ 모델 로딩 완료: {model_id} [{precision}] ({model_bytes / 1024**3:.2f}GB, {load_time:.1f}초)")
             return model, processor, actual_device
             
         except Exception as e:
+            with self._load_lock:
+                self._reserved.pop(cache_key, None)
             print(f"❌ 모델 로딩 실패: {e}")
             
             # GPU 실패 시 CPU로 재시도
             if actual_device == "cuda":
                 print("♾️ CPU 모드로 재시도...")
-                return self.get_model(model_id, "cpu", force_reload)
+                return self.get_model(model_id, "cpu", warmup=warmup)
             
             raise e
     
-    def _cleanup_old_models(self):
-        """오래된 모델들을 메모리에서 정리"""
-        if len(self.models) >= self.max_models:
-            # 가장 오래 사용되지 않은 모델 찾기
-            oldest_key = min(self.models.keys(), 
-                           key=lambda k: self.models[k]['last_used'])
+    def _warmup_model(self, model, processor, device):
+        """
+        작은 더미 이미지로 토큰 1개만 생성해서 CUDA 커널/초기화 비용을 미리 처리 (걸린 시간, 실패하면 None)
+
+        CPU는 CPU 프로파일로 실행하므로 compile 프로파일이면 컴파일도 여기서 끝남
+        """
+        try:
+            from PIL import Image
             
-            print(f"🧹 오래된 모델 정리: {self.models[oldest_key]['model_id']}")
+            context = torch.no_grad()
+            if device == "cpu":
+                profile = get_cpu_profile()
+                model = profile.prepare_model(model)
+                context = profile.inference_context()
             
-            # 모델 정리
-            model_info = self.models[oldest_key]
-            del model_info['model']
-            del model_info['processor']
-            del self.models[oldest_key]
+            start_time = time.time()
+            image = Image.new("RGB", (56, 56), "white")
+            messages = [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "image", "image": image},
+                        {"type": "text", "text": "OCR"}
+                    ]
+                }
+            ]
+            text = processor.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+            inputs = processor(text=[text], images=[image], return_tensors="pt")
+            if device == "cuda":
+                inputs = inputs.to("cuda")
             
-            # GPU 메모리 정리
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
+            with context:
+                model.generate(**inputs, max_new_tokens=1, do_sample=False)
+            
+            if device == "cuda":
+                torch.cuda.synchronize()
+            elapsed = time.time() - start_time
+            print(f"🔥 모델 워밍업 완료 ({elapsed:.2f}초)")
+            return elapsed
+        except Exception as e:
+            # 워밍업 실패는 첫 추론이 조금 느려질 뿐
+            print(f"⚠️  모델 워밍업 실패: {e}")
+            return None
+    
+    def _estimate_model_bytes(self, model_id, cache_key, precision):
+        """
+        로드 전 예상 모델 크기 (바이트)
+
+        이전에 측정한 크기가 있으면 그 값, 없으면 파라미터 수 × 정밀도별 바이트.
+        파라미터 수는 models.py의 params 값 (없으면 모델 이름의 "7B" 등), 알 수 없으면 0
+        """
+        if cache_key in self.footprints:
+            return self.footprints[cache_key]
+        
+        info = get_local_model_by_id(model_id)
+        match = re.search(r'(\d+(?:\.\d+)?)B', info['params'] if info else model_id)
+        if not match:
+            return 0
+        return int(float(match.group(1)) * 1e9 * PRECISION_MODES[precision]['bytes'])
+    
+    def _cuda_allocated(self):
+        """모든 GPU의 현재 할당 바이트 (GPU가 없으면 0)"""
+        if not torch.cuda.is_available():
+            return 0
+        return sum(torch.cuda.memory_allocated(i) for i in range(torch.cuda.device_count()))
+    
+    def _measure_model_bytes(self, model, device, allocated_before=0):
+        """
+        로드된 모델 크기 - 가중치 바이트와 GPU 할당량 증가분 중 큰 값
+
+        동적 양자화된 선형 계층의 int8 가중치는 parameters()에 나오지 않으므로 state_dict 기준
+        (양자화 계층은 (가중치, 편향) 튜플로 저장됨)
+        """
+        model_bytes = 0
+        for value in model.state_dict().values():
+            for tensor in (value if isinstance(value, tuple) else (value,)):
+                if isinstance(tensor, torch.Tensor):
+                    model_bytes += tensor.numel() * tensor.element_size()
+        if device == "cuda":
+            model_bytes = max(model_bytes, self._cuda_allocated() - allocated_before)
+        return model_bytes
+    
+    def _memory_budget(self, device):
+        """디바이스의 모델 메모리 예산 (바이트, 알 수 없으면 None)"""
+        if self.memory_budget_gb > 0:
+            return int(self.memory_budget_gb * 1024**3)
+        try:
+            if device == "cuda":
+                total = sum(torch.cuda.get_device_properties(i).total_memory for i in range(torch.cuda.device_count()))
+            else:
+                total = psutil.virtual_memory().total
+        except Exception:
+            return None
+        return int(total * self.memory_fraction)
+    
+    def _held_bytes(self, device=None, include_reserved=False):
+        """로드된 모델들이 차지한 바이트 (device가 있으면 그 디바이스만, include_reserved면 로드 중인 모델 포함)"""
+        held = sum(
+            info['bytes'] for info in self.models.values()
+            if device is None or info['device'] == device
+        )
+        if include_reserved:
+            held += sum(
+                reserved_bytes for reserved_device, reserved_bytes in self._reserved.values()
+                if device is None or reserved_device == device
+            )
+        return held
+    
+    def _evict_model(self, cache_key):
+        """모델 하나를 메모리에서 정리"""
+        model_info = self.models.pop(cache_key)
+        print(f"🧹 모델 정리: {model_info['model_id']} ({model_info['bytes'] / 1024**3:.2f}GB)")
+        
+        del model_info['model']
+        del model_info['processor']
+        if self.current_model_id == cache_key:
+            self.current_model_id = None
+        
+        # GPU 메모리 정리
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    
+    def _cleanup_old_models(self, incoming_bytes=0, device=None):
+        """
+        새 모델(incoming_bytes, device)이 들어갈 자리가 생길 때까지 오래된 모델 정리
+
+        같은 디바이스의 모델 크기 합 + 새 모델이 예산을 넘거나 모델 수가 max_models에 도달하면
+        가장 오래 사용되지 않은 모델부터 정리. 모두 정리해도 예산을 넘으면 경고만 출력 (로드는 시도)
+        """
+        budget = self._memory_budget(device) if device else None
+        
+        while self.models:
+            over_budget = budget is not None and self._held_bytes(device, include_reserved=True) + incoming_bytes > budget
+            over_count = len(self.models) >= self.max_models
+            if not over_budget and not over_count:
+                break
+            
+            # 예산 초과는 같은 디바이스 모델만 정리해야 자리가 생김
+            candidates = [
+                key for key, info in self.models.items()
+                if not over_budget or info['device'] == device
+            ]
+            if not candidates:
+                break
+            
+            oldest_key = min(candidates, key=lambda k: self.models[k]['last_used'])
+            self._evict_model(oldest_key)
+        
+        if budget is not None and incoming_bytes > budget:
+            print(f"⚠️  모델 예상 크기 {incoming_bytes / 1024**3:.2f}GB가 메모리 예산 {budget / 1024**3:.2f}GB보다 큽니다")
     
     def list_loaded_models(self):
         """현재 로드된 모델들의 정보 반환"""
         result = []
-        for cache_key, model_info in self.models.items():
-            result.append({
-                'cache_key': cache_key,
-                'model_id': model_info['model_id'],
-                'device': model_info['device'],
-                'last_used': model_info['last_used'],
-                'is_current': cache_key == self.current_model_id
-            })
+        with self._load_lock:
+            for cache_key, model_info in self.models.items():
+                result.append({
+                    'cache_key': cache_key,
+                    'model_id': model_info['model_id'],
+                    'device': model_info['device'],
+                    'precision': model_info['precision'],
+                    'last_used': model_info['last_used'],
+                    'bytes': model_info['bytes'],
+                    'is_current': cache_key == self.current_model_id
+                })
         return result
     
     def clear_all_models(self):
         """모든 모델을 메모리에서 정리"""
         print("🧹 모든 모델 정리 중...")
-        for model_info in self.models.values():
-            del model_info['model']
-            del model_info['processor']
-        
-        self.models.clear()
-        self.current_model_id = None
+        with self._load_lock:
+            for model_info in self.models.values():
+                del model_info['model']
+                del model_info['processor']
+            
+            self.models.clear()
+            self.current_model_id = None
         
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
@@ -191,7 +476,15 @@ class ModelManager:
         info = {
             'loaded_models': len(self.models),
             'max_models': self.max_models,
-            'current_model': self.current_model_id
+            'current_model': self.current_model_id,
+            # 모델별 / 전체 차지 바이트
+            'model_bytes': {cache_key: model_info['bytes'] for cache_key, model_info in self.models.items()},
+            'model_bytes_total': self._held_bytes(),
+            # 로드된 모델이 있는 디바이스의 예산 (바이트)
+            'memory_budget': {
+                device: self._memory_budget(device)
+                for device in sorted({model_info['device'] for model_info in self.models.values()})
+            }
         }
         
         if torch.cuda.is_available():
@@ -200,14 +493,52 @@ class ModelManager:
         
         return info
     
+    def record_inference(self, model, elapsed, items):
+        """로드된 모델의 generate 한 번 (items개 이미지, elapsed초)을 정밀도 모드별 통계에 기록"""
+        with self._load_lock:
+            for cache_key, model_info in self.models.items():
+                if model_info['model'] is model:
+                    stats = self.precision_stats.get(cache_key)
+                    if stats is not None:
+                        stats['generate_calls'] += 1
+                        stats['generate_items'] += items
+                        stats['generate_time'] += elapsed
+                    return
+    
+    def get_precision_stats(self):
+        """정밀도 모드별 측정값 목록 (메모리, 로드/워밍업 시간, 이미지당 추론 시간)"""
+        with self._load_lock:
+            result = [dict(stats) for stats in self.precision_stats.values()]
+        for stats in result:
+            stats['seconds_per_item'] = stats['generate_time'] / stats['generate_items'] if stats['generate_items'] else None
+        return result
+    
+    def write_precision_summary(self, f):
+        """summary.txt에 정밀도 모드별 메모리/지연 시간 기록"""
+        f.write("=== 정밀도 모드별 측정 ===\n")
+        stats_list = self.get_precision_stats()
+        if not stats_list:
+            f.write("측정 없음\n\n")
+            return
+        for stats in stats_list:
+            line = f"{stats['model_id']} [{stats['device']}, {stats['precision']}]: {stats['bytes'] / 1024**3:.2f}GB, 로드 {stats['load_time']:.1f}초"
+            if stats['warmup_time'] is not None:
+                line += f", 워밍업 {stats['warmup_time']:.2f}초"
+            if stats['seconds_per_item'] is not None:
+                line += f", 이미지당 {stats['seconds_per_item']:.2f}초 ({stats['generate_items']}개)"
+            f.write(line + "\n")
+        f.write("\n")
+    
     def change_max_models(self, max_models: int):
         """최대 모델 수 변경"""
         old_max = self.max_models
         self.max_models = max_models
         
-        # 현재 로드된 모델이 새로운 최대값보다 많으면 정리
-        while len(self.models) > self.max_models:
-            self._cleanup_old_models()
+        # 현재 로드된 모델이 새로운 최대값보다 많으면 오래된 모델부터 정리
+        with self._load_lock:
+            while len(self.models) > self.max_models:
+                oldest_key = min(self.models.keys(), key=lambda k: self.models[k]['last_used'])
+                self._evict_model(oldest_key)
         
         print(f"📊 최대 모델 수 변경: {old_max} → {max_models}")
 
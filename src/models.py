@@ -2,6 +2,18 @@
 사용 가능한 모델 정보 관리
 """
 
+import os
+
+# 로컬 모델 정밀도 모드 (파라미터 1개당 바이트)
+#   fp32: 전체 정밀도 / fp16: GPU 기본 / bf16: CPU에서 fp32의 절반 메모리
+#   int8: 선형 계층 동적 양자화 (CPU 전용, 나머지 계층은 fp32)
+PRECISION_MODES = {
+    "fp32": {"bytes": 4, "description": "전체 정밀도 (가장 느리고 메모리 최대)"},
+    "fp16": {"bytes": 2, "description": "GPU 반정밀도"},
+    "bf16": {"bytes": 2, "description": "CPU/GPU bfloat16 (fp32 대비 메모리 절반)"},
+    "int8": {"bytes": 1, "description": "선형 계층 int8 동적 양자화 (CPU 전용)"},
+}
+
 AVAILABLE_LOCAL_MODELS = {
     "qwen2.5-vl-7b": {
         "name": "Qwen2.5-VL-7B-Instruct",
@@ -9,7 +21,8 @@ AVAILABLE_LOCAL_MODELS = {
         "params": "7B",
         "min_gpu_memory": 14,  # GB
         "recommended_gpu_memory": 16,  # GB
-        "description": "최고 성능, 복잡한 이미지 처리 우수"
+        "description": "최고 성능, 복잡한 이미지 처리 우수",
+        "precision": {"cuda": "fp16", "cpu": "int8"}  # 디바이스별 기본 정밀도
     },
     "qwen2.5-vl-3b": {
         "name": "Qwen2.5-VL-3B-Instruct", 
@@ -17,7 +30,8 @@ AVAILABLE_LOCAL_MODELS = {
         "params": "3B",
         "min_gpu_memory": 6,
         "recommended_gpu_memory": 8,
-        "description": "균형잡힌 성능, 일반적인 OCR 작업"
+        "description": "균형잡힌 성능, 일반적인 OCR 작업",
+        "precision": {"cuda": "fp16", "cpu": "bf16"}
     },
     "qwen2.5-vl-2b": {
         "name": "Qwen2.5-VL-2B-Instruct",
@@ -25,7 +39,8 @@ AVAILABLE_LOCAL_MODELS = {
         "params": "2B",
         "min_gpu_memory": 4,
         "recommended_gpu_memory": 6,
-        "description": "빠른 처리, 간단한 텍스트 인식"
+        "description": "빠른 처리, 간단한 텍스트 인식",
+        "precision": {"cuda": "fp16", "cpu": "bf16"}
     },
     "qwen2-vl-2b": {
         "name": "Qwen2-VL-2B-Instruct",
@@ -33,7 +48,8 @@ AVAILABLE_LOCAL_MODELS = {
         "params": "2B", 
         "min_gpu_memory": 4,
         "recommended_gpu_memory": 6,
-        "description": "구버전 2B 모델, 안정성 검증됨"
+        "description": "구버전 2B 모델, 안정성 검증됨",
+        "precision": {"cuda": "fp16", "cpu": "bf16"}
     }
 }
 
@@ -62,3 +78,28 @@ def list_local_models():
 def list_cloud_models():
     """클라우드 모델 목록 반환"""
     return CLOUD_MODELS
+
+def get_local_model_by_id(model_id):
+    """모델 ID(예: "Qwen/Qwen2.5-VL-3B-Instruct")로 로컬 모델 정보 찾기 (없으면 None)"""
+    for info in AVAILABLE_LOCAL_MODELS.values():
+        if info["model_id"] == model_id:
+            return info
+    return None
+
+def get_precision(model_id, device, precision=None):
+    """
+    로드할 정밀도 결정 - 지정값 > MODEL_PRECISION 환경 변수 > 모델별 기본값 > (GPU fp16 / CPU fp32)
+
+    int8 동적 양자화는 CPU 전용이므로 GPU에서는 fp16으로 바꿈
+    """
+    precision = precision or os.getenv('MODEL_PRECISION', '').strip().lower() or None
+    if precision is None:
+        info = get_local_model_by_id(model_id)
+        if info and "precision" in info:
+            precision = info["precision"].get(device)
+    if precision not in PRECISION_MODES:
+        precision = "fp16" if device == "cuda" else "fp32"
+    if precision == "int8" and device == "cuda":
+        precision = "fp16"
+    return precision
+
@@ -0,0 +1,202 @@
+"""
+OCR 결과 캐시 - 이미지 내용 해시 + 모델 + 모드 + 프롬프트 + 크롭 영역 기반 (SQLite)
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), '..', 'cache', 'ocr_cache.sqlite')
+
+
+def hash_bytes(data):
+    """바이트 데이터의 SHA-256 해시"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(file_path):
+    """파일 내용의 SHA-256 해시"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """
+    크기 제한 LRU 방식의 영구 OCR 결과 캐시
+
+    같은 이미지/모델/모드/프롬프트/크롭 영역 조합은 API나 모델을 다시 호출하지 않고
+    저장된 결과를 재사용함. 전체 크기가 max_bytes를 넘으면 가장 오래 사용되지 않은 항목부터 삭제
+    """
+
+    def __init__(self, db_path=None, max_bytes=None, enabled=True):
+        self.db_path = os.path.abspath(db_path or DEFAULT_CACHE_PATH)
+        self.max_bytes = max_bytes if max_bytes is not None else 256 * 1024 * 1024
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if self.enabled:
+            try:
+                self._open()
+            except Exception as e:
+                print(f"⚠️  OCR 캐시 초기화 실패 (캐시 비활성화): {e}")
+                self.enabled = False
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ocr_results (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                model TEXT,
+                mode TEXT,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON ocr_results(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(image_hash, model_name, mode, prompt, crop_box=None):
+        """캐시 키 생성"""
+        box = ",".join(str(int(v)) for v in crop_box) if crop_box else "full"
+        raw = "\x1f".join([image_hash, model_name, mode, hash_bytes(prompt.encode('utf-8')), box])
+        return hash_bytes(raw.encode('utf-8'))
+
+    def get(self, key):
+        """캐시 조회 - 없으면 None"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM ocr_results WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE ocr_results SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, result, model_name=None, mode=None):
+        """결과 저장 후 크기 제한 초과분 정리"""
+        if not self.enabled or not result:
+            return
+
+        size = len(result.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_results (key, result, size, model, mode, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, result, size, model_name, mode, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """전체 크기가 max_bytes 이하가 될 때까지 LRU 항목 삭제 (잠금 보유 상태에서 호출)"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM ocr_results ORDER BY last_access ASC"
+        ).fetchall()
+
+        evict_keys = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evict_keys.append((key,))
+            total -= size
+
+        self._conn.executemany("DELETE FROM ocr_results WHERE key = ?", evict_keys)
+
+    def reset_stats(self):
+        """적중/미스 카운터 초기화"""
+        self.hits = 0
+        self.misses = 0
+
+    def get_stats(self):
+        """캐시 통계 반환"""
+        stats = {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': 0,
+            'size_bytes': 0,
+            'max_bytes': self.max_bytes
+        }
+
+        if self.enabled:
+            with self._lock:
+                entries, size = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_results"
+                ).fetchone()
+            stats['entries'] = entries
+            stats['size_bytes'] = size
+
+        return stats
+
+    def clear(self):
+        """캐시 전체 삭제"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._conn.execute("DELETE FROM ocr_results")
+            self._conn.commit()
+
+    def write_summary(self, f):
+        """summary.txt에 캐시 통계 기록"""
+        stats = self.get_stats()
+        f.write(f"=== OCR 캐시 ===\n")
+        if not stats['enabled']:
+            f.write("캐시: 비활성화\n\n")
+            return
+
+        total = stats['hits'] + stats['misses']
+        hit_rate = stats['hits'] / total * 100 if total else 0
+        f.write(f"캐시 적중: {stats['hits']}회 / 미스: {stats['misses']}회 (적중률 {hit_rate:.1f}%)\n")
+        f.write(f"캐시 항목: {stats['entries']}개, {stats['size_bytes'] / 1024:.1f}KB / {stats['max_bytes'] / 1024**2:.0f}MB\n\n")
+
+
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache():
+    """공유 OCR 캐시 인스턴스 반환 (환경 변수로 설정)"""
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                enabled = os.getenv('OCR_CACHE_ENABLED', 'true').lower() == 'true'
+                try:
+                    max_mb = float(os.getenv('OCR_CACHE_MAX_MB', '256'))
+                except ValueError:
+                    max_mb = 256
+                _cache_instance = OCRCache(
+                    db_path=os.getenv('OCR_CACHE_PATH') or None,
+                    max_bytes=int(max_mb * 1024 * 1024),
+                    enabled=enabled
+                )
+    return _cache_instance
@@ -0,0 +1,68 @@
+"""
+병렬 처리 유틸리티 - 동시 실행 수가 제한된 작업 분배
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def get_env_int(name, default):
+    """정수형 환경 변수 읽기 (잘못된 값이면 기본값 사용)"""
+    try:
+        value = int(os.getenv(name, default))
+        return value if value > 0 else default
+    except (TypeError, ValueError):
+        return default
+
+
+def run_bounded(func, items, max_workers=4, timeout=None):
+    """
+    items의 각 항목에 func를 동시에 적용하되, 동시 실행 수를 max_workers로 제한
+
+    Args:
+        func: 항목 하나를 받아 결과를 반환하는 함수
+        items: 처리할 항목 리스트
+        max_workers: 동시에 실행할 최대 작업 수
+        timeout: 전체 대기 시간 제한 (초, None이면 무제한)
+
+    Returns:
+        입력 순서와 같은 순서의 (result, error) 튜플 리스트.
+        실패하거나 시간 초과된 항목은 result가 None이고 error에 예외가 담김
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    results = [(None, None)] * len(items)
+    max_workers = max(1, min(max_workers, len(items)))
+    deadline = time.time() + timeout if timeout else None
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {executor.submit(func, item): index for index, item in enumerate(items)}
+        pending = set(futures)
+
+        while pending:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = futures[future]
+                try:
+                    results[index] = (future.result(), None)
+                except Exception as e:
+                    results[index] = (None, e)
+
+        # 시간 내에 끝나지 않은 작업은 기다리지 않고 실패로 처리
+        for future in pending:
+            future.cancel()
+            results[futures[future]] = (None, TimeoutError("작업 시간 초과"))
+    finally:
+        executor.shutdown(wait=deadline is None, cancel_futures=True)
+
+    return results
@@ -0,0 +1,162 @@
+"""
+요청 이미지 최적화 - 모드별 형식/품질/최대 크기로 인코딩해서 업로드 바이트와 이미지 토큰을 줄임
+"""
+
+import os
+import math
+import threading
+
+from image_handle import ImageHandle
+from parallel_utils import get_env_int
+
+# 모델이 실제로 사용하는 최대 픽셀 수
+# Qwen-VL은 28×28 픽셀당 이미지 토큰 1개, 기본 최대 1280토큰이므로 이보다 큰 이미지는 서버에서 축소됨
+DEFAULT_MAX_PIXELS = 1280 * 28 * 28
+
+# 모드별 인코딩 설정
+#   formats: 시도할 형식 (가장 작은 결과 사용, "ORIGINAL"은 축소가 필요 없을 때 원본 파일 바이트)
+#   quality: JPEG / WEBP 품질
+#   max_pixels: 최대 픽셀 수 (None이면 모델 한도)
+PAYLOAD_PROFILES = {
+    # 전체 페이지 - 손글씨 판독이 필요하므로 모델 한도까지 유지
+    "shape_detection": {"formats": ("ORIGINAL", "JPEG", "PNG"), "quality": 90, "max_pixels": None},
+    "general": {"formats": ("ORIGINAL", "JPEG", "PNG"), "quality": 90, "max_pixels": None},
+    # 도형/그리드 영역 크롭 - 대부분 작은 흑백 영역이라 PNG가 작은 경우가 많음
+    "hybrid": {"formats": ("PNG", "JPEG"), "quality": 92, "max_pixels": None},
+    # 도형 위치 설명만 받는 요청 - 글자를 읽을 필요가 없으므로 더 작게
+    "location": {"formats": ("JPEG",), "quality": 75, "max_pixels": 512 * 28 * 28},
+}
+
+
+class PayloadOptimizer:
+    """
+    API 요청에 담을 이미지 바이트를 모드별 설정으로 만드는 객체
+
+    모델 한도보다 큰 이미지는 한도에 맞게 축소하고 설정된 형식 중 가장 작은 결과를 사용함.
+    인코딩 결과는 ImageHandle에 캐시되므로 재시도/여러 후보 평가에서 다시 인코딩하지 않음.
+    호출마다 전송 바이트를 출력하고 모드별 합계를 모아 summary.txt에 기록
+    """
+
+    def __init__(self, enabled=True, max_pixels=None, verbose=True, profiles=None):
+        self.enabled = enabled
+        self.max_pixels = max_pixels or DEFAULT_MAX_PIXELS
+        self.verbose = verbose
+        self.profiles = profiles or PAYLOAD_PROFILES
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def profile(self, mode):
+        """모드 설정 (없는 모드는 general)"""
+        return self.profiles.get(mode) or self.profiles["general"]
+
+    def target_max_side(self, size, mode):
+        """픽셀 한도에 맞춘 긴 변 길이 (축소가 필요 없으면 None)"""
+        width, height = size
+        max_pixels = min(self.profile(mode)["max_pixels"] or self.max_pixels, self.max_pixels)
+        if width * height <= max_pixels:
+            return None
+        scale = math.sqrt(max_pixels / (width * height))
+        return max(1, int(max(width, height) * scale))
+
+    def choose(self, image, mode="general"):
+        """
+        전송할 인코딩 선택 - {'bytes', 'format', 'quality', 'size'} 딕셔너리
+
+        비활성화 상태에서는 예전과 같이 원본 파일 바이트 (크롭처럼 파일이 없으면 PNG)
+        """
+        handle = ImageHandle.ensure(image)
+        if not self.enabled:
+            return {'bytes': handle.encoded("original"), 'format': "ORIGINAL", 'quality': None, 'size': handle.size}
+
+        profile = self.profile(mode)
+        max_side = self.target_max_side(handle.size, mode)
+        size = handle.downscaled(max_side).size
+
+        best = None
+        for fmt in profile["formats"]:
+            if fmt == "ORIGINAL":
+                # 축소가 필요 없고 원본 파일이 있을 때만 후보 (무손실 + 인코딩 비용 없음)
+                if max_side or handle.file_bytes is None:
+                    continue
+                data = handle.file_bytes
+            else:
+                data = handle.encoded(fmt, profile["quality"], max_side)
+            if best is None or len(data) < len(best['bytes']):
+                quality = profile["quality"] if fmt in ("JPEG", "WEBP") else None
+                best = {'bytes': data, 'format': fmt, 'quality': quality, 'size': size}
+
+        if best is None:
+            best = {'bytes': handle.encoded("PNG", max_side=max_side), 'format': "PNG", 'quality': None, 'size': size}
+        return best
+
+    def encode(self, image, mode="general"):
+        """전송할 이미지 바이트 (선택 결과를 기록/출력)"""
+        handle = ImageHandle.ensure(image)
+        choice = self.choose(handle, mode)
+        original_bytes = len(handle.file_bytes) if handle.file_bytes is not None else None
+        self._record(mode, len(choice['bytes']), original_bytes)
+
+        if self.verbose:
+            width, height = choice['size']
+            quality = f" q{choice['quality']}" if choice['quality'] else ""
+            message = f"📦 전송 이미지 [{mode}] {width}×{height} {choice['format']}{quality}: {len(choice['bytes']) / 1024:.0f}KB"
+            if original_bytes:
+                message += f" (원본 {original_bytes / 1024:.0f}KB)"
+            print(message)
+
+        return choice['bytes']
+
+    def _record(self, mode, sent_bytes, original_bytes):
+        with self._lock:
+            stats = self.stats.setdefault(mode, {'calls': 0, 'bytes': 0, 'original_bytes': 0, 'original_calls': 0})
+            stats['calls'] += 1
+            stats['bytes'] += sent_bytes
+            if original_bytes:
+                stats['original_calls'] += 1
+                stats['original_bytes'] += original_bytes
+
+    def get_stats(self):
+        """모드별 호출 수 / 전송 바이트 합계"""
+        with self._lock:
+            return {mode: dict(stats) for mode, stats in self.stats.items()}
+
+    def reset_stats(self):
+        """통계 초기화"""
+        with self._lock:
+            self.stats = {}
+
+    def write_summary(self, f):
+        """summary.txt에 전송 이미지 통계 기록"""
+        f.write("=== 전송 이미지 ===\n")
+        stats = self.get_stats()
+        if not self.enabled:
+            f.write("이미지 최적화: 비활성화\n")
+        if not stats:
+            f.write("전송 없음\n\n")
+            return
+
+        for mode, mode_stats in stats.items():
+            line = f"{mode}: {mode_stats['calls']}회, {mode_stats['bytes'] / 1024:.1f}KB"
+            line += f" (평균 {mode_stats['bytes'] / mode_stats['calls'] / 1024:.1f}KB)"
+            if mode_stats['original_calls']:
+                line += f", 원본 파일 {mode_stats['original_bytes'] / 1024:.1f}KB ({mode_stats['original_calls']}회)"
+            f.write(line + "\n")
+        f.write("\n")
+
+
+_optimizer_instance = None
+_optimizer_lock = threading.Lock()
+
+
+def get_payload_optimizer():
+    """공유 요청 이미지 최적화 인스턴스 반환 (환경 변수로 설정)"""
+    global _optimizer_instance
+    if _optimizer_instance is None:
+        with _optimizer_lock:
+            if _optimizer_instance is None:
+                _optimizer_instance = PayloadOptimizer(
+                    enabled=os.getenv('PAYLOAD_OPTIMIZE', 'true').lower() == 'true',
+                    max_pixels=get_env_int('PAYLOAD_MAX_PIXELS', DEFAULT_MAX_PIXELS),
+                    verbose=os.getenv('PAYLOAD_LOG', 'true').lower() == 'true'
+                )
+    return _optimizer_instance
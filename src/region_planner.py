@@ -0,0 +1,201 @@
+"""
+OCR 영역 계획 - 감지된 도형을 모델 입력 크기에 맞는 최소 개수의 크롭으로 묶음
+
+도형이 없는 페이지만 기존 고정 그리드(목표 12개 영역)로 처리하므로
+API 호출 수가 페이지의 실제 도형 수/배치에 맞춰짐
+"""
+
+import math
+
+import numpy as np
+
+
+def grid_regions(width, height, target_regions=12, overlap_ratio=0.1):
+    """
+    가로세로 비율로 정한 격자 영역 [(행, 열, (left, top, right, bottom))] - 행/열 순서
+
+    이웃 영역과 overlap_ratio만큼 겹치게 잘라서 경계에 걸친 글자가 잘리지 않게 함
+    """
+    cols = math.ceil(math.sqrt(target_regions * width / height))
+    rows = math.ceil(target_regions / cols)
+
+    grid_width = width // cols
+    grid_height = height // rows
+    overlap_w = int(grid_width * overlap_ratio)
+    overlap_h = int(grid_height * overlap_ratio)
+
+    regions = []
+    for row in range(rows):
+        for col in range(cols):
+            start_x = max(0, col * grid_width - overlap_w)
+            start_y = max(0, row * grid_height - overlap_h)
+            end_x = min(width, (col + 1) * grid_width + overlap_w)
+            end_y = min(height, (row + 1) * grid_height + overlap_h)
+            regions.append((row, col, (start_x, start_y, end_x, end_y)))
+    return regions
+
+
+def cluster_boxes(boxes, max_pixels):
+    """
+    [x1, y1, x2, y2] 박스들을 합친 박스가 max_pixels 이하인 동안 묶음 - (묶음 박스 배열, 묶음별 원래 인덱스 목록)
+
+    매 단계에서 합쳤을 때 늘어나는 빈 면적이 가장 작은 두 묶음을 합침 (가까운 도형끼리 먼저).
+    혼자서 max_pixels를 넘는 도형은 그대로 한 묶음 (전송 시 축소됨).
+    합친 박스가 다른 묶음과 겹칠 수 있으므로 마지막에 _resolve_overlaps로 겹침을 정리함
+    """
+    shape_boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    boxes = shape_boxes.copy()
+    members = [[index] for index in range(len(boxes))]
+
+    while len(boxes) > 1:
+        # 모든 묶음 쌍의 합친 박스 면적 (행렬 연산)
+        left = np.minimum.outer(boxes[:, 0], boxes[:, 0])
+        top = np.minimum.outer(boxes[:, 1], boxes[:, 1])
+        right = np.maximum.outer(boxes[:, 2], boxes[:, 2])
+        bottom = np.maximum.outer(boxes[:, 3], boxes[:, 3])
+        union = (right - left) * (bottom - top)
+
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        cost = (union - areas[:, None] - areas[None, :]).astype(np.float64)
+        cost[union > max_pixels] = np.inf
+        np.fill_diagonal(cost, np.inf)
+
+        first, second = np.unravel_index(np.argmin(cost), cost.shape)
+        if not np.isfinite(cost[first, second]):
+            break
+
+        boxes[first] = (left[first, second], top[first, second], right[first, second], bottom[first, second])
+        members[first].extend(members[second])
+        boxes = np.delete(boxes, second, axis=0)
+        del members[second]
+
+    return _resolve_overlaps(shape_boxes, members, max_pixels)
+
+
+def _cluster_bounds(shape_boxes, members):
+    """묶음별 도형 박스를 모두 감싸는 박스 배열"""
+    return np.array([
+        (shape_boxes[indices, 0].min(), shape_boxes[indices, 1].min(),
+         shape_boxes[indices, 2].max(), shape_boxes[indices, 3].max())
+        for indices in members
+    ], dtype=np.int64).reshape(-1, 4)
+
+
+def _resolve_overlaps(shape_boxes, members, max_pixels):
+    """
+    겹치는 묶음 정리 - 겹친 부분의 도형이 두 크롭에 모두 들어가 두 번 전송되지 않도록
+
+    1. 겹치는 두 묶음을 합쳐도 max_pixels 이하면 합침 (합친 면적이 가장 작은 쌍부터)
+    2. 한 묶음의 도형이 다른 묶음 박스 안에 완전히 들어 있으면 그 묶음으로 옮김
+       (받는 묶음 박스는 그대로이고 보낸 묶음 박스는 줄어듦, 도형마다 한 번만 옮김)
+    한도 때문에 합칠 수 없는 부분 겹침은 남음 (그 도형들은 결과 병합에서 중복 제거)
+    """
+    moved = set()
+    while True:
+        bounds = _cluster_bounds(shape_boxes, members)
+        overlaps = (
+            (np.maximum.outer(bounds[:, 0], bounds[:, 0]) < np.minimum.outer(bounds[:, 2], bounds[:, 2])) &
+            (np.maximum.outer(bounds[:, 1], bounds[:, 1]) < np.minimum.outer(bounds[:, 3], bounds[:, 3]))
+        )
+        np.fill_diagonal(overlaps, False)
+        if not overlaps.any():
+            return bounds, members
+
+        union = (
+            (np.maximum.outer(bounds[:, 2], bounds[:, 2]) - np.minimum.outer(bounds[:, 0], bounds[:, 0])) *
+            (np.maximum.outer(bounds[:, 3], bounds[:, 3]) - np.minimum.outer(bounds[:, 1], bounds[:, 1]))
+        ).astype(np.float64)
+        union[~overlaps | (union > max_pixels)] = np.inf
+        first, second = np.unravel_index(np.argmin(union), union.shape)
+        if np.isfinite(union[first, second]):
+            members[first].extend(members[second])
+            del members[second]
+            continue
+
+        changed = False
+        for source, target in zip(*np.nonzero(overlaps)):
+            box = bounds[target]
+            inside = [
+                index for index in members[source]
+                if index not in moved and
+                box[0] <= shape_boxes[index, 0] and box[1] <= shape_boxes[index, 1] and
+                box[2] >= shape_boxes[index, 2] and box[3] >= shape_boxes[index, 3]
+            ]
+            if inside:
+                members[target].extend(inside)
+                members[source] = [index for index in members[source] if index not in inside]
+                moved.update(inside)
+                changed = True
+                break
+        if not changed:
+            return bounds, members
+        members = [indices for indices in members if indices]
+
+
+def plan_shape_regions(shape_boxes, image_size, max_pixels, padding=16):
+    """
+    도형 박스들을 모델 입력 크기에 맞게 묶은 크롭 영역 목록 (읽는 순서: 위→아래, 왼쪽→오른쪽)
+
+    Returns:
+        [{'name', 'box': (left, top, right, bottom), 'shapes': 포함된 도형 수}]
+    """
+    width, height = image_size
+
+    # 도형 마진 바깥으로 약간 더 (경계선에 붙은 글자) - 묶기 전에 넓혀야 크롭이 한도를 넘지 않음
+    padded = np.asarray(shape_boxes, dtype=np.int64).reshape(-1, 4) + np.array([-padding, -padding, padding, padding])
+    np.clip(padded, 0, [width, height, width, height], out=padded)
+    boxes, members = cluster_boxes(padded, max_pixels)
+
+    regions = [
+        {'box': tuple(int(v) for v in box), 'shapes': len(indices)}
+        for box, indices in zip(boxes, members)
+    ]
+
+    regions.sort(key=lambda region: (region['box'][1], region['box'][0]))
+    for index, region in enumerate(regions):
+        region['name'] = f"도형{index + 1}"
+    return regions
+
+
+def plan_regions(image, detector=None, max_pixels=None, fallback_regions=12):
+    """
+    이미지의 OCR 영역 계획 - 도형을 감지해서 묶고, 도형이 없으면 고정 그리드
+
+    Args:
+        image: 경로 / ImageHandle 등 (HybridShapeDetector가 받는 입력)
+        detector: 재사용할 HybridShapeDetector (None이면 새로 생성)
+        max_pixels: 크롭 하나의 최대 픽셀 수 (None이면 요청 이미지 최적화의 모델 한도)
+        fallback_regions: 그리드 대체 시 목표 영역 수
+
+    Returns:
+        {'source': "shapes" 또는 "grid", 'shapes': 감지된 도형 수,
+         'regions': [{'name', 'box', 'shapes'}]}
+    """
+    from image_handle import ImageHandle
+    from hybrid_shape_detector import HybridShapeDetector
+    from payload_optimizer import get_payload_optimizer
+
+    handle = ImageHandle.ensure(image)
+    if max_pixels is None:
+        max_pixels = get_payload_optimizer().max_pixels
+    if detector is None:
+        detector = HybridShapeDetector()
+
+    shape_set = detector.detect_shape_set(handle)
+    if len(shape_set):
+        return {
+            'source': "shapes",
+            'shapes': len(shape_set),
+            'regions': plan_shape_regions(shape_set.bboxes(), handle.size, max_pixels)
+        }
+
+    return grid_plan(handle.width, handle.height, fallback_regions)
+
+
+def grid_plan(width, height, target_regions=12):
+    """고정 그리드 영역 계획 (plan_regions와 같은 형식, 영역 이름은 "행,열")"""
+    regions = [
+        {'name': f"{row},{col}", 'box': box, 'shapes': 0}
+        for row, col, box in grid_regions(width, height, target_regions)
+    ]
+    return {'source': "grid", 'shapes': 0, 'regions': regions}
@@ -0,0 +1,240 @@
+"""
+겹치는 영역 OCR 결과 병합 - 이웃 영역이 같은 글자를 중복으로 돌려준 결과를 하나로 합침
+"""
+
+import re
+import difflib
+import threading
+
+import numpy as np
+
+# 텍스트가 없다는 뜻의 응답 (결과에서 제외)
+NO_TEXT_RESPONSES = {'없음', 'none', 'no text', 'no circles', '원형 없음'}
+
+# 잉크로 보는 그레이스케일 밝기 상한 (영역 내용 범위 계산용)
+INK_THRESHOLD = 160
+
+# 정규화한 글자 수가 이보다 짧은 줄은 정확히 같아야 중복 ("2024년" / "2025년"처럼 한 글자 차이가 다른 답)
+SHORT_TEXT_LENGTH = 8
+
+# 잘린 조각의 잉크가 영역 경계에 닿았다고 보는 거리 (픽셀)
+CUT_EDGE_MARGIN = 3
+
+
+def normalize_text(text):
+    """비교용 텍스트 - 소문자, 공백/문장부호 제거"""
+    return re.sub(r'[\W_]+', '', text.lower())
+
+
+def text_similarity(first, second):
+    """두 텍스트의 유사도 (0~1, 정규화한 텍스트 기준)"""
+    first, second = normalize_text(first), normalize_text(second)
+    if not first or not second:
+        return 0.0
+    if first == second:
+        return 1.0
+    return difflib.SequenceMatcher(None, first, second).ratio()
+
+
+def boxes_overlap(first, second):
+    """(left, top, right, bottom) 두 영역이 겹치는지"""
+    return first[0] < second[2] and second[0] < first[2] and first[1] < second[3] and second[1] < first[3]
+
+
+def overlap_box(first, second):
+    """두 영역이 겹치는 부분 (겹치지 않으면 None)"""
+    if not boxes_overlap(first, second):
+        return None
+    return (max(first[0], second[0]), max(first[1], second[1]), min(first[2], second[2]), min(first[3], second[3]))
+
+
+def box_contains(outer, inner):
+    """outer 영역이 inner 영역을 완전히 포함하는지"""
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+
+def content_box(handle, box, threshold=INK_THRESHOLD):
+    """
+    영역 안에서 잉크(어두운 픽셀)가 있는 범위 (원본 좌표, 잉크가 없으면 None)
+
+    잡음 점이 있으면 범위가 넓어질 뿐이므로 영역을 잘못 건너뛰는 일은 없음
+    """
+    left, top, right, bottom = (int(v) for v in box)
+    ink = handle.gray[top:bottom, left:right] < threshold
+    rows = np.flatnonzero(ink.any(axis=1))
+    if not len(rows):
+        return None
+    cols = np.flatnonzero(ink.any(axis=0))
+    return (left + int(cols[0]), top + int(rows[0]), left + int(cols[-1]) + 1, top + int(rows[-1]) + 1)
+
+
+class ResultMerger:
+    """
+    영역별 OCR 결과를 줄 단위로 모아 중복을 합치는 객체
+
+    - add(): 결과의 각 줄을 겹치는 다른 영역에서 나온 줄과 비교해서 중복이면 하나로 합치고
+      신뢰도가 높은 쪽을 남김. 모델이 신뢰도를 주지 않으므로 기본 신뢰도는 정규화한 글자 수 (잘리지 않은 쪽이 김).
+      중복 기준 (_match):
+        * 정규화한 텍스트가 같음
+        * 둘 다 SHORT_TEXT_LENGTH자 이상이고 text_similarity >= similarity_threshold
+        * 경계에서 잘린 조각 - 좌우 이웃 영역에서 짧은 쪽이 긴 쪽의 앞부분(왼쪽 영역) / 뒷부분(오른쪽 영역)이고,
+          겹치는 띠 안의 잉크가 짧은 쪽 영역의 잘린 경계까지 닿아 있음 (handle이 없으면 적용하지 않음)
+    - plan_coverage(): 계획 순서대로 영역 내용이 앞선 영역 안에 모두 들어 있는지 미리 판정 (동시 처리용)
+    - is_covered(): 영역 내용이 이미 응답을 받은 영역 안에 모두 들어 있으면 True (순차 처리용)
+      포함되는 영역은 API를 호출하지 않아도 됨
+    """
+
+    def __init__(self, similarity_threshold=0.9, handle=None):
+        self.similarity_threshold = similarity_threshold
+        self.handle = handle
+        self.items = []
+        self.answered = []
+        self.duplicates = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def mark_answered(self, box):
+        """box 영역이 응답을 받았음을 기록 (텍스트가 없다는 응답 포함)"""
+        with self._lock:
+            self.answered.append(tuple(box))
+
+    def is_covered(self, box, content=None):
+        """
+        영역 내용(content, 없으면 영역 전체)이 응답을 받은 다른 영역에 완전히 포함되는지
+
+        포함되면 건너뛴 영역 수를 셈
+        """
+        content = content or box
+        with self._lock:
+            covered = any(answered != tuple(box) and box_contains(answered, content) for answered in self.answered)
+            if covered:
+                self.skipped += 1
+        return covered
+
+    def plan_coverage(self, regions):
+        """
+        계획 순서대로 영역 내용이 앞선 (건너뛰지 않는) 영역에 완전히 포함되는지 판정
+
+        응답 완료 순서가 아니라 계획 순서를 기준으로 하므로 동시 처리에서도 실행마다 같은 영역을 건너뜀.
+        포함하는 영역이 실패하면 호출하는 쪽에서 건너뛴 영역을 다시 처리해야 함 (건너뛴 영역 수는 record_skipped로 기록)
+
+        Args:
+            regions: (이름, 영역, 내용 범위 또는 None) 목록
+
+        Returns:
+            {건너뛸 영역 이름: 내용을 포함하는 영역 이름}
+        """
+        coverers = {}
+        kept = []
+        for name, box, content in regions:
+            content = content or box
+            coverer = next((kept_name for kept_name, kept_box in kept if box_contains(kept_box, content)), None)
+            if coverer is None:
+                kept.append((name, tuple(box)))
+            else:
+                coverers[name] = coverer
+        return coverers
+
+    def record_skipped(self, count):
+        """포함되어 건너뛴 영역 수 기록"""
+        with self._lock:
+            self.skipped += count
+
+    def _is_cut_fragment(self, fragment, full, fragment_box, full_box):
+        """
+        fragment가 fragment_box 영역 경계에서 잘린 full의 조각일 수 있는지
+
+        가로 줄은 좌우 경계에서만 앞/뒤 조각으로 잘리므로 좌우 이웃 영역만 해당.
+        조각은 full이 온전히 들어 있는 영역과 겹치는 띠 안에 있어야 하므로 띠의 잉크가 잘린 경계에 닿아야 함
+        """
+        if len(fragment) < 2:
+            return False
+        fragment_x = (fragment_box[0] + fragment_box[2]) / 2
+        full_x = (full_box[0] + full_box[2]) / 2
+        fragment_y = (fragment_box[1] + fragment_box[3]) / 2
+        full_y = (full_box[1] + full_box[3]) / 2
+        if abs(fragment_x - full_x) < abs(fragment_y - full_y):
+            return False
+
+        # 왼쪽 영역은 앞부분이 보이고 오른쪽 경계에서 잘림 (오른쪽 영역은 반대)
+        from_left = fragment_x < full_x
+        if not (full.startswith(fragment) if from_left else full.endswith(fragment)):
+            return False
+        if self.handle is None:
+            return False
+
+        strip = overlap_box(fragment_box, full_box)
+        ink = content_box(self.handle, strip) if strip else None
+        if ink is None:
+            return False
+        if from_left:
+            return ink[2] >= fragment_box[2] - CUT_EDGE_MARGIN
+        return ink[0] <= fragment_box[0] + CUT_EDGE_MARGIN
+
+    def _match(self, line, box, item_text, item_box):
+        """두 줄이 중복이면 유사도, 아니면 None"""
+        first, second = normalize_text(line), normalize_text(item_text)
+        if first == second:
+            return 1.0
+        if min(len(first), len(second)) >= SHORT_TEXT_LENGTH:
+            similarity = text_similarity(first, second)
+            if similarity >= self.similarity_threshold:
+                return similarity
+
+        if len(first) < len(second):
+            cut = self._is_cut_fragment(first, second, box, item_box)
+        else:
+            cut = self._is_cut_fragment(second, first, item_box, box)
+        return self.similarity_threshold if cut else None
+
+    def add(self, region_name, box, text, confidence=None):
+        """영역 결과를 줄 단위로 병합하고 새로 추가된 줄 수를 반환"""
+        box = tuple(box)
+        added = 0
+        with self._lock:
+            if box not in self.answered:
+                self.answered.append(box)
+
+            for line in (text or "").splitlines():
+                line = line.strip()
+                if not line or line.lower() in NO_TEXT_RESPONSES or not normalize_text(line):
+                    continue
+                score = confidence if confidence is not None else len(normalize_text(line))
+
+                # 겹치는 다른 영역에서 나온 가장 비슷한 중복 줄
+                best, best_similarity = None, 0.0
+                for item in self.items:
+                    if region_name in item['regions']:
+                        continue
+                    for other in item['boxes']:
+                        if not boxes_overlap(box, other):
+                            continue
+                        similarity = self._match(line, box, item['text'], other)
+                        if similarity is not None and similarity > best_similarity:
+                            best, best_similarity = item, similarity
+
+                if best is None:
+                    self.items.append({'text': line, 'score': score, 'regions': [region_name], 'boxes': [box]})
+                    added += 1
+                    continue
+
+                # 중복 - 신뢰도가 높은 쪽 텍스트를 남기고 위치는 처음 나온 순서 유지
+                self.duplicates += 1
+                best['regions'].append(region_name)
+                best['boxes'].append(box)
+                if score > best['score']:
+                    best['text'], best['score'] = line, score
+        return added
+
+    def texts(self):
+        """병합된 줄 목록 (처음 나온 순서)"""
+        with self._lock:
+            return [item['text'] for item in self.items]
+
+    def merged_text(self):
+        """병합된 결과 텍스트"""
+        return "\n".join(self.texts())
+
+    def summary(self):
+        """병합 통계 한 줄 요약"""
+        return f"고유 {len(self.items)}줄, 중복 {self.duplicates}줄 병합, 이웃 영역에 포함되어 건너뛴 영역 {self.skipped}개"
@@ -0,0 +1,77 @@
+"""
+단계별 감지 결과 캐시 - 파라미터를 바꿔 다시 감지할 때 바뀐 단계 이후만 다시 계산
+"""
+
+import threading
+from collections import OrderedDict
+
+from parallel_utils import get_env_int
+
+
+class StageCache:
+    """
+    단계 이름별로 항목 수가 제한된 LRU 메모리 캐시
+
+    각 단계 결과는 그 단계의 입력만으로 만든 키로 저장함. 예를 들어 대비 향상 이미지는
+    이미지 해시만, 정리된 이진화 이미지는 이미지 해시 + 이진화 방법을 키로 쓰므로
+    면적 기준만 바꾸면 앞 단계 결과는 모두 재사용되고 마지막 필터 단계만 다시 실행됨.
+    전체 해상도 배열을 보관하므로 단계마다 max_entries개까지만 유지
+    """
+
+    def __init__(self, max_entries=4):
+        self.max_entries = max(1, max_entries)
+        self.hits = {}
+        self.misses = {}
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, stage, key, compute):
+        """단계 결과 조회, 없으면 compute()로 만들어 저장 - (결과, 적중 여부)"""
+        with self._lock:
+            entries = self._stages.setdefault(stage, OrderedDict())
+            if key in entries:
+                entries.move_to_end(key)
+                self.hits[stage] = self.hits.get(stage, 0) + 1
+                return entries[key], True
+
+        # 계산은 잠금 밖에서 (다른 단계/이미지 조회를 막지 않도록)
+        value = compute()
+
+        with self._lock:
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            self.misses[stage] = self.misses.get(stage, 0) + 1
+        return value, False
+
+    def get_stats(self):
+        """단계별 적중/미스/항목 수"""
+        with self._lock:
+            return {
+                stage: {
+                    'hits': self.hits.get(stage, 0),
+                    'misses': self.misses.get(stage, 0),
+                    'entries': len(entries)
+                }
+                for stage, entries in self._stages.items()
+            }
+
+    def clear(self):
+        """모든 단계 결과 삭제"""
+        with self._lock:
+            self._stages.clear()
+
+
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def get_stage_cache():
+    """공유 단계별 캐시 인스턴스 반환 (SHAPE_STAGE_CACHE_ENTRIES: 단계별 최대 항목 수)"""
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                _cache_instance = StageCache(max_entries=get_env_int('SHAPE_STAGE_CACHE_ENTRIES', 4))
+    return _cache_instance
@@ -11,38 +11,25 @@ import re
 from datetime import datetime
 from typing import List, Dict, Tuple, Optional
 
+from image_handle import ImageHandle
+
 def get_text_coordinates_from_api(api_key, model_name, image_path):
     """
     API에서 텍스트와 좌표 정보를 함께 요청
     """
     try:
-        import dashscope
-        import base64
+        from async_cloud_client import get_cloud_client
         from endpoint_config import configure_international_endpoint
         
         # 국제 엔드포인트 설정
         configure_international_endpoint()
-        dashscope.api_key = api_key
         
-        # 이미지 인코딩
-        with open(image_path, "rb") as image_file:
-            base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+        from payload_optimizer import get_payload_optimizer
+        image_bytes = get_payload_optimizer().encode(ImageHandle.ensure(image_path), "general")
         
         # 좌표 정보를 포함한 요청
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"image": f"data:image/jpeg;base64,{base64_image}"},
-                    {"text": "이미지에서 모든 텍스트를 추출하고, 각 텍스트의 대략적인 위치(상단/중단/하단, 좌측/중앙/우측)도 함께 알려주세요. 형식: [텍스트] - 위치: [위치정보]"}
-                ]
-            }
-        ]
-        
-        response = dashscope.MultiModalConversation.call(
-            model=model_name,
-            messages=messages
-        )
+        prompt = "이미지에서 모든 텍스트를 추출하고, 각 텍스트의 대략적인 위치(상단/중단/하단, 좌측/중앙/우측)도 함께 알려주세요. 형식: [텍스트] - 위치: [위치정보]"
+        response = get_cloud_client(api_key).ocr_sync(image_bytes, prompt, model_name)
         
         from response_utils import extract_text_from_response
         result = extract_text_from_response(response)
@@ -58,13 +45,12 @@ def estimate_text_regions(image_path, extracted_text):
     추출된 텍스트를 기반으로 텍스트 영역을 추정
     """
     try:
-        # OpenCV로 이미지 로드
-        image = cv2.imread(image_path)
-        if image is None:
+        # 이미지 크기만 필요 (핸들이면 다시 디코딩하지 않음)
+        try:
+            width, height = ImageHandle.ensure(image_path).size
+        except (OSError, ValueError):
             return None
         
-        height, width = image.shape[:2]
-        
         # 텍스트를 라인별로 분할
         lines = [line.strip() for line in extracted_text.split('\n') if line.strip()]
         
@@ -104,7 +90,9 @@ def use_easyocr_for_coordinates(image_path):
         # EasyOCR 리더 초기화 (한국어, 영어)
         reader = easyocr.Reader(['ko', 'en'], gpu=True)
         
-        # 텍스트 인식
+        # 텍스트 인식 (핸들이면 이미 읽은 파일 바이트 전달)
+        if isinstance(image_path, ImageHandle):
+            image_path = image_path.file_bytes if image_path.file_bytes is not None else image_path.to_bgr()
         results = reader.readtext(image_path)
         
         # 결과 파싱
@@ -146,18 +134,19 @@ def draw_text_boxes_on_image(image_path, text_regions, output_path, method_name=
     이미지에 텍스트 박스와 내용을 그려서 저장
     """
     try:
-        # 이미지 로드
-        image = cv2.imread(image_path)
-        if image is None:
+        # 이미지 로드 (이미 디코딩된 핸들이면 재사용)
+        try:
+            handle = ImageHandle.ensure(image_path)
+        except (OSError, ValueError):
             print(f"❌ 이미지 로드 실패: {image_path}")
             return False
         
-        # PIL로 변환 (한글 폰트 지원)
-        image_pil = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        # 그리기용 복사본 (한글 폰트 지원을 위해 PIL 사용)
+        image_pil = handle.pil
         draw = ImageDraw.Draw(image_pil)
         
         # 폰트 설정
-        font_size = max(12, min(24, image.shape[1] // 50))
+        font_size = max(12, min(24, handle.width // 50))
         try:
             # Linux/WSL
             font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", font_size)
@@ -221,8 +210,8 @@ def draw_text_boxes_on_image(image_path, text_regions, output_path, method_name=
                  fill=(0, 0, 0), font=font)
         
         # 텍스트 목록 추가 (이미지 하단)
-        text_list_y = image.shape[0] - (len(text_regions) + 2) * (font_size + 5)
-        text_list_y = max(text_list_y, image.shape[0] // 2)  # 최소 중간 위치
+        text_list_y = handle.height - (len(text_regions) + 2) * (font_size + 5)
+        text_list_y = max(text_list_y, handle.height // 2)  # 최소 중간 위치
         
         draw.text((10, text_list_y), "인식된 텍스트:", fill=(0, 0, 0), font=font)
         
@@ -235,14 +224,15 @@ def draw_text_boxes_on_image(image_path, text_regions, output_path, method_name=
             color = colors[i % len(colors)]
             draw.text((20, y_pos), text_line, fill=color, font=font)
         
-        # 다시 OpenCV 형식으로 변환
-        result_image = cv2.cvtColor(np.array(image_pil), cv2.COLOR_RGB2BGR)
-        
         # 출력 디렉토리 생성
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        # 저장
-        success = cv2.imwrite(output_path, result_image)
+        # PIL로 바로 저장 (BGR 변환 없이)
+        try:
+            image_pil.save(output_path)
+            success = True
+        except (OSError, ValueError):
+            success = False
         
         if success:
             print(f"✅ 텍스트 매핑 이미지 저장: {os.path.basename(output_path)}")
@@ -259,11 +249,13 @@ def draw_text_boxes_on_image(image_path, text_regions, output_path, method_name=
 
 def create_text_coordinate_mapping(image_path, extracted_text, output_dir, method="auto"):
     """
-    메인 함수: 텍스트 좌표 매핑 이미지 생성
+    메인 함수: 텍스트 좌표 매핑 이미지 생성 (경로 또는 ImageHandle)
     """
-    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    # 좌표 추정/그리기 단계가 같은 디코딩 결과를 공유
+    handle = ImageHandle.ensure(image_path)
+    base_name = os.path.splitext(handle.name)[0]
     
-    print(f"\n🎯 텍스트 좌표 매핑 시작: {os.path.basename(image_path)}")
+    print(f"\n🎯 텍스트 좌표 매핑 시작: {handle.name}")
     
     text_regions = None
     ocr_text = None
@@ -272,7 +264,7 @@ def create_text_coordinate_mapping(image_path, extracted_text, output_dir, metho
     # 방법 1: EasyOCR 사용 (가장 정확함)
     if method in ["auto", "easyocr"]:
         print("🔍 EasyOCR로 좌표 정보 추출 시도...")
-        text_regions, ocr_text = use_easyocr_for_coordinates(image_path)
+        text_regions, ocr_text = use_easyocr_for_coordinates(handle)
         if text_regions:
             method_used = "EasyOCR"
             print(f"✅ EasyOCR로 {len(text_regions)}개 영역 검출")
@@ -280,7 +272,7 @@ def create_text_coordinate_mapping(image_path, extracted_text, output_dir, metho
     # 방법 2: 추정 방법 (EasyOCR 실패 시 또는 직접 선택)
     if not text_regions:
         print("🔍 추정 방법으로 텍스트 영역 계산...")
-        text_regions = estimate_text_regions(image_path, extracted_text)
+        text_regions = estimate_text_regions(handle, extracted_text)
         method_used = "추정방법"
         if text_regions:
             print(f"✅ 추정으로 {len(text_regions)}개 영역 생성")
@@ -291,7 +283,7 @@ def create_text_coordinate_mapping(image_path, extracted_text, output_dir, metho
     
     # 결과 이미지 생성
     output_path = os.path.join(output_dir, f"{base_name}_coordinates_{method_used.lower()}.png")
-    success = draw_text_boxes_on_image(image_path, text_regions, output_path, method_used)
+    success = draw_text_boxes_on_image(handle, text_regions, output_path, method_used)
     
     # 텍스트 비교 정보 저장
     if success:
@@ -10,6 +10,8 @@ from PIL import Image, ImageDraw, ImageFont
 import cv2
 import numpy as np
 
+from image_handle import ImageHandle
+
 try:
     import GPUtil
     GPU_AVAILABLE = True
@@ -75,20 +77,21 @@ def create_output_directory(base_dir, method_name):
     return output_dir
 
 def draw_text_on_image(image_path, detected_text, output_path):
-    """이미지에 인식된 텍스트를 오버레이하여 저장"""
+    """이미지에 인식된 텍스트를 오버레이하여 저장 (경로 또는 ImageHandle)"""
     try:
-        # 이미지 로드
-        image = cv2.imread(image_path)
-        if image is None:
+        # 이미지 로드 (이미 디코딩된 핸들이면 재사용)
+        try:
+            handle = ImageHandle.ensure(image_path)
+        except (OSError, ValueError):
             print(f"❌ 이미지 로드 실패: {image_path}")
             return False
         
-        # PIL로 변환 (한글 폰트 지원)
-        image_pil = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        # 그리기용 복사본 (한글 폰트 지원을 위해 PIL 사용)
+        image_pil = handle.pil
         draw = ImageDraw.Draw(image_pil)
         
         # 폰트 설정 (시스템에 따라 조정 필요)
-        font_size = max(16, min(30, image.shape[1] // 40))  # 이미지 크기에 따라 조정
+        font_size = max(16, min(30, handle.width // 40))  # 이미지 크기에 따라 조정
         try:
             # Linux/WSL의 경우
             font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", font_size)
@@ -107,7 +110,7 @@ def draw_text_on_image(image_path, detected_text, output_path):
         # 텍스트 박스 그리기
         lines = detected_text.split('\n')
         y_offset = 30
-        max_width = image.shape[1] - 20  # 이미지 너비 - 여백
+        max_width = handle.width - 20  # 이미지 너비 - 여백
         
         for line in lines:
             if line.strip():
@@ -149,13 +152,15 @@ def draw_text_on_image(image_path, detected_text, output_path):
                     draw.text((10, y_offset), current_line, fill=(255, 255, 255), font=font)
                     y_offset += font_size + 5
         
-        # 다시 OpenCV 형식으로 변환하여 저장
-        result_image = cv2.cvtColor(np.array(image_pil), cv2.COLOR_RGB2BGR)
-        
         # 출력 디렉토리 생성
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        success = cv2.imwrite(output_path, result_image)
+        # PIL로 바로 저장 (BGR 변환 없이)
+        try:
+            image_pil.save(output_path)
+            success = True
+        except (OSError, ValueError):
+            success = False
         if success:
             print(f"✅ 결과 이미지 저장: {os.path.basename(output_path)}")
             return True
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+비동기 Cloud API 클라이언트 테스트
+로컬 aiohttp 스텁 서버(200/429/500 응답)로 재시도, 응답 파싱, 이미지 MIME 판별 확인
+"""
+
+import sys
+import asyncio
+sys.path.append('src')
+
+from aiohttp import web
+
+from async_cloud_client import AsyncCloudClient, GENERATION_PATH, build_image_message, detect_image_mime
+from response_utils import extract_text_from_response
+
+STUB_TEXT = "스텁 OCR 결과"
+PNG_BYTES = b'\x89PNG\r\n\x1a\n' + b'\x00' * 16
+
+
+class StubServer:
+    """statuses 순서대로 상태 코드를 돌려주고, 다 쓰면 200 응답을 주는 스텁 API 서버"""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.requests = []
+        self.runner = None
+        self.base_url = None
+
+    async def handle(self, request):
+        self.requests.append({
+            'authorization': request.headers.get('Authorization'),
+            'payload': await request.json()
+        })
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status != 200:
+            return web.json_response({"code": f"Stub{status}", "message": "스텁 오류"}, status=status)
+        return web.json_response({
+            "request_id": "stub-request",
+            "output": {"choices": [{
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": [{"text": STUB_TEXT}]}
+            }]},
+            "usage": {"input_tokens": 10, "output_tokens": 5}
+        })
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post(GENERATION_PATH, self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, '127.0.0.1', 0).start()
+        host, port = self.runner.addresses[0][:2]
+        self.base_url = f"http://{host}:{port}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+async def run_ocr(statuses, max_retries=3):
+    """스텁 서버를 띄우고 OCR 요청 한 번 - (응답, 스텁 서버)"""
+    server = StubServer(statuses)
+    await server.start()
+    client = AsyncCloudClient("test-key", base_url=server.base_url, max_retries=max_retries)
+    try:
+        response = await client.ocr(PNG_BYTES, "텍스트를 추출하세요", "qwen-vl-max")
+    finally:
+        await client.close()
+        await server.stop()
+    return response, server
+
+
+def test_retry_then_success():
+    """429 → 500 → 200 순서로 재시도 후 응답 파싱"""
+    print("🔄 재시도 테스트 (429 → 500 → 200)")
+    print("=" * 50)
+
+    response, server = asyncio.run(run_ocr([429, 500]))
+    print(f"📨 요청 횟수: {len(server.requests)}회, 최종 상태: {response.status_code}")
+
+    ok = True
+    if len(server.requests) != 3 or response.status_code != 200:
+        print("❌ 429/500 응답 후 재시도해서 200을 받아야 함")
+        ok = False
+
+    content = response.output.choices[0].message.content
+    print(f"📄 output.choices[0].message.content: {content}")
+    if content != [{"text": STUB_TEXT}] or extract_text_from_response(response) != STUB_TEXT:
+        print("❌ 응답 내용 파싱 실패")
+        ok = False
+    if response.request_id != "stub-request" or response.output.choices[0].finish_reason != "stop":
+        print("❌ request_id / finish_reason 파싱 실패")
+        ok = False
+
+    request = server.requests[0]
+    image_url = request['payload']['input']['messages'][0]['content'][0]['image']
+    if request['authorization'] != "Bearer test-key" or request['payload']['model'] != "qwen-vl-max":
+        print("❌ 인증 헤더 / 모델 이름이 요청에 없음")
+        ok = False
+    if not image_url.startswith("data:image/png;base64,"):
+        print(f"❌ PNG 이미지의 data URL이 잘못됨: {image_url[:40]}")
+        ok = False
+
+    if ok:
+        print("✅ 재시도 후 응답 파싱 성공")
+    return ok
+
+
+def test_retry_exhausted():
+    """계속 500이면 max_retries회 시도 후 500 응답 반환"""
+    print("\n⛔ 재시도 소진 테스트 (500 × 3)")
+    print("=" * 50)
+
+    response, server = asyncio.run(run_ocr([500, 500, 500]))
+    print(f"📨 요청 횟수: {len(server.requests)}회, 최종 상태: {response.status_code}")
+
+    if len(server.requests) != 3 or response.status_code != 500 or response.code != "Stub500":
+        print("❌ 3회 시도 후 500 응답을 그대로 돌려줘야 함")
+        return False
+    if not extract_text_from_response(response).startswith("API 호출 실패"):
+        print("❌ 실패 응답의 텍스트 추출 결과가 잘못됨")
+        return False
+
+    print("✅ 재시도 소진 후 오류 응답 반환")
+    return True
+
+
+def test_no_retry_on_client_error():
+    """400은 재시도하지 않음"""
+    print("\n🚫 재시도 제외 테스트 (400)")
+    print("=" * 50)
+
+    response, server = asyncio.run(run_ocr([400]))
+    print(f"📨 요청 횟수: {len(server.requests)}회, 최종 상태: {response.status_code}")
+
+    if len(server.requests) != 1 or response.status_code != 400:
+        print("❌ 400 응답은 바로 돌려줘야 함")
+        return False
+
+    print("✅ 400 응답은 재시도하지 않음")
+    return True
+
+
+def test_mime_detection():
+    """이미지 시그니처별 MIME 타입 판별"""
+    print("\n🖼️  MIME 판별 테스트")
+    print("=" * 50)
+
+    samples = {
+        "image/png": PNG_BYTES,
+        "image/jpeg": b'\xff\xd8\xff\xe0' + b'\x00' * 16,
+        "image/webp": b'RIFF\x00\x00\x00\x00WEBPVP8 ',
+        "image/bmp": b'BM' + b'\x00' * 16,
+        "image/tiff": b'II*\x00' + b'\x00' * 16,
+    }
+
+    ok = True
+    for expected, image_bytes in samples.items():
+        detected = detect_image_mime(image_bytes)
+        url = build_image_message(image_bytes, "프롬프트")[0]['content'][0]['image']
+        passed = detected == expected and url.startswith(f"data:{expected};base64,")
+        print(f"   {'✅' if passed else '❌'} {expected}: {detected}")
+        ok = ok and passed
+
+    # 알 수 없는 형식은 JPEG로 보냄
+    if detect_image_mime(b'unknown') != "image/jpeg":
+        print("   ❌ 알 수 없는 형식의 기본값은 image/jpeg여야 함")
+        ok = False
+
+    return ok
+
+
+def main():
+    """메인 실행 함수"""
+    print("🚀 비동기 Cloud API 클라이언트 테스트")
+    print("⏳ 재시도 대기(2초, 4초)가 있어서 10여 초 걸립니다")
+    print("=" * 60)
+
+    results = {
+        "재시도 후 성공": test_retry_then_success(),
+        "재시도 소진": test_retry_exhausted(),
+        "400 재시도 제외": test_no_retry_on_client_error(),
+        "MIME 판별": test_mime_detection(),
+    }
+
+    print(f"\n📊 결과:")
+    print("=" * 60)
+    for name, passed in results.items():
+        print(f"   {'✅' if passed else '❌'} {name}")
+
+    if all(results.values()):
+        print("\n🎉 모든 테스트 통과!")
+        return 0
+    print("\n❌ 실패한 테스트가 있습니다")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,7 @@
 
 import os
 import sys
+import time
 
 # src 디렉토리를 경로에 추가
 sys.path.append('src')
@@ -111,6 +112,34 @@ def test_improved_hybrid():
         traceback.print_exc()
         return False
 
+def test_detect_many(input_dir="input"):
+    """입력 폴더 전체 도형 감지 (프로세스 풀, 끝나는 순서대로 출력)"""
+    print(f"\n🔍 폴더 전체 도형 감지: {input_dir}")
+    print("=" * 60)
+    
+    from hybrid_shape_detector import HybridShapeDetector
+    from utils import get_image_files
+    
+    image_files = get_image_files(input_dir)
+    if not image_files:
+        print(f"❌ 이미지 없음: {input_dir}")
+        return False
+    
+    detector = HybridShapeDetector()
+    start_time = time.time()
+    total_shapes = 0
+    
+    for result in detector.detect_many(image_files):
+        name = os.path.basename(result['path'])
+        if result['error']:
+            print(f"  ❌ {name}: {result['error']}")
+            continue
+        total_shapes += len(result['bboxes'])
+        print(f"  ✅ {name}: {len(result['bboxes'])}개 ({result['time']:.2f}초)")
+    
+    print(f"📊 {len(image_files)}개 이미지, 도형 {total_shapes}개, 전체 {time.time() - start_time:.2f}초")
+    return True
+
 def compare_with_previous():
     """이전 버전과 비교 테스트"""
     print("\n📊 이전 버전과 성능 비교")
@@ -158,6 +187,11 @@ def main():
             print("❌ test-sdp 디렉토리를 찾을 수 없습니다.")
             return
     
+    # 도형 감지만 폴더 단위로 실행
+    if "--detect-only" in sys.argv:
+        test_detect_many()
+        return
+    
     success = test_improved_hybrid()
     
     if success:
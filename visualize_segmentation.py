@@ -17,6 +17,7 @@ def visualize_segmentation_process():
         import cv2
         import numpy as np
         from hybrid_shape_detector import HybridShapeDetector
+        from image_handle import ImageHandle
         
         test_image = "input/17301.png"
         
@@ -27,7 +28,7 @@ def visualize_segmentation_process():
         print(f"📸 분석 이미지: {test_image}")
         
         # 원본 이미지 로드
-        original = cv2.imread(test_image)
+        original = ImageHandle.from_path(test_image).to_bgr()
         height, width = original.shape[:2]
         
         print(f"📏 이미지 크기: {width} × {height} pixels")
@@ -192,10 +193,11 @@ def analyze_size_thresholds():
     
     try:
         from hybrid_shape_detector import HybridShapeDetector
+        from image_handle import ImageHandle
         import cv2
         
         test_image = "input/17301.png"
-        original = cv2.imread(test_image)
+        original = ImageHandle.from_path(test_image).to_bgr()
         height, width = original.shape[:2]
         
         detector = HybridShapeDetector()
@@ -260,6 +262,10 @@ def main():
             print("❌ test-sdp 디렉토리를 찾을 수 없습니다.")
             return
     
+    # 같은 이미지를 반복해서 여는 실험 도구이므로 디코딩 결과를 이미지 저장소에서 재사용
+    from image_store import enable_image_store
+    enable_image_store()
+    
     # 시각화 실행
     success = visualize_segmentation_process()
     
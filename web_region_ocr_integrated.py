@@ -19,9 +19,12 @@ from web_region_selector import WebRegionSelector
 class WebRegionOCRProcessor:
     """웹 기반 영역 선택 + OCR 처리"""
     
-    def __init__(self, api_key, model_name="qwen-vl-plus"):
+    def __init__(self, api_key, model_name="qwen-vl-plus", local_model_id=None):
         self.api_key = api_key
         self.model_name = model_name
+        # 로컬 모델 ID가 있으면 클라우드 API 대신 공유 추론 서비스 사용
+        # (여러 사용자의 요청이 같은 GPU 배치로 묶임)
+        self.local_model_id = local_model_id
         
     def process_regions_with_ocr(self, selector):
         """선택된 영역들을 OCR 처리"""
@@ -30,44 +33,58 @@ class WebRegionOCRProcessor:
         
         try:
             from cloud_ocr import CloudOCRProcessor
+            from image_handle import ImageHandle
             
-            # 먼저 영역 크롭
-            success, message = selector.crop_regions()
-            if not success:
-                return False, f"크롭 실패: {message}"
+            # 크롭 파일 저장은 선택 사항 (OCR은 메모리의 크롭을 바로 사용)
+            if os.getenv('SAVE_CROPPED_REGIONS', 'false').lower() == 'true':
+                success, message = selector.crop_regions()
+                if not success:
+                    return False, f"크롭 실패: {message}"
+            
+            # 선택기가 이미 읽은 원본 이미지 재사용
+            image = ImageHandle.from_array(selector.original_image, bgr=True, path=selector.image_path)
             
             # OCR 프로세서 초기화
-            ocr_processor = CloudOCRProcessor(self.api_key, self.model_name)
+            if self.local_model_id:
+                from inference_service import get_inference_service
+                
+                # 모든 영역을 먼저 요청해서 한 배치로 묶이게 함
+                service = get_inference_service(self.local_model_id)
+                submitted_at = time.time()
+                futures = {
+                    region['name']: service.submit(image.crop(region['original_coords']).pil)
+                    for region in selector.regions
+                }
+            else:
+                ocr_processor = CloudOCRProcessor(self.api_key, self.model_name)
             
             results = []
             successful_count = 0
             
             output_dir = "output/cropped_regions"
+            os.makedirs(output_dir, exist_ok=True)
             
             for region in selector.regions:
                 print(f"🤖 {region['name']} OCR 처리 중...")
                 
-                # 크롭된 파일 찾기
-                import glob
-                pattern = os.path.join(output_dir, f"{selector.base_name}_{region['name']}_*.png")
-                cropped_files = glob.glob(pattern)
-                
-                if not cropped_files:
-                    print(f"❌ 크롭된 파일 없음: {region['name']}")
-                    continue
-                
-                cropped_file = max(cropped_files, key=os.path.getctime)
+                # 영역 크롭 (원본 버퍼의 뷰)
+                cropped = image.crop(region['original_coords'])
+                cropped_file = selector.cropped_files.get(region['name'])
                 
                 try:
                     # OCR 처리
-                    result_tuple = ocr_processor.process_image(cropped_file, "shape_detection")
-                    
-                    # tuple 처리
-                    if isinstance(result_tuple, tuple) and len(result_tuple) == 2:
-                        result_text, process_time = result_tuple
+                    if self.local_model_id:
+                        result_text = futures[region['name']].result()
+                        process_time = time.time() - submitted_at
                     else:
-                        result_text = result_tuple
-                        process_time = 0
+                        result_tuple = ocr_processor.process_image(cropped, "shape_detection")
+                        
+                        # tuple 처리
+                        if isinstance(result_tuple, tuple) and len(result_tuple) == 2:
+                            result_text, process_time = result_tuple
+                        else:
+                            result_text = result_tuple
+                            process_time = 0
                     
                     if result_text and len(result_text.strip()) > 3:
                         if result_text.lower() not in ['없음', 'none', 'no text', 'no circles']:
@@ -76,7 +93,7 @@ class WebRegionOCRProcessor:
                                 'coordinates': region['original_coords'],
                                 'size': f"{region['width']}×{region['height']}",
                                 'text': result_text.strip(),
-                                'file': os.path.basename(cropped_file),
+                                'file': os.path.basename(cropped_file) if cropped_file else "(메모리 크롭)",
                                 'process_time': process_time
                             })
                             successful_count += 1
@@ -429,16 +446,18 @@ def clear_regions():
         print("🗑️ 모든 영역 삭제됨")
     return jsonify({'success': True})
 
-def run_web_ocr_selector(image_path, api_key):
-    """웹 기반 영역 선택 + OCR 도구 실행"""
+def run_web_ocr_selector(image_path, api_key, local_model_id=None):
+    """웹 기반 영역 선택 + OCR 도구 실행 (local_model_id가 있으면 로컬 모델 배치 추론)"""
     global selector, ocr_processor
     
     try:
         selector = WebRegionSelector(image_path)
-        ocr_processor = WebRegionOCRProcessor(api_key, "qwen-vl-plus")
+        ocr_processor = WebRegionOCRProcessor(api_key, "qwen-vl-plus", local_model_id)
         
         print(f"\n🌐🤖 웹 기반 영역 선택 + OCR 도구 시작")
         print(f"📸 이미지: {os.path.basename(image_path)}")
+        if local_model_id:
+            print(f"🖥️  로컬 모델: {local_model_id} (요청 배치 처리)")
         print(f"🔗 브라우저에서 http://localhost:5001 으로 접속하세요")
         print(f"⏹️  종료하려면 Ctrl+C를 누르세요")
         
@@ -451,8 +470,8 @@ def run_web_ocr_selector(image_path, api_key):
         browser_thread.daemon = True
         browser_thread.start()
         
-        # Flask 앱 실행
-        app.run(host='localhost', port=5001, debug=False, use_reloader=False)
+        # Flask 앱 실행 (요청별 스레드 - 동시 요청은 추론 서비스에서 배치로 묶임)
+        app.run(host='localhost', port=5001, debug=False, use_reloader=False, threaded=True)
         
     except Exception as e:
         print(f"❌ 웹 서버 실행 오류: {e}")
@@ -469,12 +488,20 @@ def main():
         load_dotenv()
         api_key = os.getenv('QWEN_API_KEY')
         
-        if not api_key or api_key == "your_api_key_here":
+        # 로컬 모델 사용 (models.py의 키 또는 모델 ID) - 설정하면 API 키 불필요
+        local_model_id = os.getenv('WEB_OCR_LOCAL_MODEL', '').strip() or None
+        if local_model_id:
+            from models import get_model_info
+            model_info = get_model_info(local_model_id, "local")
+            if model_info:
+                local_model_id = model_info['model_id']
+            print(f"✅ 로컬 모델 사용: {local_model_id}")
+        elif not api_key or api_key == "your_api_key_here":
             print("❌ API 키가 설정되지 않았습니다.")
             print("   .env 파일에서 QWEN_API_KEY를 설정해주세요.")
             return
-        
-        print("✅ API 키 확인됨")
+        else:
+            print("✅ API 키 확인됨")
         
     except ImportError:
         print("❌ 필요한 모듈을 찾을 수 없습니다.")
@@ -495,7 +522,7 @@ def main():
         return
     
     try:
-        run_web_ocr_selector(image_path, api_key)
+        run_web_ocr_selector(image_path, api_key, local_model_id)
     except KeyboardInterrupt:
         print(f"\n👋 웹 서버가 종료되었습니다.")
     except Exception as e:
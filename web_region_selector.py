@@ -29,6 +29,7 @@ class WebRegionSelector:
             raise ValueError(f"이미지를 로드할 수 없습니다: {image_path}")
         
         self.regions = []
+        self.cropped_files = {}  # 영역 이름 → 저장된 크롭 파일 경로
         self.base_name = os.path.splitext(os.path.basename(image_path))[0]
         
         # 웹용 이미지 준비
@@ -106,6 +107,7 @@ class WebRegionSelector:
             
             cv2.imwrite(filepath, cropped)
             cropped_files.append(filepath)
+            self.cropped_files[region['name']] = filepath
             
             print(f"💾 {region['name']} 저장: {filename}")
         